@@ -0,0 +1,14 @@
+"""
+ASGI config for webstrat project.
+Served by gunicorn with uvicorn workers (gunicorn asgi:application -k uvicorn.workers.UvicornWorker,
+see deploy.sh) so booking status and seat availability event streams wait on the event loop
+instead of holding a worker each.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
+
+application = get_asgi_application()
@@ -0,0 +1,248 @@
+"""
+Frontend asset serving for Falcon Bus Lines
+The Vite build (assets/, images, logo) is looked up in a manifest built
+once per process instead of probing candidate directories with
+os.path.exists on every request. Each entry holds the resolved file, its
+content type, size, modification time and the precompressed variants
+collectstatic wrote next to it (file.br, file.gz):
+
+    asset_manifest.get('assets/index-3f9a1c2b.js')
+
+Files are streamed with FileResponse, so gunicorn hands them to sendfile.
+Content-hashed Vite files (name-<8 char hash>.ext under assets/) never
+change and are cached by browsers for a year as immutable; everything
+else gets ASSET_MAX_AGE_SECONDS and revalidates with ETag/Last-Modified.
+
+The SPA shell (frontend/dist/index.html, served for every non-API
+navigation) is read once and kept in memory with its gzip and brotli
+encodings. It references the hashed bundles, so it is sent with
+Cache-Control: no-cache and an ETag of its content, and a navigation
+whose copy is current gets a 304.
+
+With ASSET_MANIFEST_AUTOREFRESH (the default in DEBUG) paths are resolved
+on every request instead and the shell is reloaded when the file
+changes, so a rebuilt frontend shows up without a restart.
+"""
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferred encoding first; the file suffix collectstatic (WhiteNoise) writes for each
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_accepts = {encoding: re.compile(rf'\b{encoding}\b') for encoding, _ in ENCODINGS}
+
+# Vite output names: [name]-[hash].[ext]
+_hashed_name = re.compile(r'-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+def asset_roots():
+    """Directories searched for /assets/ and image requests, in order of preference"""
+    base = settings.BASE_DIR
+    return [
+        (os.path.join(settings.STATIC_ROOT, 'assets'), True),
+        (os.path.join(base, 'frontend', 'dist', 'assets'), True),
+        (os.path.join(base, 'staticfiles', 'assets'), True),
+        (str(settings.STATIC_ROOT), False),
+        (os.path.join(base, 'backend', 'static'), False),
+        (os.path.join(base, 'frontend', 'public'), False),
+        (os.path.join(base, 'frontend', 'dist'), False),
+    ]
+
+def logo_roots():
+    """Directories searched for the company logo, in order of preference"""
+    return [(directory, False) for directory, hashed in asset_roots() if not hashed]
+
+def _content_type(path):
+    content_type, _ = mimetypes.guess_type(path)
+    if not content_type:
+        content_type = settings.WHITENOISE_MIMETYPES.get(os.path.splitext(path)[1].lower(), 'application/octet-stream')
+    return content_type
+
+def _entry(path, hashed_root):
+    stat = os.stat(path)
+    variants = {}
+    for encoding, suffix in ENCODINGS:
+        if os.path.isfile(path + suffix):
+            variants[encoding] = path + suffix
+    return {
+        'path': path,
+        'content_type': _content_type(path),
+        'size': stat.st_size,
+        'last_modified': int(stat.st_mtime),
+        'etag': f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+        'immutable': hashed_root and bool(_hashed_name.search(path)),
+        'variants': variants,
+    }
+
+class AssetManifest:
+    """
+    Request path -> resolved file under a set of roots
+
+    roots returns (directory, holds hashed Vite output) pairs; it is called
+    when the manifest is built so settings overridden later still apply.
+    """
+
+    def __init__(self, roots):
+        self._roots = roots
+        self._files = None
+        self._lock = threading.Lock()
+
+    def build(self):
+        """Index every file under the roots; earlier roots win"""
+        files = {}
+        for directory, hashed_root in self._roots():
+            for dirpath, _, filenames in os.walk(directory):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    name = os.path.relpath(path, directory).replace(os.sep, '/')
+                    if name not in files:
+                        files[name] = _entry(path, hashed_root)
+        return files
+
+    def _resolve(self, name):
+        for directory, hashed_root in self._roots():
+            try:
+                path = safe_join(directory, name)
+            except SuspiciousFileOperation:
+                return None
+            if os.path.isfile(path):
+                return _entry(path, hashed_root)
+        return None
+
+    def get(self, name):
+        """Manifest entry for a request path, or None"""
+        if settings.ASSET_MANIFEST_AUTOREFRESH:
+            return self._resolve(name)
+        if self._files is None:
+            with self._lock:
+                if self._files is None:
+                    self._files = self.build()
+        return self._files.get(name)
+
+asset_manifest = AssetManifest(asset_roots)
+logo_manifest = AssetManifest(logo_roots)
+
+def file_response(request, entry):
+    """
+    Conditional FileResponse for a manifest entry, using a precompressed
+    variant the client accepts
+    """
+    response = get_conditional_response(request, etag=entry['etag'], last_modified=entry['last_modified'])
+    if response is None:
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        filename = os.path.basename(entry['path'])
+        for encoding, path in entry['variants'].items():
+            if _accepts[encoding].search(accept_encoding):
+                response = FileResponse(open(path, 'rb'), filename=filename, content_type=entry['content_type'])
+                response['Content-Encoding'] = encoding
+                break
+        else:
+            response = FileResponse(open(entry['path'], 'rb'), filename=filename, content_type=entry['content_type'])
+
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    if entry['immutable']:
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.ASSET_MAX_AGE_SECONDS)
+    if entry['variants']:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+def serve_asset(request, name, manifest=asset_manifest):
+    entry = manifest.get(name)
+    if entry is None:
+        raise Http404(f"Asset not found: {name}")
+    return file_response(request, entry)
+
+def spa_shell_path():
+    return os.path.join(settings.BASE_DIR, 'frontend', 'dist', 'index.html')
+
+class SpaShell:
+    """The Vite build's index.html held in memory with its compressed encodings"""
+
+    def __init__(self, path):
+        self._path = path
+        self._loaded = None
+        self._lock = threading.Lock()
+
+    def _load(self, path):
+        with open(path, 'rb') as f:
+            body = f.read()
+        encoded = {'gzip': gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            encoded['br'] = brotli.compress(body)
+        return {
+            'etag': '"{}"'.format(hashlib.sha1(body).hexdigest()[:32]),
+            'body': body,
+            # Preferred encoding first, as in ENCODINGS
+            'encoded': {encoding: encoded[encoding] for encoding, _ in ENCODINGS if encoding in encoded},
+        }
+
+    def get(self):
+        """
+        The shell, loaded on first use (and again when the file changed, with autorefresh)
+
+        Until a build exists the file is looked for on every call.
+
+        Returns:
+            dict: 'etag', 'body' and 'encoded' ({encoding: bytes}), or None without a build
+        """
+        loaded = self._loaded
+        if loaded is not None and loaded['shell'] is not None and not settings.ASSET_MANIFEST_AUTOREFRESH:
+            return loaded['shell']
+
+        path = self._path()
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        key = (path, stat.st_mtime_ns, stat.st_size) if stat else (path, None, None)
+        if loaded is not None and loaded['key'] == key:
+            return loaded['shell']
+
+        with self._lock:
+            shell = self._load(path) if stat else None
+            self._loaded = {'key': key, 'shell': shell}
+        return shell
+
+spa_shell = SpaShell(spa_shell_path)
+
+def spa_shell_response(request, source=spa_shell):
+    """The SPA shell from memory (304 when the client's copy is current), or None without a build"""
+    shell = source.get()
+    if shell is None:
+        return None
+
+    response = get_conditional_response(request, etag=shell['etag'])
+    if response is None:
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        for encoding, body in shell['encoded'].items():
+            if _accepts[encoding].search(accept_encoding):
+                response = HttpResponse(body, content_type='text/html; charset=utf-8')
+                response['Content-Encoding'] = encoding
+                break
+        else:
+            response = HttpResponse(shell['body'], content_type='text/html; charset=utf-8')
+
+    response['ETag'] = shell['etag']
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -2,6 +2,7 @@
 Django settings for webstrat project.
 """
 
+import importlib.util
 import os
 from pathlib import Path
 
@@ -59,8 +60,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
-    'django.middleware.gzip.GZipMiddleware',  # Add compression
+    'transport.middleware.SelectiveGZipMiddleware',  # Add compression (except event streams and compressed media)
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'transport.middleware.QueryInstrumentationMiddleware',  # Per-view query counts and slow queries (after static files)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -100,6 +102,25 @@ DATABASES = {
     'default': dj_database_url.parse(DATABASE_URL, conn_max_age=600)
 }
 
+# Cache
+# Set REDIS_URL to share the cache between worker processes (uses the redis
+# package); otherwise each process keeps its own in-memory cache
+REDIS_URL = get_env_value('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -152,6 +173,12 @@ WHITENOISE_MIMETYPES = {
     '.ico': 'image/x-icon',
 }
 
+# Frontend assets served from the manifest in assets.py: browser cache lifetime for files
+# without a content hash (hashed Vite files are cached for a year), and whether to resolve
+# paths on every request instead of once per process (picks up frontend rebuilds)
+ASSET_MAX_AGE_SECONDS = int(get_env_value('ASSET_MAX_AGE_SECONDS', '3600'))
+ASSET_MANIFEST_AUTOREFRESH = get_env_value('ASSET_MANIFEST_AUTOREFRESH', str(DEBUG)).lower() == 'true'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -160,8 +187,14 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # orjson-backed JSON when orjson is installed, stdlib json otherwise
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'transport.renderers.FastJSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'transport.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
@@ -172,10 +205,16 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
-        'user': '1000/hour'
+        'user': '1000/hour',
+        # Autocomplete fires on every keystroke
+        'place_suggest': '3000/hour'
     }
 }
 
+# MessagePack responses for internal clients (Accept: application/msgpack), opt-in by installing msgpack
+if importlib.util.find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('transport.renderers.MessagePackRenderer')
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = DEBUG  # Only allow all origins in development
 if not DEBUG:
@@ -202,6 +241,7 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
 ]
 
 CORS_ALLOW_METHODS = [
@@ -234,6 +274,92 @@ PAYFAST_CANCEL_URL = get_env_value('PAYFAST_CANCEL_URL', 'http://localhost:3000/
 PAYFAST_NOTIFY_URL = get_env_value('PAYFAST_NOTIFY_URL', 'http://127.0.0.1:8000/api/payfast/webhook/')
 PAYFAST_CURRENCY = 'ZAR'
 
+# Seat holds: unpaid bookings give their seat back after this many minutes
+SEAT_HOLD_MINUTES = int(get_env_value('SEAT_HOLD_MINUTES', '15'))
+SEAT_HOLD_SWEEP_INTERVAL_SECONDS = int(get_env_value('SEAT_HOLD_SWEEP_INTERVAL_SECONDS', '60'))
+
+# Group bookings: most passengers accepted in one request (a full coach)
+GROUP_BOOKING_MAX_PASSENGERS = int(get_env_value('GROUP_BOOKING_MAX_PASSENGERS', '60'))
+
+# Idempotency keys: how long a stored response is replayed to retries, and
+# how long an unfinished request blocks its key before it is considered abandoned
+IDEMPOTENCY_KEY_TTL_HOURS = int(get_env_value('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+IDEMPOTENCY_LOCK_TIMEOUT_SECONDS = int(get_env_value('IDEMPOTENCY_LOCK_TIMEOUT_SECONDS', '60'))
+
+# Background job runner: worker threads per process, cap on queued jobs, and
+# whether web processes run periodic jobs themselves (disable when a dedicated
+# `manage.py run_jobs` worker is deployed)
+JOB_RUNNER_MAX_WORKERS = int(get_env_value('JOB_RUNNER_MAX_WORKERS', '4'))
+JOB_RUNNER_MAX_PENDING = int(get_env_value('JOB_RUNNER_MAX_PENDING', '10000'))
+JOB_RUNNER_PERIODIC_IN_WEB = get_env_bool('JOB_RUNNER_PERIODIC_IN_WEB', True)
+
+# Durable task queue: tasks claimed per poll, how long a claimed task is hidden
+# from other workers before it is retried, idle poll interval, and whether web
+# processes drain the queue themselves. Production runs `manage.py run_task_workers`
+# next to the web server (see deploy.sh), so web processes do not drain by default:
+# each one would poll the Task table every TASK_QUEUE_POLL_SECONDS. Set
+# TASK_QUEUE_DRAIN_IN_WEB=True for a single-process deploy without a task worker.
+TASK_QUEUE_BATCH_SIZE = int(get_env_value('TASK_QUEUE_BATCH_SIZE', '10'))
+TASK_VISIBILITY_TIMEOUT_SECONDS = int(get_env_value('TASK_VISIBILITY_TIMEOUT_SECONDS', '300'))
+TASK_QUEUE_POLL_SECONDS = float(get_env_value('TASK_QUEUE_POLL_SECONDS', '1'))
+TASK_QUEUE_DRAIN_IN_WEB = get_env_bool('TASK_QUEUE_DRAIN_IN_WEB', DEBUG)
+TASK_RETENTION_DAYS = int(get_env_value('TASK_RETENTION_DAYS', '7'))
+
+# Schedule search result cache. Invalidation is by version bump in the cache, which
+# only reaches other processes when the cache is shared, so without REDIS_URL
+# results are kept just long enough to absorb bursts of identical searches
+SEARCH_CACHE_TTL_SECONDS = int(get_env_value('SEARCH_CACHE_TTL_SECONDS', '600' if REDIS_URL else '5'))
+
+# Days returned by the bulk availability calendar (/api/schedules/calendar/)
+AVAILABILITY_CALENDAR_DAYS = int(get_env_value('AVAILABILITY_CALENDAR_DAYS', '90'))
+
+# Widest flexible-date search window (/api/schedules/search/?flex=N, N days either side)
+FLEX_SEARCH_MAX_DAYS = int(get_env_value('FLEX_SEARCH_MAX_DAYS', '7'))
+
+# Lifetime of the version stamps behind ETags on routes, buses, FAQs and contact info.
+# Stamps are bumped in the cache, so without a shared cache (REDIS_URL) other processes
+# only notice a change when their stamp expires and restarts at the current time
+CONDITIONAL_VERSION_TTL_SECONDS = int(get_env_value('CONDITIONAL_VERSION_TTL_SECONDS', '0' if REDIS_URL else '60')) or None
+
+# Cached /api/bootstrap/ document. Like search results it is keyed by versions that
+# only reach other processes through a shared cache, hence the short default without REDIS_URL
+BOOTSTRAP_CACHE_TTL_SECONDS = int(get_env_value('BOOTSTRAP_CACHE_TTL_SECONDS', '3600' if REDIS_URL else '5'))
+
+# Event streams are served by the ASGI worker (asgi.py). A sync WSGI worker would be held by
+# each open stream for minutes, so under WSGI they are refused with 503 except on the threaded
+# dev server
+EVENT_STREAMS_UNDER_WSGI = get_env_bool('EVENT_STREAMS_UNDER_WSGI', DEBUG)
+
+# Booking status event streams (/api/bookings/<id>/events/): how often watched bookings
+# are reloaded, keepalive interval, and how long a stream stays open before the client
+# reconnects
+BOOKING_EVENTS_POLL_SECONDS = float(get_env_value('BOOKING_EVENTS_POLL_SECONDS', '1'))
+BOOKING_EVENTS_HEARTBEAT_SECONDS = float(get_env_value('BOOKING_EVENTS_HEARTBEAT_SECONDS', '15'))
+BOOKING_EVENTS_MAX_SECONDS = float(get_env_value('BOOKING_EVENTS_MAX_SECONDS', '300'))
+
+# Seat availability event streams (/api/schedules/events/): reload interval for changes
+# made by other processes, shortest gap between reloads (a burst of reservations reaches
+# clients as one delta per gap), keepalive interval, stream lifetime and most schedules
+# one stream may watch
+SEAT_EVENTS_POLL_SECONDS = float(get_env_value('SEAT_EVENTS_POLL_SECONDS', '2'))
+SEAT_EVENTS_COALESCE_SECONDS = float(get_env_value('SEAT_EVENTS_COALESCE_SECONDS', '0.5'))
+SEAT_EVENTS_HEARTBEAT_SECONDS = float(get_env_value('SEAT_EVENTS_HEARTBEAT_SECONDS', '15'))
+SEAT_EVENTS_MAX_SECONDS = float(get_env_value('SEAT_EVENTS_MAX_SECONDS', '300'))
+SEAT_EVENTS_MAX_SCHEDULES = int(get_env_value('SEAT_EVENTS_MAX_SCHEDULES', '100'))
+
+# Query instrumentation (transport/performance.py): fraction of requests whose queries are
+# counted and timed for the logs and /api/performance/dashboard/, the duration from which a
+# statement is logged as slow, and the per-request query count that triggers a warning
+QUERY_INSTRUMENTATION_SAMPLE_RATE = float(get_env_value('QUERY_INSTRUMENTATION_SAMPLE_RATE', '1.0'))
+SLOW_QUERY_MS = float(get_env_value('SLOW_QUERY_MS', '100'))
+QUERY_COUNT_WARNING = int(get_env_value('QUERY_COUNT_WARNING', '10'))
+
+# Journey planner: time allowed to change buses, most buses per journey and how
+# many days of departures a search looks through
+JOURNEY_MIN_TRANSFER_MINUTES = int(get_env_value('JOURNEY_MIN_TRANSFER_MINUTES', '10'))
+JOURNEY_MAX_LEGS = int(get_env_value('JOURNEY_MAX_LEGS', '3'))
+JOURNEY_SEARCH_DAYS = int(get_env_value('JOURNEY_SEARCH_DAYS', '7'))
+
 # Logging
 LOGGING = {
     'version': 1,
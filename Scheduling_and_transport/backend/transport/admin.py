@@ -5,8 +5,12 @@ from django.urls import reverse, path
 from django.utils.safestring import mark_safe
 from django.http import HttpResponse
 from django.utils import timezone
-from .models import Route, Bus, Schedule, Booking, ContactInfo, FAQ
+from .models import Place, Route, Bus, Schedule, RouteAvailabilityDay, Booking, BookingGroup, Task, ContactInfo, FAQ
 from .pdf_generator import PremiumTicketPDFGenerator
+from .place_index import routes_changed
+from .search_cache import SearchCache
+from .availability_calendar import AvailabilityCalendar
+from .conditional import ResourceVersions
 
 # Customize admin site header and title
 admin.site.site_header = "Falcon Bus Lines Administration"
@@ -40,6 +44,16 @@ class BusAdmin(admin.ModelAdmin):
         return '0 schedules'
     schedule_count.short_description = 'Schedules'
 
+@admin.register(Place)
+class PlaceAdmin(admin.ModelAdmin):
+    list_display = ['name', 'key', 'route_count']
+    search_fields = ['name', 'key']
+    readonly_fields = ['key', 'created_at']
+
+    def route_count(self, obj):
+        return obj.departing_routes.count() + obj.arriving_routes.count()
+    route_count.short_description = 'Routes'
+
 @admin.register(Route)
 class RouteAdmin(admin.ModelAdmin):
     list_display = ['name', 'route_summary', 'distance_km', 'duration_display', 'base_price_zar', 'is_active', 'schedule_count']
@@ -99,11 +113,17 @@ class RouteAdmin(admin.ModelAdmin):
     
     def activate_routes(self, request, queryset):
         updated = queryset.update(is_active=True)
+        routes_changed(queryset)
+        SearchCache.network_changed()
+        ResourceVersions.changed(Route)
         self.message_user(request, f'{updated} routes were successfully activated.')
     activate_routes.short_description = "Activate selected routes"
     
     def deactivate_routes(self, request, queryset):
         updated = queryset.update(is_active=False)
+        routes_changed(queryset)
+        SearchCache.network_changed()
+        ResourceVersions.changed(Route)
         self.message_user(request, f'{updated} routes were successfully deactivated.')
     deactivate_routes.short_description = "Deactivate selected routes"
     
@@ -149,15 +169,36 @@ class ScheduleAdmin(admin.ModelAdmin):
     
     def activate_schedules(self, request, queryset):
         updated = queryset.update(is_active=True)
+        SearchCache.routes_changed(queryset.values_list('route_id', flat=True).distinct())
+        AvailabilityCalendar.schedules_changed(queryset.values_list('id', flat=True))
         self.message_user(request, f'{updated} schedules were successfully activated.')
     activate_schedules.short_description = "Activate selected schedules"
     
     def deactivate_schedules(self, request, queryset):
         updated = queryset.update(is_active=False)
+        SearchCache.routes_changed(queryset.values_list('route_id', flat=True).distinct())
+        AvailabilityCalendar.schedules_changed(queryset.values_list('id', flat=True))
         self.message_user(request, f'{updated} schedules were successfully deactivated.')
     deactivate_schedules.short_description = "Deactivate selected schedules"
 
 
+@admin.register(RouteAvailabilityDay)
+class RouteAvailabilityDayAdmin(admin.ModelAdmin):
+    list_display = ['route', 'date', 'departures', 'min_price_zar', 'seats_left', 'updated_at']
+    list_filter = ['route']
+    date_hierarchy = 'date'
+    readonly_fields = ['route', 'date', 'departures', 'min_price_zar', 'seats_left', 'updated_at']
+    actions = ['rebuild_calendar']
+    
+    def has_add_permission(self, request):
+        # Rows are maintained from schedules (see transport/availability_calendar.py)
+        return False
+    
+    def rebuild_calendar(self, request, queryset):
+        count = AvailabilityCalendar.rebuild()
+        self.message_user(request, f'Availability calendar rebuilt for {count} route days.')
+    rebuild_calendar.short_description = "Rebuild the whole availability calendar"
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ['booking_id_short', 'passenger_name', 'route_display', 'departure_time', 'number_of_seats', 'total_amount_zar', 'status', 'booking_date']
@@ -179,7 +220,8 @@ class BookingAdmin(admin.ModelAdmin):
         }),
         ('Booking Details', {
             'fields': (('number_of_seats', 'total_amount_zar'),
-                      ('payment_date', 'payfast_payment_id'))
+                      ('payment_date', 'payfast_payment_id'),
+                      'hold_expires_at')
         }),
         ('Timestamps', {
             'fields': ('booking_date', 'updated_at'),
@@ -286,6 +328,31 @@ class BookingAdmin(admin.ModelAdmin):
         self.message_user(request, f'{updated} bookings were successfully cancelled.')
     cancel_bookings.short_description = "Cancel selected bookings"
 
+class GroupBookingInline(admin.TabularInline):
+    model = Booking
+    fields = ['booking_reference', 'passenger_name', 'seat_number', 'discount_type', 'total_amount_zar', 'status']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    show_change_link = True
+
+@admin.register(BookingGroup)
+class BookingGroupAdmin(admin.ModelAdmin):
+    list_display = ['group_reference', 'contact_name', 'schedule', 'number_of_seats', 'total_amount_zar', 'payfast_payment_status', 'created_at']
+    list_filter = ['payfast_payment_status', 'created_at']
+    search_fields = ['group_reference', 'contact_name', 'contact_email', 'contact_phone']
+    readonly_fields = ['group_reference', 'payfast_payment_id', 'payment_date', 'created_at', 'updated_at']
+    raw_id_fields = ['schedule']
+    inlines = [GroupBookingInline]
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'queue', 'status', 'priority', 'attempts', 'max_attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['status', 'queue', 'name']
+    search_fields = ['name', 'dedupe_key', 'last_error']
+    readonly_fields = ['claim_token', 'created_at', 'finished_at']
+    ordering = ['-created_at']
+
 @admin.register(ContactInfo)
 class ContactInfoAdmin(admin.ModelAdmin):
     list_display = ['company_name', 'phone_primary', 'email']
@@ -326,10 +393,12 @@ class FAQAdmin(admin.ModelAdmin):
     
     def activate_faqs(self, request, queryset):
         updated = queryset.update(is_active=True)
+        ResourceVersions.changed(FAQ)
         self.message_user(request, f'{updated} FAQs were successfully activated.')
     activate_faqs.short_description = "Activate selected FAQs"
     
     def deactivate_faqs(self, request, queryset):
         updated = queryset.update(is_active=False)
+        ResourceVersions.changed(FAQ)
         self.message_user(request, f'{updated} FAQs were successfully deactivated.')
     deactivate_faqs.short_description = "Deactivate selected FAQs"
@@ -5,8 +5,6 @@ Automatically runs schedule maintenance every day
 
 from django.apps import AppConfig
 from django.conf import settings
-import threading
-import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,53 +16,56 @@ class TransportConfig(AppConfig):
     def ready(self):
         """
         This method is called when Django starts up.
-        We use it to start our background schedule maintenance.
+        We use it to schedule background schedule maintenance.
         """
-        # Only run the scheduler in the main process (not in worker processes)
+        from . import availability_calendar, booking_events, conditional, journey_planner, place_index, search_cache, seat_events
+        place_index.connect_signals()
+        search_cache.connect_signals()
+        journey_planner.connect_signals()
+        availability_calendar.connect_signals()
+        conditional.connect_signals()
+        booking_events.connect_signals()
+        seat_events.connect_signals()
+        
+        # Only run the scheduler in the main process (not in the autoreloader parent),
+        # and not at all when dedicated run_jobs / run_task_workers processes are deployed
         import os
         if os.environ.get('RUN_MAIN') or settings.DEBUG is False:
-            self.start_daily_maintenance()
+            if settings.JOB_RUNNER_PERIODIC_IN_WEB:
+                self.start_daily_maintenance()
+            if settings.TASK_QUEUE_DRAIN_IN_WEB:
+                self.start_task_queue_drain()
+            self.warm_place_index()
     
     def start_daily_maintenance(self):
-        """Start the daily maintenance scheduler"""
+        """Schedule daily maintenance and the seat hold sweeper on the job runner"""
         try:
             # Import here to avoid circular imports
-            from .schedule_management import auto_maintain_schedules
+            from .jobs import register_periodic_jobs
             
-            def run_daily_maintenance():
-                """Run the daily maintenance task"""
-                logger.info("🤖 Starting automated daily schedule maintenance...")
-                try:
-                    result = auto_maintain_schedules(days_ahead=90, dry_run=False)
-                    logger.info(f"✅ Daily maintenance completed: {result}")
-                except Exception as e:
-                    logger.error(f"❌ Daily maintenance failed: {str(e)}", exc_info=True)
-            
-            def run_scheduler():
-                """Background thread that runs the scheduler"""
-                from datetime import datetime, time as dt_time
-                import time
-                
-                logger.info("🕐 Daily maintenance scheduler started (runs at 2 AM)")
-                
-                while True:
-                    now = datetime.now()
-                    target_time = dt_time(2, 0)  # 2 AM
-                    
-                    # Check if it's 2 AM (within a 1-minute window)
-                    if (now.time().hour == target_time.hour and 
-                        now.time().minute == target_time.minute):
-                        run_daily_maintenance()
-                        # Sleep for 61 seconds to avoid running twice in the same minute
-                        time.sleep(61)
-                    else:
-                        time.sleep(30)  # Check every 30 seconds
-            
-            # Run scheduler in background thread
-            scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-            scheduler_thread.start()
+            register_periodic_jobs()
             
             logger.info("🚀 Daily schedule maintenance system activated!")
             
         except Exception as e:
             logger.error(f"Failed to start daily maintenance scheduler: {e}", exc_info=True)
+    
+    def start_task_queue_drain(self):
+        """Run due durable tasks from this process on the job runner"""
+        try:
+            from .jobs import register_task_queue_drain
+            
+            register_task_queue_drain()
+            
+        except Exception as e:
+            logger.error(f"Failed to start task queue drain: {e}", exc_info=True)
+    
+    def warm_place_index(self):
+        """Build the in-memory place autocomplete index in the background"""
+        try:
+            from .place_index import warm
+            
+            warm()
+            
+        except Exception as e:
+            logger.error(f"Failed to warm place index: {e}", exc_info=True)
@@ -0,0 +1,266 @@
+"""
+Route availability calendar for Falcon Bus Lines
+RouteAvailabilityDay holds one row per route and departure date with the
+number of departures, the cheapest fare that still has seats and the
+seats left, so date pickers and the bulk calendar endpoint read a few
+hundred small rows instead of aggregating schedules per request.
+
+Rows are recomputed from their schedules, never adjusted by deltas, so a
+refresh always converges on the truth:
+
+- seat reservations and releases refresh the affected days once their
+  transaction commits
+- schedule saves and deletes (admin edits) do the same through signals
+- schedule maintenance suspends per-schedule refreshes and rebuilds the
+  whole calendar once at the end, which also clears past days
+
+Every refresh bumps the search cache versions of the routes it touched,
+so availability matrices cached from these rows (see SearchCache) are
+never older than the calendar.
+"""
+
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+import logging
+import threading
+
+from .search_cache import SearchCache
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+class AvailabilityCalendar:
+    """Maintains RouteAvailabilityDay rows from Schedule rows"""
+
+    @staticmethod
+    def _aggregate(schedules):
+        """Calendar values per (route_id, date) for a schedule queryset"""
+        rows = (
+            schedules.filter(is_active=True)
+            .annotate(day=TruncDate('departure_time'))
+            .values('route_id', 'day')
+            .annotate(
+                departure_count=Count('id'),
+                seat_total=Sum('available_seats'),
+                cheapest=Min('price_zar', filter=Q(available_seats__gt=0)),
+            )
+        )
+        return {
+            (row['route_id'], row['day']): {
+                'departures': row['departure_count'],
+                'seats_left': max(row['seat_total'] or 0, 0),
+                'min_price_zar': row['cheapest'],
+            }
+            for row in rows
+        }
+
+    @staticmethod
+    def _save(values):
+        """Upsert calendar rows for the given (route_id, date) values"""
+        from .models import RouteAvailabilityDay
+
+        if not values:
+            return
+        RouteAvailabilityDay.objects.bulk_create(
+            [
+                RouteAvailabilityDay(route_id=route_id, date=day, **fields)
+                for (route_id, day), fields in values.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['route', 'date'],
+            update_fields=['departures', 'min_price_zar', 'seats_left', 'updated_at'],
+        )
+
+    @classmethod
+    def refresh_days(cls, days):
+        """
+        Recompute the calendar for specific route days
+
+        Args:
+            days: Iterable of (route_id, date) pairs
+        """
+        from .models import RouteAvailabilityDay, Schedule
+
+        days = set(days)
+        if not days:
+            return
+
+        # One aggregate over the smallest window covering every requested day
+        dates = [day for _, day in days]
+        schedules = Schedule.objects.filter(
+            route_id__in={route_id for route_id, _ in days},
+            departure_time__gte=_day_start(min(dates)),
+            departure_time__lt=_day_start(max(dates) + timedelta(days=1)),
+        )
+        values = {key: fields for key, fields in cls._aggregate(schedules).items() if key in days}
+
+        with transaction.atomic():
+            cls._save(values)
+            emptied = days - values.keys()
+            if emptied:
+                stale = [
+                    row_id for row_id, route_id, day in RouteAvailabilityDay.objects.filter(
+                        route_id__in={route_id for route_id, _ in emptied},
+                        date__gte=min(dates),
+                        date__lte=max(dates),
+                    ).values_list('id', 'route_id', 'date')
+                    if (route_id, day) in emptied
+                ]
+                RouteAvailabilityDay.objects.filter(id__in=stale).delete()
+
+        # Cached availability matrices are keyed by route version
+        SearchCache.routes_changed({route_id for route_id, _ in days})
+
+    @classmethod
+    def refresh_schedules(cls, schedule_ids):
+        """Recompute the days the given schedules depart on"""
+        from .models import Schedule
+
+        days = (
+            Schedule.objects.filter(id__in=list(schedule_ids))
+            .annotate(day=TruncDate('departure_time'))
+            .values_list('route_id', 'day')
+        )
+        cls.refresh_days(days)
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recompute the calendar for every day from today on and drop past days
+
+        Returns:
+            int: Number of calendar rows written
+        """
+        from .models import RouteAvailabilityDay, Schedule
+
+        today = timezone.localdate()
+        values = cls._aggregate(Schedule.objects.filter(departure_time__gte=_day_start(today)))
+
+        with transaction.atomic():
+            cls._save(values)
+            current = set(values)
+            stale = [
+                row_id for row_id, route_id, day in
+                RouteAvailabilityDay.objects.values_list('id', 'route_id', 'date')
+                if day < today or (route_id, day) not in current
+            ]
+            RouteAvailabilityDay.objects.filter(id__in=stale).delete()
+
+        SearchCache.network_changed()
+        logger.info(f"Availability calendar rebuilt: {len(values)} route day(s)")
+        return len(values)
+
+    @classmethod
+    def _flush(cls):
+        days, _state.days = getattr(_state, 'days', set()), set()
+        schedule_ids, _state.schedule_ids = getattr(_state, 'schedule_ids', set()), set()
+        try:
+            if schedule_ids:
+                cls.refresh_schedules(schedule_ids)
+            if days:
+                cls.refresh_days(days)
+        except Exception as e:
+            logger.error(f"Could not refresh availability calendar: {str(e)}")
+
+    @classmethod
+    def schedules_changed(cls, schedule_ids):
+        """Refresh the days of these schedules once the current transaction commits"""
+        if getattr(_state, 'suspended', False):
+            return
+        _state.schedule_ids = getattr(_state, 'schedule_ids', set()) | set(schedule_ids)
+        # Changes made in one transaction (e.g. a bulk delete) are refreshed together;
+        # later callbacks find nothing left to do
+        transaction.on_commit(cls._flush)
+
+    @classmethod
+    def days_changed(cls, days):
+        """Refresh these (route_id, date) days once the current transaction commits"""
+        if getattr(_state, 'suspended', False):
+            return
+        _state.days = getattr(_state, 'days', set()) | set(days)
+        transaction.on_commit(cls._flush)
+
+    @staticmethod
+    @contextmanager
+    def suspended():
+        """Skip per-schedule refreshes in this thread (call rebuild() afterwards)"""
+        previous = getattr(_state, 'suspended', False)
+        _state.suspended = True
+        try:
+            yield
+        finally:
+            _state.suspended = previous
+
+    @staticmethod
+    def calendar(days=90, route_ids=None):
+        """
+        Calendar rows for active routes from today on
+
+        Args:
+            days: Number of days to include, starting today
+            route_ids: Limit to these routes (optional)
+
+        Returns:
+            tuple: (start date, end date, list of route dicts each with its days)
+        """
+        from .models import Route, RouteAvailabilityDay
+
+        start = timezone.localdate()
+        end = start + timedelta(days=days - 1)
+
+        routes = Route.objects.filter(is_active=True).order_by('name')
+        if route_ids is not None:
+            routes = routes.filter(id__in=route_ids)
+        calendar = {
+            route['id']: {**route, 'days': []}
+            for route in routes.values('id', 'name', 'origin', 'destination')
+        }
+
+        rows = RouteAvailabilityDay.objects.filter(
+            route_id__in=list(calendar), date__gte=start, date__lte=end
+        ).order_by('route_id', 'date').values_list('route_id', 'date', 'departures', 'min_price_zar', 'seats_left')
+        for route_id, day, departures, min_price, seats_left in rows:
+            calendar[route_id]['days'].append({
+                'date': day,
+                'departures': departures,
+                'min_price_zar': min_price,
+                'seats_left': seats_left,
+            })
+
+        return start, end, list(calendar.values())
+
+def _schedule_day(schedule):
+    return schedule.route_id, timezone.localdate(schedule.departure_time)
+
+def _remember_previous_day(sender, instance, **kwargs):
+    from .models import Schedule
+
+    instance._previous_calendar_day = None
+    if instance.pk and not getattr(_state, 'suspended', False):
+        previous = Schedule.objects.filter(pk=instance.pk).values('route_id', 'departure_time').first()
+        if previous:
+            instance._previous_calendar_day = (previous['route_id'], timezone.localdate(previous['departure_time']))
+
+def _schedule_changed(sender, instance, **kwargs):
+    days = {_schedule_day(instance)}
+    previous = getattr(instance, '_previous_calendar_day', None)
+    if previous:
+        days.add(previous)
+    AvailabilityCalendar.days_changed(days)
+
+def connect_signals():
+    """Keep the calendar in step with Schedule saves and deletes (called from TransportConfig.ready)"""
+    from .models import Schedule
+
+    pre_save.connect(_remember_previous_day, sender=Schedule, dispatch_uid='availability_calendar_pre_save')
+    post_save.connect(_schedule_changed, sender=Schedule, dispatch_uid='availability_calendar_post_save')
+    post_delete.connect(_schedule_changed, sender=Schedule, dispatch_uid='availability_calendar_post_delete')
@@ -0,0 +1,1026 @@
+"""
+Benchmark and stress scenarios for Falcon Bus Lines
+Run with: python manage.py benchmark <scenario>
+
+Every scenario creates its own throwaway bus, route and schedule data
+and removes it again afterwards, so it is safe to run against a
+development database.
+"""
+
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection
+from django.utils import timezone
+import threading
+import time
+import uuid
+
+from .models import Bus, Place, Route, Schedule, Booking
+from .reservation_service import SeatReservationService
+from .task_queue import task
+
+SCENARIOS = {}
+
+def scenario(name):
+    """Register a benchmark scenario under the given name"""
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+@contextmanager
+def benchmark_schedule(total_seats=60):
+    """Create a temporary bus, route and schedule, deleting them on exit"""
+    tag = uuid.uuid4().hex[:8].upper()
+    bus = Bus.objects.create(
+        bus_number=f'BENCH{tag}',
+        bus_type='standard',
+        total_seats=total_seats,
+    )
+    route = Route.objects.create(
+        name=f'Benchmark Route {tag}',
+        origin=f'Bench Origin {tag}',
+        destination=f'Bench Destination {tag}',
+        distance_km=300,
+        duration_hours=4,
+        base_price_zar=Decimal('250.00'),
+    )
+    departure = timezone.now() + timedelta(days=7)
+    schedule = Schedule.objects.create(
+        route=route,
+        bus=bus,
+        departure_time=departure,
+        arrival_time=departure + timedelta(hours=4),
+        available_seats=total_seats,
+        price_zar=route.base_price_zar,
+    )
+    try:
+        yield schedule
+    finally:
+        route.delete()
+        bus.delete()
+        Place.objects.filter(id__in=[route.origin_place_id, route.destination_place_id]).delete()
+
+def run_concurrently(func, count, concurrency):
+    """
+    Call func(i) for i in range(count) on a thread pool
+
+    Returns:
+        tuple: (list of results, elapsed seconds)
+    """
+    def call(i):
+        try:
+            return func(i)
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, range(count)))
+    return results, time.perf_counter() - start
+
+@scenario('booking_contention')
+def booking_contention(requests=300, concurrency=32, seats=60, **options):
+    """
+    Fire parallel POST /api/bookings/ requests at a single schedule and
+    verify that no more bookings are accepted than there are seats
+    """
+    from rest_framework.test import APIRequestFactory
+    from .views import BookingViewSet
+
+    factory = APIRequestFactory()
+    create_view = BookingViewSet.as_view({'post': 'create'}, throttle_classes=[])
+
+    with benchmark_schedule(total_seats=seats) as schedule:
+        def create_booking(i):
+            request = factory.post('/api/bookings/', {
+                'schedule_id': schedule.id,
+                'passenger_name': f'Stress Passenger {i}',
+                'passenger_email': f'stress{i}@example.com',
+                'passenger_phone': '083 123 4567',
+                'total_amount_zar': '0.00',
+            }, format='json')
+            return create_view(request).status_code
+
+        codes, elapsed = run_concurrently(create_booking, requests, concurrency)
+
+        schedule.refresh_from_db()
+        booked = Booking.objects.filter(
+            schedule=schedule,
+            status__in=SeatReservationService.SEAT_HOLDING_STATUSES
+        ).count()
+        created = codes.count(201)
+
+        return {
+            'requests': requests,
+            'concurrency': concurrency,
+            'seats': seats,
+            'created': created,
+            'rejected_sold_out': codes.count(400),
+            'errors': len(codes) - created - codes.count(400),
+            'bookings_holding_seats': booked,
+            'available_seats_after': schedule.available_seats,
+            'oversold': max(booked - seats, 0) + max(-schedule.available_seats, 0),
+            'elapsed_s': round(elapsed, 3),
+            'requests_per_s': round(requests / elapsed, 1),
+        }
+
+def latency_summary(latencies):
+    """p50/p95/p99/max of a list of latencies in seconds, reported in ms"""
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return round(ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000, 2)
+
+    return {
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(ordered[-1] * 1000, 2),
+    }
+
+@scenario('seat_claim')
+def seat_claim(requests=300, concurrency=32, seats=60, **options):
+    """
+    Claim random specific seats on one coach from many threads and
+    report claim latency, conflicts and seat map consistency
+    """
+    import random
+    from .seat_map import SeatMap
+
+    with benchmark_schedule(total_seats=seats) as schedule:
+        def claim(i):
+            seat = random.randint(1, seats)
+            start = time.perf_counter()
+            try:
+                outcome = SeatReservationService.claim_seats(schedule.id, [seat])
+            except Exception:
+                outcome = None
+            return outcome, time.perf_counter() - start
+
+        results, elapsed = run_concurrently(claim, requests, concurrency)
+
+        schedule.refresh_from_db()
+        claimed = sum(1 for outcome, _ in results if outcome)
+        taken = SeatMap.from_bytes(schedule.seat_map, seats).taken_count()
+
+        return {
+            'requests': requests,
+            'concurrency': concurrency,
+            'seats': seats,
+            'claimed': claimed,
+            'conflicts': sum(1 for outcome, _ in results if outcome is False),
+            'errors': sum(1 for outcome, _ in results if outcome is None),
+            'seats_on_map': taken,
+            'available_seats_after': schedule.available_seats,
+            # A claim the map does not reflect means two buyers got the same seat
+            'oversold': abs(taken - claimed) + max(-schedule.available_seats, 0),
+            **latency_summary([latency for _, latency in results]),
+            'elapsed_s': round(elapsed, 3),
+            'claims_per_s': round(requests / elapsed, 1),
+        }
+
+class _RolledBack(Exception):
+    pass
+
+def _allocate_references(count):
+    """Worker process body for the reference_allocation scenario"""
+    from django.db import connections, transaction
+    from .references import allocate_booking_reference
+
+    kept = []
+    try:
+        for i in range(count):
+            if i % 7 == 3:
+                # References handed out in a rolled-back transaction were never
+                # stored, so they are not part of the uniqueness check
+                try:
+                    with transaction.atomic():
+                        allocate_booking_reference()
+                        raise _RolledBack()
+                except _RolledBack:
+                    continue
+            with transaction.atomic():
+                kept.append(allocate_booking_reference())
+    finally:
+        connections.close_all()
+    return kept
+
+@scenario('reference_allocation')
+def reference_allocation(requests=300, concurrency=32, **options):
+    """
+    Allocate booking references from many processes at once and verify
+    that no reference is ever handed out twice
+    """
+    import multiprocessing
+    from django.db import connections
+
+    # Forked children must not share the parent's database connections
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+
+    start = time.perf_counter()
+    with context.Pool(processes=concurrency) as pool:
+        batches = pool.map(_allocate_references, [requests] * concurrency)
+    elapsed = time.perf_counter() - start
+
+    references = [reference for batch in batches for reference in batch]
+    duplicates = len(references) - len(set(references))
+
+    return {
+        'processes': concurrency,
+        'allocations_per_process': requests,
+        'references_kept': len(references),
+        'duplicates': duplicates,
+        'elapsed_s': round(elapsed, 3),
+        'references_per_s': round(len(references) / elapsed, 1),
+    }
+
+_executed_tasks = []
+_executed_lock = threading.Lock()
+
+@task('benchmark_noop', queue='benchmark', max_attempts=1)
+def benchmark_noop(n):
+    with _executed_lock:
+        _executed_tasks.append(n)
+
+@scenario('task_throughput')
+def task_throughput(requests=300, concurrency=32, **options):
+    """
+    Enqueue no-op tasks and drain them with competing workers, verifying
+    every task runs exactly once
+    """
+    from .models import Task
+    from .task_queue import TaskWorker, enqueue_many
+
+    del _executed_tasks[:]
+    Task.objects.filter(queue='benchmark').delete()
+
+    try:
+        start = time.perf_counter()
+        enqueue_many('benchmark_noop', [{'n': n} for n in range(requests)])
+        enqueue_elapsed = time.perf_counter() - start
+
+        worker = TaskWorker(queue='benchmark')
+        processed, elapsed = run_concurrently(lambda i: worker.drain(), concurrency, concurrency)
+
+        done = Task.objects.filter(queue='benchmark', status='done').count()
+
+        return {
+            'tasks': requests,
+            'workers': concurrency,
+            'batch_size': worker.batch_size,
+            'enqueue_s': round(enqueue_elapsed, 3),
+            'executed': len(_executed_tasks),
+            'marked_done': done,
+            'not_run': requests - len(set(_executed_tasks)),
+            'duplicates': len(_executed_tasks) - len(set(_executed_tasks)),
+            'elapsed_s': round(elapsed, 3),
+            'tasks_per_s': round(sum(processed) / elapsed, 1),
+        }
+    finally:
+        Task.objects.filter(queue='benchmark').delete()
+
+def _old_icontains_search(origin, destination, date):
+    """ScheduleViewSet.search as it was before the canonical place index"""
+    return list(
+        Schedule.objects.select_related('route', 'bus').filter(
+            is_active=True,
+            route__origin__icontains=origin,
+            route__destination__icontains=destination,
+            departure_time__date=date
+        )[:100]
+    )
+
+@contextmanager
+def benchmark_network(schedules=1_000_000, places=40, routes=200, per_day=4):
+    """
+    Create a throwaway network of places, routes and bulk-inserted schedules
+
+    Yields:
+        tuple: (list of routes, first departure day)
+    """
+    import random
+
+    tag = uuid.uuid4().hex[:6].upper()
+    names = [f'Bench {tag} Place {i:02d}' for i in range(places)]
+    bus = Bus.objects.create(bus_number=f'BENCH{tag}', bus_type='standard', total_seats=60)
+
+    pairs = random.Random(1).sample([(a, b) for a in names for b in names if a != b], routes)
+    created_routes = [
+        Route.objects.create(
+            name=f'Benchmark {origin} - {destination}',
+            origin=origin,
+            destination=destination,
+            distance_km=300,
+            duration_hours=4,
+            base_price_zar=Decimal('250.00'),
+        )
+        for origin, destination in pairs
+    ]
+
+    first_day = timezone.now().replace(hour=6, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    per_route = max(schedules // routes, 1)
+    batch = []
+    try:
+        for route in created_routes:
+            for n in range(per_route):
+                departure = first_day + timedelta(days=n // per_day, hours=3 * (n % per_day))
+                batch.append(Schedule(
+                    route=route,
+                    bus=bus,
+                    departure_time=departure,
+                    arrival_time=departure + timedelta(hours=4),
+                    available_seats=60,
+                    price_zar=route.base_price_zar,
+                ))
+                if len(batch) >= 10000:
+                    Schedule.objects.bulk_create(batch)
+                    batch = []
+        Schedule.objects.bulk_create(batch)
+
+        yield created_routes, first_day.date(), per_route // per_day
+    finally:
+        # Delete in chunks; a single cascading delete would load every schedule at once
+        route_ids = [route.id for route in created_routes]
+        while True:
+            chunk = list(Schedule.objects.filter(route_id__in=route_ids).values_list('id', flat=True)[:20000])
+            if not chunk:
+                break
+            Schedule.objects.filter(id__in=chunk).delete()
+        Route.objects.filter(id__in=route_ids).delete()
+        bus.delete()
+        Place.objects.filter(name__in=names).delete()
+
+OLD_SEARCH_SAMPLE = 30
+
+@scenario('city_search')
+def city_search(requests=300, schedules=1_000_000, **options):
+    """
+    Compare the old icontains schedule search with the indexed place
+    search on a large generated timetable
+    """
+    import random
+    from .search_service import ScheduleSearchService
+
+    with benchmark_network(schedules=schedules) as (routes, first_day, days):
+        rng = random.Random(2)
+        queries = [
+            (route.origin, route.destination, (first_day + timedelta(days=rng.randrange(days))).isoformat())
+            for route in (rng.choice(routes) for _ in range(requests))
+        ]
+
+        def timed(search, sample):
+            latencies, counts = [], []
+            for origin, destination, date in sample:
+                start = time.perf_counter()
+                counts.append(len(search(origin, destination, date)))
+                latencies.append(time.perf_counter() - start)
+            return latencies, counts
+
+        # The scan takes seconds per search at full size, so it gets a smaller sample
+        old_latencies, old_counts = timed(_old_icontains_search, queries[:OLD_SEARCH_SAMPLE])
+        new_latencies, new_counts = timed(
+            lambda origin, destination, date: ScheduleSearchService.search(origin, destination, date=date),
+            queries
+        )
+
+        old = latency_summary(old_latencies)
+        new = latency_summary(new_latencies)
+        return {
+            'schedules': Schedule.objects.filter(route__in=routes).count(),
+            'searches': requests,
+            'icontains_searches': len(old_latencies),
+            'result_mismatches': sum(1 for a, b in zip(old_counts, new_counts) if a != b),
+            **{f'icontains_{key}': value for key, value in old.items()},
+            **{f'indexed_{key}': value for key, value in new.items()},
+            'speedup_p50': round(old['p50_ms'] / max(new['p50_ms'], 0.001), 1),
+        }
+
+@scenario('place_suggest')
+def place_suggest(requests=300, **options):
+    """
+    Time autocomplete lookups against the in-memory place index for every
+    prefix of every active place name
+    """
+    from .place_index import PlaceIndex
+    from .places import normalize_place_name
+
+    index = PlaceIndex()
+    start = time.perf_counter()
+    index.rebuild()
+    build_elapsed = time.perf_counter() - start
+
+    names = [place['name'] for place in index._places.values()]
+    prefixes = [normalize_place_name(name)[:n] for name in names for n in range(1, len(name) + 1)]
+    if not prefixes:
+        return {'places': 0}
+
+    latencies = []
+    for i in range(requests):
+        prefix = prefixes[i % len(prefixes)]
+        start = time.perf_counter()
+        index.suggest(prefix)
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        'places': len(names),
+        'build_ms': round(build_elapsed * 1000, 2),
+        'lookups': requests,
+        **latency_summary(latencies),
+    }
+
+@scenario('journey_planner')
+def journey_planner(requests=300, schedules=1_000_000, **options):
+    """
+    Plan earliest-arrival and cheapest journeys between random place pairs
+    over a generated network, and time the timetable build
+    """
+    import random
+    from .journey_planner import JourneyPlanner, Timetable
+
+    with benchmark_network(schedules=schedules) as (routes, first_day, days):
+        timetable = Timetable()
+        start = time.perf_counter()
+        timetable.rebuild()
+        build_elapsed = time.perf_counter() - start
+
+        place_ids = sorted({route.origin_place_id for route in routes} | {route.destination_place_id for route in routes})
+        rng = random.Random(2)
+        pairs = [rng.sample(place_ids, 2) for _ in range(requests)]
+        planner = JourneyPlanner(timetable=timetable)
+        depart_after = timezone.now()
+
+        results = {}
+        for optimize in ('earliest', 'cheapest'):
+            latencies = []
+            found = 0
+            for origin, destination in pairs:
+                start = time.perf_counter()
+                legs = planner.plan({origin}, {destination}, depart_after, optimize=optimize)
+                latencies.append(time.perf_counter() - start)
+                found += bool(legs)
+            results[f'{optimize}_found'] = found
+            results.update({f'{optimize}_{key}': value for key, value in latency_summary(latencies).items()})
+
+    return {
+        'connections': len(timetable.connections),
+        'build_ms': round(build_elapsed * 1000, 2),
+        'queries': requests,
+        **results,
+    }
+
+@scenario('availability_calendar')
+def availability_calendar(requests=50, schedules=1_000_000, **options):
+    """
+    Compare per-route DISTINCT date queries (the old available_dates path,
+    run once per route) with one read of the maintained availability calendar
+    """
+    from .availability_calendar import AvailabilityCalendar
+
+    with benchmark_network(schedules=schedules) as (routes, first_day, days):
+        start = time.perf_counter()
+        AvailabilityCalendar.rebuild()
+        rebuild_elapsed = time.perf_counter() - start
+
+        today = timezone.now().date()
+        old_latencies = []
+        for _ in range(max(requests // 10, 1)):
+            start = time.perf_counter()
+            for route in routes:
+                list(Schedule.objects.filter(
+                    route_id=route.id,
+                    is_active=True,
+                    departure_time__date__gte=today,
+                    available_seats__gt=0
+                ).values_list('departure_time__date', flat=True).distinct().order_by('departure_time__date'))
+            old_latencies.append(time.perf_counter() - start)
+
+        new_latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            AvailabilityCalendar.calendar(days=90)
+            new_latencies.append(time.perf_counter() - start)
+
+        AvailabilityCalendar.rebuild()
+
+    return {
+        'routes': len(routes),
+        'rebuild_ms': round(rebuild_elapsed * 1000, 2),
+        **{f'per_route_{key}': value for key, value in latency_summary(old_latencies).items()},
+        **{f'calendar_{key}': value for key, value in latency_summary(new_latencies).items()},
+    }
+
+@scenario('flexible_search')
+def flexible_search(requests=100, schedules=1_000_000, **options):
+    """
+    Compare seven per-day schedule searches (date +/- 3 days) with one
+    flexible-date search over the cached availability matrix
+    """
+    import random
+    from .availability_calendar import AvailabilityCalendar
+    from .search_cache import SearchCache
+    from .search_service import ScheduleSearchService
+
+    with benchmark_network(schedules=schedules) as (routes, first_day, days):
+        AvailabilityCalendar.rebuild()
+        rng = random.Random(3)
+        queries = [
+            (route.origin, route.destination, first_day + timedelta(days=rng.randrange(3, max(days, 4))))
+            for route in rng.choices(routes, k=requests)
+        ]
+
+        per_day_latencies = []
+        for origin, destination, center in queries:
+            start = time.perf_counter()
+            for shift in range(-3, 4):
+                ScheduleSearchService.search(origin, destination, date=(center + timedelta(days=shift)).isoformat())
+            per_day_latencies.append(time.perf_counter() - start)
+
+        flexible_latencies = []
+        for origin, destination, center in queries:
+            start = time.perf_counter()
+            SearchCache.flexible_search(origin, destination, date=center.isoformat(), flex_days=3)
+            flexible_latencies.append(time.perf_counter() - start)
+
+        AvailabilityCalendar.rebuild()
+
+    return {
+        'searches': requests,
+        **{f'per_day_{key}': value for key, value in latency_summary(per_day_latencies).items()},
+        **{f'flexible_{key}': value for key, value in latency_summary(flexible_latencies).items()},
+    }
+
+@scenario('deep_pagination')
+def deep_pagination(requests=20, schedules=1_000_000, **options):
+    """
+    Fetch a page of schedules deep into the list with OFFSET plus COUNT(*)
+    (page-number pagination) and with a (departure_time, id) keyset cursor
+    """
+    from django.conf import settings
+    from rest_framework.pagination import Cursor
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from .pagination import SchedulePagination
+
+    page_size = 20
+    # Next/previous links are absolute, so the request needs an allowed host
+    factory = APIRequestFactory(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+    with benchmark_network(schedules=schedules):
+        queryset = Schedule.objects.all()
+        total = queryset.count()
+        results = {}
+        for depth in (0.1, 0.5, 0.9):
+            offset = int(total * depth)
+            anchor = queryset.order_by('departure_time', 'id')[offset - 1]
+
+            paginator = SchedulePagination()
+            paginator.base_url = 'http://benchmark/'
+            cursor_url = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=paginator._position(anchor)))
+
+            offset_latencies = []
+            keyset_latencies = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                queryset.count()
+                list(queryset.order_by('departure_time', 'id')[offset:offset + page_size])
+                offset_latencies.append(time.perf_counter() - start)
+
+                request = Request(factory.get(cursor_url, {'page_size': page_size}))
+                start = time.perf_counter()
+                SchedulePagination().paginate_queryset(queryset, request)
+                keyset_latencies.append(time.perf_counter() - start)
+
+            label = f'depth_{int(depth * 100)}'
+            results[f'{label}_offset_p50_ms'] = latency_summary(offset_latencies)['p50_ms']
+            results[f'{label}_keyset_p50_ms'] = latency_summary(keyset_latencies)['p50_ms']
+
+    return {'rows': total, 'page_size': page_size, **results}
+
+@scenario('fast_serialization')
+def fast_serialization(requests=300, schedules=1_000_000, **options):
+    """
+    Serialize 100-schedule pages with the DRF serializers and with
+    FastSerializer, reporting process CPU time per row for the query plus
+    serialization and for serialization alone
+    """
+    from .fast_serializers import FastSerializer
+    from .serializers import ScheduleSerializer, SimpleScheduleSerializer
+
+    page_size = 100
+    with benchmark_network(schedules=schedules) as (routes, _, _):
+        queryset = Schedule.objects.select_related('route', 'bus').order_by('departure_time', 'id')
+        ids = list(queryset.filter(route_id__in=[route.id for route in routes]).values_list('id', flat=True))
+        pages = [ids[offset:offset + page_size] for offset in range(0, len(ids) - page_size + 1, page_size)]
+
+        def per_row_us(costs):
+            return round(sorted(costs)[len(costs) // 2] / page_size * 1_000_000, 1)
+
+        results = {}
+        for serializer_class in (SimpleScheduleSerializer, ScheduleSerializer):
+            fast = FastSerializer.for_class(serializer_class)
+            costs = {'drf_total': [], 'drf_serialize': [], 'fast_total': [], 'fast_serialize': []}
+            for i in range(requests):
+                page = queryset.filter(id__in=pages[i % len(pages)])
+
+                start = time.process_time()
+                schedules_page = list(page)
+                loaded = time.process_time()
+                serializer_class(schedules_page, many=True).data
+                done = time.process_time()
+                costs['drf_total'].append(done - start)
+                costs['drf_serialize'].append(done - loaded)
+
+                start = time.process_time()
+                rows = list(fast.project(page))
+                loaded = time.process_time()
+                fast.render(rows)
+                done = time.process_time()
+                costs['fast_total'].append(done - start)
+                costs['fast_serialize'].append(done - loaded)
+
+            label = serializer_class.__name__
+            for key, values in costs.items():
+                results[f'{label}_{key}_us_per_row'] = per_row_us(values)
+            results[f'{label}_serialize_speedup'] = round(
+                per_row_us(costs['drf_serialize']) / max(per_row_us(costs['fast_serialize']), 0.1), 1
+            )
+
+    return {'rows': len(ids), 'page_size': page_size, 'requests': requests, **results}
+
+@scenario('json_rendering')
+def json_rendering(requests=300, **options):
+    """
+    Render and parse 100-schedule search and list payloads with DRF's
+    stdlib JSONRenderer/JSONParser, the orjson-backed FastJSONRenderer/
+    FastJSONParser and (when msgpack is installed) MessagePackRenderer
+    """
+    import io
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from .fast_serializers import FastSerializer
+    from .renderers import FastJSONParser, FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+    from .serializers import ScheduleSerializer, SimpleScheduleSerializer
+
+    renderers = {'stdlib': JSONRenderer(), 'fast': FastJSONRenderer()}
+    if msgpack is not None:
+        renderers['msgpack'] = MessagePackRenderer()
+    parsers = {'stdlib': JSONParser(), 'fast': FastJSONParser()}
+
+    # Rendering cost does not depend on the network size, 100 rows are enough
+    with benchmark_network(schedules=1_000) as (routes, _, _):
+        queryset = Schedule.objects.filter(route_id__in=[route.id for route in routes]).order_by('departure_time', 'id')[:100]
+        payloads = {
+            'search': SimpleScheduleSerializer(queryset.select_related('route', 'bus'), many=True).data,
+            'list': FastSerializer.for_class(ScheduleSerializer).serialize(queryset),
+        }
+
+        results = {'orjson': orjson is not None, 'msgpack': msgpack is not None}
+        for payload_name, payload in payloads.items():
+            body = renderers['stdlib'].render(payload)
+            for name, renderer in renderers.items():
+                latencies = []
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    rendered = renderer.render(payload)
+                    latencies.append(time.perf_counter() - start)
+                results[f'{payload_name}_render_{name}_p50_ms'] = latency_summary(latencies)['p50_ms']
+                results[f'{payload_name}_{name}_bytes'] = len(rendered)
+            for name, parser in parsers.items():
+                latencies = []
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    parser.parse(io.BytesIO(body))
+                    latencies.append(time.perf_counter() - start)
+                results[f'{payload_name}_parse_{name}_p50_ms'] = latency_summary(latencies)['p50_ms']
+
+    return results
+
+@scenario('booking_events')
+def booking_events(requests=2000, **options):
+    """
+    Hold one asynchronous status stream per booking for many pending
+    bookings on a single event loop, confirm them all with one bulk
+    update, wake the hub (as a save in this process does) and time how
+    long each stream takes to receive the change
+    """
+    import asyncio
+    from .booking_events import astream, booking_status_hub, status_snapshot
+
+    with benchmark_schedule(total_seats=60) as schedule:
+        tag = uuid.uuid4().hex[:6].upper()
+        Booking.objects.bulk_create([
+            Booking(
+                schedule=schedule,
+                booking_reference=f'EV{tag}{i:06d}',
+                passenger_name=f'Event Passenger {i}',
+                passenger_email=f'events{i}@example.com',
+                passenger_phone='083 123 4567',
+                total_amount_zar=Decimal('0.00'),
+                status='pending_payment',
+            )
+            for i in range(requests)
+        ])
+        bookings = list(Booking.objects.filter(schedule=schedule))
+
+        async def run():
+            streams = [astream(booking.id, status_snapshot(booking)) for booking in bookings]
+            # Consume the initial event so every stream is subscribed
+            for events in streams:
+                await events.__anext__()
+
+            async def wait_for_change(events):
+                async for chunk in events:
+                    if chunk.startswith(b'event: status'):
+                        return time.perf_counter()
+
+            waiting = [asyncio.create_task(wait_for_change(events)) for events in streams]
+            await asyncio.sleep(0.1)
+            start = time.perf_counter()
+            await asyncio.to_thread(
+                lambda: Booking.objects.filter(id__in=[booking.id for booking in bookings]).update(status='confirmed')
+            )
+            booking_status_hub.wake()
+            received = await asyncio.gather(*waiting)
+            return [at - start for at in received]
+
+        latencies = asyncio.run(run())
+        Booking.objects.filter(schedule=schedule).delete()
+
+    return {
+        'streams': requests,
+        'streams_still_watched': len(booking_status_hub._waiters),
+        **latency_summary(latencies),
+    }
+
+@scenario('seat_events')
+def seat_events(requests=300, concurrency=32, seats=400, **options):
+    """
+    Hold 1000 asynchronous seat availability streams on one schedule,
+    sell seats from concurrent threads and count the events and database
+    loads it takes to keep every stream current, and how long after the
+    last sale committed each stream shows the final count
+    """
+    import asyncio
+    from .seat_events import astream, seat_availability_hub
+
+    streams_open = 1000
+    loads = []
+    load = seat_availability_hub._load
+    seat_availability_hub._load = lambda schedule_ids: loads.append(len(schedule_ids)) or load(schedule_ids)
+
+    try:
+        with benchmark_schedule(total_seats=seats) as schedule:
+            async def run():
+                streams = [astream({schedule.id: seats}) for _ in range(streams_open)]
+                for events in streams:
+                    await events.__anext__()
+                # Per stream: [events received, last count seen, when it was seen]
+                seen = [[0, seats, None] for _ in streams]
+
+                async def follow(events, state):
+                    async for chunk in events:
+                        if chunk.startswith(b'event: seats'):
+                            state[0] += 1
+                            state[1] = int(chunk.rsplit(b':', 1)[1].rstrip(b'}\n'))
+                            state[2] = time.perf_counter()
+
+                following = [asyncio.create_task(follow(events, state)) for events, state in zip(streams, seen)]
+                await asyncio.sleep(0.1)
+                def sell(i):
+                    return SeatReservationService.reserve_seats(schedule.id) and time.perf_counter()
+
+                sold, sell_seconds = await asyncio.to_thread(run_concurrently, sell, requests, concurrency)
+                sold_at = max(filter(None, sold), default=time.perf_counter())
+                final_seats = await asyncio.to_thread(
+                    lambda: Schedule.objects.get(id=schedule.id).available_seats
+                )
+                deadline = sold_at + 30
+                while any(state[1] != final_seats for state in seen) and time.perf_counter() < deadline:
+                    await asyncio.sleep(0.01)
+                for follower in following:
+                    follower.cancel()
+                await asyncio.gather(*following, return_exceptions=True)
+                for events in streams:
+                    await events.aclose()
+                return sell_seconds, seen, sold_at, final_seats
+
+            sell_seconds, seen, sold_at, final_seats = asyncio.run(run())
+    finally:
+        del seat_availability_hub._load
+
+    return {
+        'streams': streams_open,
+        'seats_sold': seats - final_seats,
+        'sell_seconds': round(sell_seconds, 2),
+        'events_per_stream_max': max(state[0] for state in seen),
+        'streams_behind': sum(state[1] != final_seats for state in seen),
+        'hub_loads': len(loads),
+        **latency_summary([max((state[2] or sold_at) - sold_at, 0) for state in seen if state[1] == final_seats]),
+    }
+
+def _old_serve_assets(path):
+    """serve_assets in urls.py as it was before the asset manifest"""
+    import mimetypes
+    import os
+    from django.conf import settings
+    from django.http import HttpResponse
+
+    for file_path in [
+        os.path.join(settings.STATIC_ROOT, 'assets', path),
+        os.path.join(settings.BASE_DIR, 'frontend', 'dist', 'assets', path),
+        os.path.join(settings.BASE_DIR, 'staticfiles', 'assets', path),
+        os.path.join(settings.STATIC_ROOT, path),
+        os.path.join(settings.BASE_DIR, 'backend', 'static', path),
+        os.path.join(settings.BASE_DIR, 'frontend', 'public', path),
+        os.path.join(settings.BASE_DIR, 'frontend', 'dist', path),
+    ]:
+        if os.path.exists(file_path):
+            mime_type, _ = mimetypes.guess_type(file_path)
+            with open(file_path, 'rb') as f:
+                content = f.read()
+            return HttpResponse(content, content_type=mime_type or 'application/octet-stream')
+
+@scenario('asset_serving')
+def asset_serving(requests=300, **options):
+    """
+    Serve a hashed Vite bundle and an image from a throwaway frontend
+    build, probing candidate paths and reading files per request as
+    before, and from the asset manifest with FileResponse and a
+    precompressed gzip variant; then revalidate the image by ETag
+    """
+    import gzip
+    import os
+    import tempfile
+    from django.test import RequestFactory, override_settings
+    from assets import AssetManifest, asset_roots, serve_asset
+
+    with tempfile.TemporaryDirectory() as base:
+        assets_dir = os.path.join(base, 'frontend', 'dist', 'assets')
+        static_dir = os.path.join(base, 'backend', 'static')
+        os.makedirs(assets_dir)
+        os.makedirs(static_dir)
+        bundle = b''.join(b'export const route%d = {origin: "Gravelotte", seats: %d};\n' % (i, i % 60) for i in range(4000))
+        for i in range(200):
+            with open(os.path.join(assets_dir, f'chunk{i}-{i:08d}.js'), 'wb') as f:
+                f.write(bundle)
+            with open(os.path.join(assets_dir, f'chunk{i}-{i:08d}.js.gz'), 'wb') as f:
+                f.write(gzip.compress(bundle, compresslevel=9))
+        with open(os.path.join(static_dir, 'bus1.jpg'), 'wb') as f:
+            f.write(os.urandom(150_000))
+
+        factory = RequestFactory()
+        request = factory.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        targets = {'bundle': 'chunk7-00000007.js', 'image': 'bus1.jpg'}
+        results = {}
+
+        with override_settings(BASE_DIR=base, STATIC_ROOT=os.path.join(base, 'staticfiles'), ASSET_MANIFEST_AUTOREFRESH=False):
+            manifest = AssetManifest(asset_roots)
+            start = time.perf_counter()
+            manifest.get('')
+            results['manifest_build_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+            for name, path in targets.items():
+                for label, serve in (
+                    ('old', lambda: _old_serve_assets(path)),
+                    ('manifest', lambda: serve_asset(request, path, manifest=manifest)),
+                ):
+                    # Time to the response; a FileResponse body is then sent by the server (sendfile)
+                    latencies = []
+                    for _ in range(requests):
+                        start = time.perf_counter()
+                        response = serve()
+                        latencies.append(time.perf_counter() - start)
+                        body = b''.join(response) if response.streaming else response.content
+                        response.close()
+                    results[f'{name}_{label}_p50_ms'] = latency_summary(latencies)['p50_ms']
+                    results[f'{name}_{label}_bytes'] = len(body)
+
+            # Revalidation of a copy the browser already has
+            etag = serve_asset(request, targets['image'], manifest=manifest)['ETag']
+            revalidate = factory.get('/', HTTP_IF_NONE_MATCH=etag)
+            latencies = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = serve_asset(revalidate, targets['image'], manifest=manifest)
+                latencies.append(time.perf_counter() - start)
+            results['image_revalidate_status'] = response.status_code
+            results['image_revalidate_p50_ms'] = latency_summary(latencies)['p50_ms']
+
+    return results
+
+def _old_serve_react_app(index_path):
+    """serve_react_app in urls.py as it was before the in-memory shell"""
+    import os
+    from django.http import HttpResponse
+
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return HttpResponse(content, content_type='text/html')
+
+@scenario('spa_shell')
+def spa_shell(requests=1000, **options):
+    """
+    Serve a Vite index.html from a throwaway build by reading it per
+    request as before and from the in-memory shell (with autorefresh
+    off and on), then revalidate it by ETag
+    """
+    import os
+    import tempfile
+    from django.test import RequestFactory, override_settings
+    from assets import SpaShell, spa_shell_path, spa_shell_response
+
+    with tempfile.TemporaryDirectory() as base:
+        os.makedirs(os.path.join(base, 'frontend', 'dist'))
+        index_path = os.path.join(base, 'frontend', 'dist', 'index.html')
+        with open(index_path, 'w', encoding='utf-8') as f:
+            f.write(
+                '<!doctype html>\n<html lang="en">\n  <head>\n    <meta charset="UTF-8" />\n'
+                '    <link rel="icon" type="image/png" href="/logo.png" />\n'
+                '    <meta name="viewport" content="width=device-width, initial-scale=1.0" />\n'
+                + ''.join(f'    <meta name="description-{i}" content="Falcon Bus Lines: comfortable bus travel across Limpopo and beyond" />\n' for i in range(12))
+                + '    <title>Falcon Bus Service</title>\n'
+                '    <script type="module" crossorigin src="/assets/index-AbC12_x9.js"></script>\n'
+                '    <link rel="stylesheet" crossorigin href="/assets/index-Dx8_k2Lq.css">\n'
+                '  </head>\n  <body>\n    <div id="root"></div>\n  </body>\n</html>\n'
+            )
+
+        factory = RequestFactory()
+        request = factory.get('/routes', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        results = {}
+
+        def measure(label, serve):
+            latencies = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = serve()
+                latencies.append(time.perf_counter() - start)
+            # Sub-millisecond work: report microseconds
+            results[f'{label}_p50_us'] = round(sorted(latencies)[len(latencies) // 2] * 1_000_000, 1)
+            results[f'{label}_bytes'] = len(response.content)
+            return response
+
+        measure('old', lambda: _old_serve_react_app(index_path))
+        with override_settings(BASE_DIR=base):
+            for autorefresh in (False, True):
+                with override_settings(ASSET_MANIFEST_AUTOREFRESH=autorefresh):
+                    shell = SpaShell(spa_shell_path)
+                    label = 'shell_autorefresh' if autorefresh else 'shell'
+                    response = measure(label, lambda: spa_shell_response(request, shell))
+                    revalidate = factory.get('/routes', HTTP_IF_NONE_MATCH=response['ETag'])
+                    response = measure(f'{label}_revalidate', lambda: spa_shell_response(revalidate, shell))
+                    results[f'{label}_revalidate_status'] = response.status_code
+
+    return results
+
+@scenario('query_instrumentation')
+def query_instrumentation(requests=2000, **options):
+    """
+    Cost of the execute_wrapper query instrumentation: single-row lookups
+    with and without a QueryRecorder installed, and route list requests
+    through the middleware with sampling off and on
+    """
+    from unittest import mock
+    from django.conf import settings
+    from django.test import Client, override_settings
+    from .performance import PerformanceMonitor, query_stats
+    from .views import RouteViewSet
+
+    def p50_us(latencies):
+        return round(sorted(latencies)[len(latencies) // 2] * 1_000_000, 1)
+
+    results = {}
+    with benchmark_schedule() as schedule:
+        def lookups():
+            latencies = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                Schedule.objects.filter(id=schedule.id).values_list('available_seats', flat=True).first()
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        results['query_plain_p50_us'] = p50_us(lookups())
+        with PerformanceMonitor.instrument('benchmark') as recorder:
+            results['query_recorded_p50_us'] = p50_us(lookups())
+        results['queries_recorded'] = recorder.count
+
+        # An allowed host, and no anonymous rate limit, so every request reaches the view
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        for rate in (0, 1):
+            with override_settings(QUERY_INSTRUMENTATION_SAMPLE_RATE=rate), \
+                    mock.patch.object(RouteViewSet, 'throttle_classes', []):
+                latencies = []
+                for _ in range(requests // 10):
+                    start = time.perf_counter()
+                    response = client.get('/api/routes/')
+                    latencies.append(time.perf_counter() - start)
+                    assert response.status_code == 200, f'/api/routes/ returned {response.status_code}'
+            results[f'route_list_sample_{rate}_p50_us'] = p50_us(latencies)
+
+    query_stats.reset()
+    return results
@@ -0,0 +1,112 @@
+"""
+Booking status events for Falcon Bus Lines
+Clients waiting for PayFast to complete open one Server-Sent Events stream
+(/api/bookings/<id>/events/) instead of polling the status endpoint:
+
+    retry: 3000
+    event: status
+    data: {"booking_id": 42, "status": "payment_processing", ...}
+
+The stream sends the current status straight away, then every change,
+and ends once the booking leaves the waiting statuses (pending payment
+or payment processing).
+
+Status changes go through a PollingHub (see event_streams.py) keyed by
+booking id: one query per BOOKING_EVENTS_POLL_SECONDS loads every watched
+booking, and booking saves in this process (PayFast notifications,
+confirmations, cancellations) wake it as soon as their transaction
+commits. Bulk status updates (group payments, automatic confirmation,
+hold expiry) fire no post_save, so they call bookings_changed()
+themselves. Streams end after BOOKING_EVENTS_MAX_SECONDS.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from . import event_streams
+
+STATUS_MESSAGES = {
+    'pending': 'Booking created, awaiting payment',
+    'payment_processing': 'Payment received, awaiting confirmation from PayFast',
+    'confirmed': 'Payment confirmed! Your ticket is ready for download',
+    'cancelled': 'Booking has been cancelled',
+    'completed': 'Journey completed',
+    'refunded': 'Booking refunded',
+    'expired': 'Seat hold expired before payment was completed'
+}
+
+# Statuses a client is still waiting to see change
+WAITING_STATUSES = {'pending_payment', 'payment_processing'}
+
+SNAPSHOT_FIELDS = ('id', 'booking_reference', 'status', 'payfast_payment_status', 'payment_date')
+
+def status_snapshot(booking):
+    """Booking status and payment information, as served by the status endpoint"""
+    return {
+        'booking_id': booking.id,
+        'booking_reference': booking.booking_reference,
+        'status': booking.status,
+        'payfast_payment_status': booking.payfast_payment_status,
+        'payment_date': booking.payment_date,
+        'can_download_ticket': booking.status == 'confirmed',
+        'status_message': STATUS_MESSAGES.get(booking.status, f'Status: {booking.status}')
+    }
+
+class BookingStatusHub(event_streams.PollingHub):
+    """Status snapshots of watched bookings, keyed by booking id"""
+
+    thread_name = 'booking-status-hub'
+
+    @property
+    def poll_seconds(self):
+        return settings.BOOKING_EVENTS_POLL_SECONDS
+
+    def _load(self, booking_ids):
+        from .models import Booking
+
+        snapshots = {}
+        for start in range(0, len(booking_ids), 1000):
+            chunk = booking_ids[start:start + 1000]
+            for booking in Booking.objects.filter(id__in=chunk).only(*SNAPSHOT_FIELDS):
+                snapshots[booking.id] = status_snapshot(booking)
+        return snapshots
+
+booking_status_hub = BookingStatusHub()
+
+def _render(changes):
+    # One booking per stream: the delta is its whole snapshot
+    snapshot, = changes.values()
+    return event_streams.sse_event('status', snapshot)
+
+def _finished(sent):
+    snapshot, = sent.values()
+    return snapshot['status'] not in WAITING_STATUSES
+
+def stream(booking_id, snapshot):
+    """SSE byte chunks for a booking, waiting on a thread (WSGI)"""
+    return event_streams.stream(
+        booking_status_hub, {booking_id: snapshot}, _render, _finished,
+        settings.BOOKING_EVENTS_HEARTBEAT_SECONDS, settings.BOOKING_EVENTS_MAX_SECONDS
+    )
+
+def astream(booking_id, snapshot):
+    """SSE byte chunks for a booking, waiting on the event loop (ASGI)"""
+    return event_streams.astream(
+        booking_status_hub, {booking_id: snapshot}, _render, _finished,
+        settings.BOOKING_EVENTS_HEARTBEAT_SECONDS, settings.BOOKING_EVENTS_MAX_SECONDS
+    )
+
+def bookings_changed(booking_ids):
+    """Push new statuses of these bookings once the current transaction commits"""
+    if any(booking_status_hub.watching(booking_id) for booking_id in booking_ids):
+        transaction.on_commit(booking_status_hub.wake)
+
+def _booking_saved(sender, instance, **kwargs):
+    bookings_changed([instance.id])
+
+def connect_signals():
+    """Push status changes saved in this process at once (called from TransportConfig.ready)"""
+    from .models import Booking
+
+    post_save.connect(_booking_saved, sender=Booking, dispatch_uid='booking_events_post_save')
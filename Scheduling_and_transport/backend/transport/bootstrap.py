@@ -0,0 +1,100 @@
+"""
+Bootstrap document for the booking app's first paint
+Instead of fetching routes, contact info, FAQs and each route's available
+dates separately, the app loads /api/bootstrap/ once:
+
+    {
+        "routes": [...],              active routes (RouteSerializer)
+        "contact_info": {...},        ContactInfoSerializer, or null
+        "faqs": [...],                active FAQs in display order
+        "available_dates": {"<route id>": ["YYYY-MM-DD", ...]}
+    }
+
+The rendered JSON and its gzip encoding are cached under the versions of
+everything the document is built from: the Route, ContactInfo and FAQ
+stamps (see conditional.py), the search cache availability version and
+today's date. A request is answered from the cache without touching the
+database until one of those changes. The ETag is a hash of the document
+body rather than of the versions, so a rebuild that produces the same
+document (e.g. a booking that leaves every date available) keeps
+clients' copies valid, and the cache lifetime can stay short where the
+cache is not shared between processes.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+import gzip
+import hashlib
+import logging
+
+from .conditional import ResourceVersions
+from .search_cache import SearchCache
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_KEY = 'bootstrap:document:{}'
+
+class BootstrapDocument:
+    """Builds and caches the /api/bootstrap/ document"""
+
+    @staticmethod
+    def _version_key():
+        from .models import ContactInfo, FAQ, Route
+
+        parts = (
+            ResourceVersions.version(Route),
+            ResourceVersions.version(ContactInfo),
+            ResourceVersions.version(FAQ),
+            SearchCache.availability_version(),
+            timezone.localdate().isoformat(),
+        )
+        return DOCUMENT_KEY.format(hashlib.sha1(repr(parts).encode('utf-8')).hexdigest())
+
+    @staticmethod
+    def build():
+        """The document as a dict, read from the database"""
+        from .models import ContactInfo, FAQ, Route, RouteAvailabilityDay
+        from .serializers import ContactInfoSerializer, FAQSerializer, RouteSerializer
+
+        routes = list(Route.objects.filter(is_active=True).order_by('name'))
+        contact_info = ContactInfo.objects.order_by('id').first()
+
+        available_dates = {str(route.id): [] for route in routes}
+        days = RouteAvailabilityDay.objects.filter(
+            route_id__in=[route.id for route in routes],
+            date__gte=timezone.localdate(),
+            seats_left__gt=0
+        ).order_by('route_id', 'date').values_list('route_id', 'date')
+        for route_id, day in days:
+            available_dates[str(route_id)].append(day.isoformat())
+
+        return {
+            'routes': RouteSerializer(routes, many=True).data,
+            'contact_info': ContactInfoSerializer(contact_info).data if contact_info else None,
+            'faqs': FAQSerializer(FAQ.objects.filter(is_active=True).order_by('order', 'question'), many=True).data,
+            'available_dates': available_dates,
+        }
+
+    @classmethod
+    def get(cls):
+        """
+        Rendered document, from the cache while nothing it is built from changed
+
+        Returns:
+            dict: 'etag', 'body' (JSON bytes) and 'gzip' (the body gzip-compressed)
+        """
+        from .renderers import FastJSONRenderer
+
+        key = cls._version_key()
+        entry = cache.get(key)
+        if entry is None:
+            body = FastJSONRenderer().render(cls.build())
+            entry = {
+                'etag': '"{}"'.format(hashlib.sha1(body).hexdigest()[:32]),
+                'body': body,
+                'gzip': gzip.compress(body, compresslevel=9),
+            }
+            cache.set(key, entry, settings.BOOTSTRAP_CACHE_TTL_SECONDS)
+            logger.info(f"Bootstrap document rebuilt ({len(body)} bytes, {len(entry['gzip'])} gzipped)")
+        return entry
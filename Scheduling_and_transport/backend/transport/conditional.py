@@ -0,0 +1,107 @@
+"""
+Conditional GET for read-mostly resources
+Routes, buses, FAQs and contact details change a few times a month but are
+fetched on every page load. Each of these models has a version stamp in
+the cache, bumped whenever one of its rows is saved or deleted, and the
+list and detail endpoints derive their ETag and Last-Modified from it:
+
+    ETag: "<hash of model version, request path and media type>"
+    Last-Modified: <time of the last change>
+
+A request whose If-None-Match (or If-Modified-Since) still matches gets a
+304 straight from the cache, without a database query or serializer run.
+Responses carry Cache-Control: no-cache so browsers always revalidate
+instead of guessing a freshness lifetime from Last-Modified.
+
+The stamp is the time of the change in nanoseconds. Like the search cache
+versions, it is bumped when the change is made and again once its
+transaction commits, and a stamp evicted from the cache restarts at the
+current time, so an old ETag can never match again. Without a shared
+cache, stamps expire after CONDITIONAL_VERSION_TTL_SECONDS so changes made
+in another process are picked up within that time.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+import hashlib
+import time
+
+VERSION_KEY = 'resource_version:{}'
+
+SECOND_NS = 1_000_000_000
+
+class ResourceVersions:
+    """Per-model version stamps for conditional GET"""
+
+    @staticmethod
+    def version(model):
+        """Current stamp of a model (nanoseconds since the epoch), creating it if missing"""
+        key = VERSION_KEY.format(model._meta.label_lower)
+        stamp = cache.get(key)
+        if stamp is None:
+            cache.add(key, time.time_ns(), settings.CONDITIONAL_VERSION_TTL_SECONDS)
+            stamp = cache.get(key)
+        return stamp
+
+    @staticmethod
+    def _bump(key):
+        previous = cache.get(key) or 0
+        # Last-Modified has one second resolution: move to a later second so a
+        # client holding the previous Last-Modified cannot get a 304
+        cache.set(key, max(time.time_ns(), (previous // SECOND_NS + 1) * SECOND_NS), settings.CONDITIONAL_VERSION_TTL_SECONDS)
+
+    @classmethod
+    def changed(cls, model):
+        """Invalidate ETags of a model now and again once the current transaction commits"""
+        key = VERSION_KEY.format(model._meta.label_lower)
+        cls._bump(key)
+        transaction.on_commit(lambda: cls._bump(key))
+
+class ConditionalGetMixin:
+    """
+    ETag and Last-Modified on list and retrieve from the model's version stamp
+
+    The ETag covers the full path (filters, pagination) and the negotiated
+    media type, so each representation gets its own tag.
+    """
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        stamp = ResourceVersions.version(self.queryset.model)
+        tag = hashlib.sha1(
+            f'{stamp}:{request.get_full_path()}:{request.accepted_media_type}'.encode('utf-8')
+        ).hexdigest()[:32]
+        etag = f'"{tag}"'
+        last_modified = stamp // SECOND_NS
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+def _model_changed(sender, **kwargs):
+    ResourceVersions.changed(sender)
+
+def connect_signals():
+    """Bump version stamps on model changes (called from TransportConfig.ready)"""
+    from .models import Bus, ContactInfo, FAQ, Route
+
+    for model in (Route, Bus, FAQ, ContactInfo):
+        post_save.connect(_model_changed, sender=model, dispatch_uid=f'conditional_{model.__name__}_save')
+        post_delete.connect(_model_changed, sender=model, dispatch_uid=f'conditional_{model.__name__}_delete')
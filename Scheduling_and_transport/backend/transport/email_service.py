@@ -151,3 +151,22 @@ Falcon Bus Lines & Beyers Busdiens Team
         except Exception as e:
             logger.error(f"Failed to send booking cancellation email for booking {booking.booking_reference}: {str(e)}")
             return False
+    
+    @staticmethod
+    def send_booking_confirmation_job(booking_id):
+        """Task body: email the confirmation for a booking, raising so failures are retried"""
+        from .models import Booking
+        
+        booking = Booking.objects.select_related('schedule__route', 'schedule__bus').get(id=booking_id)
+        if not BookingEmailService.send_booking_confirmation(booking):
+            raise Exception(f"Confirmation email for booking {booking.booking_reference} was not sent")
+    
+    @staticmethod
+    def queue_booking_confirmations(booking_ids):
+        """Queue confirmation emails as durable tasks once the current transaction commits"""
+        from .task_queue import enqueue_on_commit
+        
+        enqueue_on_commit(
+            'send_booking_confirmation',
+            [{'booking_id': booking_id} for booking_id in booking_ids]
+        )
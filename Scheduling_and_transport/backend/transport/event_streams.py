@@ -0,0 +1,215 @@
+"""
+Server-Sent Events plumbing shared by the booking status and seat
+availability streams
+
+A PollingHub fans changes of watched values (a booking's status, a
+schedule's seat count) out to every stream in the process that watches
+them. One poller thread per hub loads all watched keys in one query per
+interval and sends each stream only the values that changed since it was
+last sent, merged into one delta:
+
+    event: <name>
+    data: {"<key>": <value>, ...}
+
+so the database cost does not grow with the number of open streams and a
+burst of changes reaches a client as one event. Changes saved in this
+process wake the poller straight away; changes made elsewhere are picked
+up at the next poll.
+
+Under ASGI a waiting stream is an asyncio queue and holds no thread.
+Under WSGI each stream occupies a worker thread, which is why streams end
+after a maximum lifetime; EventSource reconnects on its own.
+"""
+
+from django.db import close_old_connections, connection
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Client reconnect delay sent at the start of every stream
+RETRY_MILLISECONDS = 3000
+
+class Waiter:
+    """One client stream: the values it was last sent and where to deliver changes"""
+
+    def __init__(self, keys, last, loop=None):
+        self.keys = tuple(keys)
+        self.last = dict(last)
+        self.loop = loop
+        self.queue = asyncio.Queue() if loop else queue.Queue()
+
+    def deliver(self, changes):
+        if self.loop is None:
+            self.queue.put(changes)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, changes)
+        except RuntimeError:
+            # Event loop already closed; the stream is gone
+            pass
+
+class PollingHub:
+    """
+    Fans changes of watched keys out to waiting streams in this process
+
+    Subclasses implement _load() and the poll_seconds property, and may set
+    coalesce_seconds to leave at least that long between loads so that
+    wake-ups during a burst of changes share one query and one event.
+    """
+
+    thread_name = 'event-stream-hub'
+    coalesce_seconds = 0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = {}
+        self._wake = threading.Event()
+        self._poller = None
+
+    @property
+    def poll_seconds(self):
+        raise NotImplementedError
+
+    def _load(self, keys):
+        """Current values of keys as a dict (keys that no longer exist are left out)"""
+        raise NotImplementedError
+
+    def subscribe(self, last, asynchronous=False):
+        """
+        Register a waiter for the keys of last, the values it has been sent
+        (call from the event loop when asynchronous)
+
+        Changes made before the call are still delivered: the next poll
+        compares against last.
+        """
+        waiter = Waiter(last, last, asyncio.get_running_loop() if asynchronous else None)
+        with self._lock:
+            for key in waiter.keys:
+                self._waiters.setdefault(key, set()).add(waiter)
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name=self.thread_name, daemon=True)
+                self._poller.start()
+        return waiter
+
+    def unsubscribe(self, waiter):
+        with self._lock:
+            for key in waiter.keys:
+                waiters = self._waiters.get(key)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[key]
+
+    def watching(self, key):
+        return key in self._waiters
+
+    def wake(self):
+        """Reload watched keys now instead of at the next poll"""
+        self._wake.set()
+
+    def publish(self, values):
+        """Send each waiter the values of its keys that differ from those it was last sent"""
+        with self._lock:
+            waiters = {waiter for key in values for waiter in self._waiters.get(key, ())}
+        for waiter in waiters:
+            changes = {
+                key: values[key] for key in waiter.keys
+                if key in values and values[key] != waiter.last.get(key)
+            }
+            if changes:
+                waiter.last.update(changes)
+                waiter.deliver(changes)
+
+    def _poll(self):
+        try:
+            while True:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                with self._lock:
+                    keys = list(self._waiters)
+                    if not keys:
+                        self._poller = None
+                        return
+                try:
+                    close_old_connections()
+                    self.publish(self._load(keys))
+                except Exception as e:
+                    logger.error(f"{self.thread_name} poll failed: {str(e)}")
+                if self.coalesce_seconds:
+                    # Wake-ups in the meantime are served by the next load
+                    time.sleep(self.coalesce_seconds)
+        finally:
+            connection.close()
+
+def sse_event(name, data):
+    """One SSE event with data rendered as JSON"""
+    from .renderers import FastJSONRenderer
+
+    return b'event: ' + name.encode('ascii') + b'\ndata: ' + FastJSONRenderer().render(data) + b'\n\n'
+
+def _merge(changes, more):
+    # A stream that fell behind sends one delta instead of a backlog
+    changes.update(more)
+    return changes
+
+def stream(hub, initial, render, finished, heartbeat_seconds, max_seconds):
+    """
+    SSE byte chunks, waiting on a thread (WSGI)
+
+    Args:
+        hub: PollingHub to subscribe to
+        initial: Current values of the watched keys, sent as the first event
+        render: Builds the event bytes for a dict of changed values
+        finished: Called with the values sent so far; ends the stream when it returns true
+        heartbeat_seconds: Keepalive comment interval
+        max_seconds: Stream lifetime
+    """
+    waiter = hub.subscribe(initial)
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n'.encode('ascii') + render(initial)
+        sent = dict(initial)
+        if finished(sent):
+            return
+        deadline = time.monotonic() + max_seconds
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                changes = waiter.queue.get(timeout=min(heartbeat_seconds, remaining))
+            except queue.Empty:
+                yield b': keepalive\n\n'
+                continue
+            while not waiter.queue.empty():
+                changes = _merge(changes, waiter.queue.get_nowait())
+            yield render(changes)
+            sent.update(changes)
+            if finished(sent):
+                return
+    finally:
+        hub.unsubscribe(waiter)
+
+async def astream(hub, initial, render, finished, heartbeat_seconds, max_seconds):
+    """SSE byte chunks, waiting on the event loop (ASGI); arguments as for stream()"""
+    waiter = hub.subscribe(initial, asynchronous=True)
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n'.encode('ascii') + render(initial)
+        sent = dict(initial)
+        if finished(sent):
+            return
+        deadline = time.monotonic() + max_seconds
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                changes = await asyncio.wait_for(waiter.queue.get(), min(heartbeat_seconds, remaining))
+            except asyncio.TimeoutError:
+                yield b': keepalive\n\n'
+                continue
+            while not waiter.queue.empty():
+                changes = _merge(changes, waiter.queue.get_nowait())
+            yield render(changes)
+            sent.update(changes)
+            if finished(sent):
+                return
+    finally:
+        hub.unsubscribe(waiter)
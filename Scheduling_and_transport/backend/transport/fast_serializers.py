@@ -0,0 +1,265 @@
+"""
+Fast read-only serialization for list endpoints
+DRF serializers build a tree of field objects per row and, for nested
+serializers, repeat the same route and bus conversion for every schedule.
+FastSerializer compiles a DRF serializer class once into a flat plan of
+(output key, values() lookup, converter) and then builds plain dicts from
+one projected values() query:
+
+    FastSerializer.for_class(ScheduleSerializer).serialize(Schedule.objects.filter(...))
+
+The output matches the DRF serializer's to_representation (same keys,
+order and formatting) for the field types used by this app. Nested
+objects are converted once per primary key and reused across rows.
+"""
+
+from django.utils import timezone
+from rest_framework import relations, serializers
+from rest_framework.settings import api_settings
+from decimal import Decimal
+import threading
+
+# Converters take the value and the current time zone, which render()
+# looks up once instead of once per datetime
+
+def _identity(value, tz):
+    return value
+
+def _datetime(value, tz):
+    # DRF DateTimeField with ISO_8601: current time zone, 'Z' for UTC
+    if not value:
+        return None
+    if value.utcoffset() is not None:
+        value = value.astimezone(tz)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+def _isoformat(value, tz):
+    return value.isoformat() if value is not None else None
+
+def _string(value, tz):
+    return str(value) if value is not None else None
+
+def _decimal(field):
+    # DecimalField.to_representation without the per-call settings lookup
+    coerce = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.localize or field.decimal_places is None:
+        return lambda value, tz: field.to_representation(value) if value is not None else None
+
+    def convert(value, tz):
+        if value is None:
+            return None
+        value = field.quantize(value if isinstance(value, Decimal) else Decimal(str(value)))
+        return format(value, 'f') if coerce else value
+    return convert
+
+# Fields whose values() output is already what DRF would render
+_PASSTHROUGH = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.ChoiceField, serializers.FloatField, serializers.JSONField,
+    relations.PrimaryKeyRelatedField,
+)
+
+def _converter(field):
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime
+    if isinstance(field, (serializers.DateField, serializers.TimeField)):
+        return _isoformat
+    if isinstance(field, serializers.DecimalField):
+        return _decimal(field)
+    if isinstance(field, serializers.UUIDField):
+        return _string
+    if isinstance(field, _PASSTHROUGH):
+        return _identity
+    raise TypeError(f"FastSerializer cannot render {type(field).__name__} '{field.field_name}'")
+
+def _selection(paths):
+    """
+    Tree of selected fields from dotted paths
+
+    ['id', 'route.name', 'route.origin'] -> {'id': None, 'route': {'name': None, 'origin': None}}
+    where None selects the whole field
+    """
+    tree = {}
+    for path in paths:
+        node = tree
+        *parents, leaf = path.split('.')
+        for name in parents:
+            child = node.get(name, {})
+            if child is None:
+                # The whole field is already selected
+                break
+            node = node.setdefault(name, child)
+        else:
+            node[leaf] = None
+    return tree
+
+def parse_fieldsets(query_params):
+    """
+    Sparse fieldset and sideloading options from ?fields= and ?include=
+
+    Returns:
+        tuple: (fields tuple or None, include tuple) ready for for_class()
+    """
+    def split(name):
+        value = query_params.get(name) or ''
+        return tuple(sorted({part.strip() for part in value.split(',') if part.strip()}))
+
+    return split('fields') or None, split('include')
+
+class FastSerializer:
+    """
+    Plain-dict rendering of a DRF serializer class from values() rows
+
+    fields limits the output to the given (dotted, for nested objects) field
+    names. include names nested object fields to sideload: rows then carry
+    just the object's id and render() collects each object once into a
+    top-level map, keyed by name and then by id.
+    """
+
+    MAX_VARIANTS = 256
+
+    _compiled = {}
+    _lock = threading.Lock()
+
+    def __init__(self, serializer_class, fields=None, include=()):
+        self.lookups = []
+        self.included = {}
+        serializer = serializer_class()
+        unknown = set(include) - set(serializer.fields)
+        if unknown:
+            raise ValueError(f"Cannot include {', '.join(sorted(unknown))}")
+        lists = {name for name in include if getattr(serializer.fields[name], 'many', False)}
+        if lists:
+            raise ValueError(f"Cannot include {', '.join(sorted(lists))}: a list of objects")
+        selection = _selection(fields) if fields else None
+        if selection is not None:
+            # Sideloaded objects keep their id column in the rows
+            selection.update({name: selection.get(name) for name in include})
+        # The top-level object is never shared between rows
+        entries, _ = self._compile(serializer, '', selection, include)
+        self.plan = (entries, None)
+        flat = set(include) - set(self.included)
+        if flat:
+            raise ValueError(f"Cannot include {', '.join(sorted(flat))}: not a nested object")
+
+    @classmethod
+    def for_class(cls, serializer_class, fields=None, include=()):
+        """
+        Compiled FastSerializer for a serializer class and options (built once per process)
+
+        Raises:
+            ValueError: fields or include name a field the serializer does not have,
+                a nested path into a plain field, a list of objects, or (include)
+                a field that is not a nested object
+        """
+        key = (serializer_class, fields, include)
+        compiled = cls._compiled.get(key)
+        if compiled is None:
+            compiled = cls(serializer_class, fields, include)
+            with cls._lock:
+                # Field selections come from query strings; stop remembering new ones at some point
+                if len(cls._compiled) < cls.MAX_VARIANTS or not (fields or include):
+                    compiled = cls._compiled.setdefault(key, compiled)
+        return compiled
+
+    def _lookup(self, lookup):
+        if lookup not in self.lookups:
+            self.lookups.append(lookup)
+        return lookup
+
+    def _compile(self, serializer, prefix, selection=None, include=()):
+        """
+        Plan for one (possibly nested) serializer
+
+        Returns:
+            tuple: (entries, lookup of the primary key or None); an entry is
+            (key, lookup, converter) or (key, None, nested plan)
+        """
+        fields = serializer.fields
+        if selection is not None:
+            unknown = set(selection) - {name for name, field in fields.items() if not field.write_only}
+            if unknown:
+                raise ValueError(f"Unknown field(s) {', '.join(prefix + name for name in sorted(unknown))}")
+
+        # Nested objects are memoized (and sideloaded) by primary key, selected or not
+        model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+        pk_lookup = self._lookup(prefix + model._meta.pk.name) if prefix and model else None
+
+        entries = []
+        for name, field in fields.items():
+            if field.write_only or (selection is not None and name not in selection):
+                continue
+            if getattr(field, 'many', False) and selection is not None:
+                raise ValueError(f"Field {prefix + name} is a list of objects and cannot be selected")
+            if field.source == '*' or getattr(field, 'many', False):
+                raise TypeError(f"FastSerializer cannot render '{name}' on {type(serializer).__name__}")
+            lookup = prefix + field.source.replace('.', '__')
+            if isinstance(field, serializers.BaseSerializer):
+                nested = self._compile(field, lookup + '__', selection.get(name) if selection else None)
+                if name in include:
+                    if nested[1] is None:
+                        raise ValueError(f"Cannot include {name}")
+                    self.included[name] = nested
+                    entries.append((name, nested[1], _identity))
+                else:
+                    entries.append((name, None, nested))
+            elif selection is not None and selection[name] is not None:
+                raise ValueError(f"Field {prefix + name} has no nested fields")
+            else:
+                entries.append((name, self._lookup(lookup), _converter(field)))
+
+        return entries, pk_lookup
+
+    def _build(self, plan, row, memo, tz):
+        entries, pk_lookup = plan
+        if pk_lookup is not None:
+            if row[pk_lookup] is None:
+                return None
+            key = (pk_lookup, row[pk_lookup])
+            cached = memo.get(key)
+            if cached is not None:
+                return cached
+
+        data = {}
+        for name, lookup, convert in entries:
+            if lookup is None:
+                data[name] = self._build(convert, row, memo, tz)
+            else:
+                data[name] = convert(row[lookup], tz)
+
+        if pk_lookup is not None:
+            memo[key] = data
+        return data
+
+    def project(self, queryset, *extra):
+        """The values() queryset holding every lookup this serializer needs, plus extra columns"""
+        return queryset.values(*self.lookups, *(name for name in extra if name not in self.lookups))
+
+    def render(self, rows, included=None):
+        """
+        Dicts for rows from project(); nested dicts are shared between rows, so treat them as read-only
+
+        Args:
+            rows: values() rows from project()
+            included: Dict that collects sideloaded objects as {name: {id: object}}
+                (required when the serializer was compiled with include)
+        """
+        memo = {}
+        tz = timezone.get_current_timezone()
+        data = [self._build(self.plan, row, memo, tz) for row in rows]
+
+        if self.included:
+            for name, plan in self.included.items():
+                objects = included.setdefault(name, {})
+                pk_lookup = plan[1]
+                for row in rows:
+                    if row[pk_lookup] is not None and row[pk_lookup] not in objects:
+                        objects[row[pk_lookup]] = self._build(plan, row, memo, tz)
+        return data
+
+    def serialize(self, queryset, included=None):
+        """Dicts for every object in a queryset, from one projected query"""
+        return self.render(self.project(queryset), included)
@@ -0,0 +1,193 @@
+"""
+Idempotency keys for Falcon Bus Lines
+Lets clients safely retry booking and payment requests: a request that
+carries an Idempotency-Key header is executed once, and retries with the
+same key get the stored response back instead of booking again.
+
+Keys are stored hashed together with the method, path and the client
+that sent them (the signed-in user, else the session), so one client's
+key never finds another client's response. Anonymous clients without a
+session share one scope; for them the request fingerprint still has to
+match, so a reused key with a different body gets a 422 and the stored
+response only goes to a retry of the identical request. Keys expire after
+IDEMPOTENCY_KEY_TTL_HOURS and are evicted in batches by a throttled purge.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from datetime import timedelta
+import functools
+import hashlib
+import json
+import logging
+
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+PURGE_BATCH_SIZE = 1000
+PURGE_CACHE_KEY = 'idempotency_key_purge_lock'
+PURGE_INTERVAL_SECONDS = 300
+
+def _sha256(value):
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+def request_fingerprint(request):
+    """Hash of the request body, independent of key order"""
+    try:
+        body = json.dumps(request.data, sort_keys=True, default=str)
+    except Exception:
+        body = repr(request.data)
+    return _sha256(body)
+
+def client_scope(request):
+    """Who sent the request, as far as the server knows: 'user:<id>', 'session:<key>' or 'anonymous'"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        return f'session:{session.session_key}'
+    return 'anonymous'
+
+def purge_expired_keys():
+    """
+    Delete expired idempotency keys in batches
+
+    Returns:
+        int: Number of keys deleted
+    """
+    deleted = 0
+    while True:
+        expired_ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+            .values_list('id', flat=True)[:PURGE_BATCH_SIZE]
+        )
+        if not expired_ids:
+            break
+        deleted += IdempotencyKey.objects.filter(id__in=expired_ids).delete()[0]
+        if len(expired_ids) < PURGE_BATCH_SIZE:
+            break
+
+    if deleted:
+        logger.info(f"Purged {deleted} expired idempotency key(s)")
+    return deleted
+
+def purge_expired_keys_if_due():
+    """Run the purge at most once per purge interval across workers"""
+    if not cache.add(PURGE_CACHE_KEY, True, PURGE_INTERVAL_SECONDS):
+        return 0
+    try:
+        return purge_expired_keys()
+    except Exception as e:
+        logger.error(f"Idempotency key purge failed: {str(e)}")
+        return 0
+
+def _claim_key(key_hash, fingerprint):
+    """
+    Record that a request with this key has started
+
+    Returns:
+        tuple: (IdempotencyKey or None, Response or None) - the claimed key
+        when the request should run, otherwise the response to return
+    """
+    now = timezone.now()
+    existing = IdempotencyKey.objects.filter(key_hash=key_hash).first()
+
+    if existing is not None:
+        abandoned = (
+            existing.response_status is None and
+            existing.created_at <= now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS)
+        )
+        if existing.expires_at > now and not abandoned:
+            if existing.request_fingerprint != fingerprint:
+                return None, Response({
+                    'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'
+                }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+            if existing.response_status is None:
+                return None, Response({
+                    'error': f'A request with this {IDEMPOTENCY_HEADER} is still being processed'
+                }, status=status.HTTP_409_CONFLICT)
+
+            response = Response(existing.response_body, status=existing.response_status)
+            response['Idempotent-Replayed'] = 'true'
+            return None, response
+
+        # Expired or abandoned: only the worker that deletes it may take the key over
+        if not IdempotencyKey.objects.filter(id=existing.id, created_at=existing.created_at).delete()[0]:
+            return None, Response({
+                'error': f'A request with this {IDEMPOTENCY_HEADER} is still being processed'
+            }, status=status.HTTP_409_CONFLICT)
+
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                key_hash=key_hash,
+                request_fingerprint=fingerprint,
+                expires_at=now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+            )
+    except IntegrityError:
+        # Another request with the same key got there first
+        return None, Response({
+            'error': f'A request with this {IDEMPOTENCY_HEADER} is still being processed'
+        }, status=status.HTTP_409_CONFLICT)
+
+    return record, None
+
+def idempotent(view_method):
+    """
+    Make a DRF view method honour the Idempotency-Key header
+
+    Requests without the header run as before. Successful and client-error
+    responses are stored and replayed to retries; server errors and
+    exceptions release the key so the client can retry for real.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({
+                'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        purge_expired_keys_if_due()
+
+        key_hash = _sha256(f'{client_scope(request)}:{request.method}:{request.path}:{key}')
+        record, response = _claim_key(key_hash, request_fingerprint(request))
+        if response is not None:
+            return response
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500 or not hasattr(response, 'data'):
+            record.delete()
+            return response
+
+        try:
+            IdempotencyKey.objects.filter(id=record.id).update(
+                response_status=response.status_code,
+                response_body=response.data
+            )
+        except Exception as e:
+            # The request itself succeeded; losing replay is better than failing it
+            logger.error(f"Could not store idempotent response: {str(e)}")
+            record.delete()
+
+        return response
+
+    return wrapper
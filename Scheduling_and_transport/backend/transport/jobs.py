@@ -0,0 +1,271 @@
+"""
+Background job runner for Falcon Bus Lines
+Runs in-process timed work (periodic schedule maintenance triggers, seat
+hold sweeps, draining the durable task queue) on a bounded pool of
+worker threads. Work that must survive a restart belongs in the durable
+task queue (transport.task_queue) instead.
+
+Delayed and periodic jobs wait in a timer heap watched by a single
+scheduler thread, so a thousand pending jobs cost a thousand heap
+entries, not a thousand sleeping threads. At most JOB_RUNNER_MAX_WORKERS
+jobs run at once per process; failed jobs are retried with exponential
+backoff.
+
+Usage:
+    from transport.jobs import job_runner
+    job_runner.submit(func, arg, delay=5, retries=3)
+    job_runner.every(3600, func, name='hourly-cleanup')
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from django.conf import settings
+from django.db import close_old_connections, connections
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class JobQueueFull(Exception):
+    """Raised when more jobs are pending than JOB_RUNNER_MAX_PENDING allows"""
+
+class Job:
+    """A unit of background work and its retry / repeat policy"""
+
+    def __init__(self, func, args=(), kwargs=None, name=None, retries=0, retry_delay=5, interval=None):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.name = name or getattr(func, '__name__', 'job')
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.interval = interval
+        self.attempts = 0
+
+    def __repr__(self):
+        return f"<Job {self.name} attempt {self.attempts}>"
+
+class JobRunner:
+    """Bounded thread pool with a timer heap for delayed, retried and periodic jobs"""
+
+    def __init__(self, max_workers=None, max_pending=None):
+        self.max_workers = max_workers or settings.JOB_RUNNER_MAX_WORKERS
+        self.max_pending = max_pending or settings.JOB_RUNNER_MAX_PENDING
+        self._reset_state()
+
+    def _reset_state(self):
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._executor = None
+        self._scheduler = None
+        self._running = False
+        self._periodic_names = set()
+
+    def reset(self):
+        """Drop all state (called in forked child processes, where threads do not survive)"""
+        self._reset_state()
+
+    @property
+    def pending(self):
+        """Number of jobs waiting in the timer heap"""
+        return len(self._heap)
+
+    def start(self):
+        """Start the scheduler thread and worker pool (idempotent)"""
+        with self._condition:
+            if self._running:
+                return
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='transport-job'
+            )
+            self._scheduler = threading.Thread(
+                target=self._schedule_loop,
+                name='transport-job-scheduler',
+                daemon=True
+            )
+            self._running = True
+            self._scheduler.start()
+        logger.info(f"Job runner started with {self.max_workers} worker(s)")
+
+    def shutdown(self, wait=True):
+        """Stop dispatching jobs; one-off jobs still waiting in the heap are dropped"""
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            dropped = sum(1 for _, _, job in self._heap if job.interval is None)
+            self._heap.clear()
+            self._periodic_names.clear()
+            self._condition.notify_all()
+        self._scheduler.join()
+        self._executor.shutdown(wait=wait)
+        if dropped:
+            logger.warning(f"Job runner stopped with {dropped} pending job(s) dropped")
+
+    def submit(self, func, *args, delay=0, retries=0, retry_delay=5, name=None, **kwargs):
+        """
+        Run func(*args, **kwargs) in the background
+
+        Args:
+            func: Callable to run
+            delay: Seconds to wait before running (default: run as soon as a worker is free)
+            retries: Times to retry if func raises (backoff doubles from retry_delay)
+            retry_delay: Seconds before the first retry
+            name: Label used in logs (default: function name)
+
+        Returns:
+            Job: The queued job
+
+        Raises:
+            JobQueueFull: Too many jobs are already pending
+        """
+        job = Job(func, args, kwargs, name=name, retries=retries, retry_delay=retry_delay)
+        self._push(job, time.monotonic() + delay)
+        return job
+
+    def every(self, interval_seconds, func, *args, first_delay=None, name=None, **kwargs):
+        """
+        Run func every interval_seconds until the runner stops
+
+        A periodic job is registered once per name, so calling this again
+        for the same name has no effect.
+
+        Args:
+            interval_seconds: Seconds between runs
+            func: Callable to run
+            first_delay: Seconds before the first run (default: interval_seconds)
+            name: Label used in logs and for de-duplication
+
+        Returns:
+            Job or None: The periodic job, or None if already registered
+        """
+        job = Job(func, args, kwargs, name=name, interval=interval_seconds)
+        with self._condition:
+            if job.name in self._periodic_names:
+                return None
+            self._periodic_names.add(job.name)
+        delay = interval_seconds if first_delay is None else first_delay
+        self._push(job, time.monotonic() + delay, force=True)
+        return job
+
+    def _push(self, job, run_at, force=False):
+        if not self._running:
+            self.start()
+        with self._condition:
+            if not force and len(self._heap) >= self.max_pending:
+                raise JobQueueFull(f"Job queue is full ({self.max_pending} pending), refusing {job.name}")
+            heapq.heappush(self._heap, (run_at, next(self._sequence), job))
+            self._condition.notify()
+
+    def _schedule_loop(self):
+        """Hand due jobs to the pool, never more than max_workers at a time"""
+        while True:
+            with self._condition:
+                while self._running:
+                    now = time.monotonic()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    timeout = self._heap[0][0] - now if self._heap else None
+                    self._condition.wait(timeout)
+                if not self._running:
+                    return
+                _, _, job = heapq.heappop(self._heap)
+
+            # Waits here while every worker is busy; the job stays claimed meanwhile
+            self._slots.acquire()
+            try:
+                self._executor.submit(self._run, job)
+            except RuntimeError:
+                # Executor already shut down
+                self._slots.release()
+                return
+
+    def _run(self, job):
+        job.attempts += 1
+        close_old_connections()
+        try:
+            job.func(*job.args, **job.kwargs)
+        except Exception as e:
+            if job.interval is None and job.attempts <= job.retries:
+                backoff = job.retry_delay * 2 ** (job.attempts - 1)
+                logger.warning(f"Job {job.name} failed (attempt {job.attempts}), retrying in {backoff}s: {str(e)}")
+                self._requeue(job, backoff)
+            else:
+                logger.error(f"Job {job.name} failed after {job.attempts} attempt(s): {str(e)}", exc_info=True)
+        finally:
+            connections.close_all()
+            self._slots.release()
+
+        if job.interval is not None:
+            self._requeue(job, job.interval)
+
+    def _requeue(self, job, delay):
+        if not self._running:
+            return
+        try:
+            self._push(job, time.monotonic() + delay, force=True)
+        except Exception as e:
+            logger.error(f"Could not requeue job {job.name}: {str(e)}")
+
+def seconds_until(hour, minute=0):
+    """Seconds from now until the next occurrence of hour:minute server time"""
+    now = datetime.now()
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+def run_daily_maintenance():
+    """Periodic job: queue today's schedule maintenance and task cleanup once across all processes"""
+    from .task_queue import enqueue
+
+    today = date.today().isoformat()
+    logger.info("🤖 Queueing automated daily schedule maintenance...")
+    enqueue('maintain_schedules', {'days_ahead': 90}, dedupe_key=f'maintain-schedules-{today}')
+    enqueue('purge_finished_tasks', dedupe_key=f'purge-finished-tasks-{today}')
+
+def run_hold_sweep():
+    """Periodic job: return seats from expired unpaid holds"""
+    from .reservation_service import SeatReservationService
+
+    SeatReservationService.release_expired_holds_if_due()
+
+def register_periodic_jobs(runner=None):
+    """Schedule daily maintenance (2 AM) and the seat hold sweeper on the runner"""
+    runner = runner or job_runner
+    runner.every(
+        24 * 60 * 60,
+        run_daily_maintenance,
+        first_delay=seconds_until(2),
+        name='daily-schedule-maintenance'
+    )
+    runner.every(
+        settings.SEAT_HOLD_SWEEP_INTERVAL_SECONDS,
+        run_hold_sweep,
+        name='seat-hold-sweep'
+    )
+    logger.info("🕐 Periodic jobs scheduled (maintenance at 2 AM, seat hold sweep)")
+
+def register_task_queue_drain(runner=None):
+    """Let this process run due durable tasks itself (when no run_task_workers is deployed)"""
+    from .task_queue import drain_task_queue
+
+    runner = runner or job_runner
+    runner.every(
+        settings.TASK_QUEUE_POLL_SECONDS,
+        drain_task_queue,
+        first_delay=0,
+        name='task-queue-drain'
+    )
+
+job_runner = JobRunner()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=job_runner.reset)
@@ -0,0 +1,403 @@
+"""
+Multi-leg journey planner for Falcon Bus Lines
+Finds connecting journeys across routes (e.g. Phalaborwa -> Pretoria ->
+Potchefstroom) with the Connection Scan Algorithm (CSA).
+
+Every active future schedule is one connection: a bus leaving one place
+at a time and reaching another. Connections are held in memory sorted by
+departure, so a query scans forward from the requested time once:
+
+- earliest arrival: the classic CSA scan, keeping the earliest known
+  arrival per place and number of legs
+- cheapest: the same scan keeping, per place and number of legs so far,
+  the cheapest arrival that is already reachable (a min-heap per place
+  releases arrivals once the transfer time has passed)
+
+A change of bus needs JOURNEY_MIN_TRANSFER_MINUTES between arriving and
+departing. Seats are not kept in the timetable; the legs of a result are
+checked against the database and a full leg is excluded before searching
+again.
+
+The timetable is built on first use. Schedule and route changes bump a
+version in the cache and the next query refreshes incrementally: only
+rows that are new or updated since the last refresh are reloaded.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from collections import namedtuple
+import bisect
+import heapq
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'journey_timetable_version'
+
+OPTIMIZE_CHOICES = ('earliest', 'cheapest')
+
+# Rows saved by other servers carry their clocks; reload a little before the last refresh
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+# Times are POSIX timestamps so comparisons in the scan are plain float compares
+Connection = namedtuple('Connection', [
+    'departure', 'arrival', 'from_place', 'to_place', 'schedule_id', 'route_id', 'price',
+])
+
+class Timetable:
+    """All active future schedules as connections sorted by departure time"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.connections = []
+        self.departures = []
+        self.by_schedule = {}
+        self.routes = {}
+        self.places = {}
+        self._version = None
+        self._loaded_at = None
+
+    def _load(self, schedule_filter=None):
+        """Connections for active future schedules, optionally narrowed by a filter"""
+        from .models import Place, Route, Schedule
+
+        schedules = Schedule.objects.filter(is_active=True, departure_time__gte=timezone.now())
+        if schedule_filter is not None:
+            schedules = schedules.filter(schedule_filter)
+
+        routes = {
+            row['id']: row for row in Route.objects.values(
+                'id', 'name', 'origin_place_id', 'destination_place_id'
+            )
+        }
+        places = dict(Place.objects.values_list('id', 'name'))
+
+        connections = {}
+        for schedule_id, route_id, departure, arrival, price in schedules.values_list(
+            'id', 'route_id', 'departure_time', 'arrival_time', 'price_zar'
+        ):
+            route = routes.get(route_id)
+            if route is None or route['origin_place_id'] is None or route['destination_place_id'] is None:
+                continue
+            connections[schedule_id] = Connection(
+                departure.timestamp(),
+                arrival.timestamp(),
+                route['origin_place_id'],
+                route['destination_place_id'],
+                schedule_id,
+                route_id,
+                price,
+            )
+        return connections, routes, places
+
+    def _install(self, by_schedule, routes, places, version, loaded_at):
+        connections = sorted(by_schedule.values())
+        with self._lock:
+            self.by_schedule = by_schedule
+            self.connections = connections
+            self.departures = [connection.departure for connection in connections]
+            self.routes = routes
+            self.places = places
+            self._version = version
+            self._loaded_at = loaded_at
+
+    def rebuild(self):
+        """Load the whole timetable from the database"""
+        version = cache.get(VERSION_CACHE_KEY, 0)
+        loaded_at = timezone.now()
+        by_schedule, routes, places = self._load()
+        self._install(by_schedule, routes, places, version, loaded_at)
+        logger.info(f"Journey timetable built with {len(by_schedule)} connection(s)")
+
+    def refresh(self):
+        """
+        Bring the timetable up to date without reloading every schedule
+
+        Drops schedules that departed or no longer exist and reloads only
+        those created or updated since the last refresh.
+        """
+        from django.db.models import Q
+        from .models import Schedule
+
+        if self._loaded_at is None:
+            return self.rebuild()
+
+        version = cache.get(VERSION_CACHE_KEY, 0)
+        loaded_at = timezone.now()
+        current_ids = set(
+            Schedule.objects.filter(is_active=True, departure_time__gte=loaded_at).values_list('id', flat=True)
+        )
+        known = {
+            schedule_id: connection for schedule_id, connection in self.by_schedule.items()
+            if schedule_id in current_ids
+        }
+        unseen = current_ids - known.keys()
+
+        changed, routes, places = self._load(Q(updated_at__gte=self._loaded_at - REFRESH_OVERLAP))
+        unseen -= changed.keys()
+        if unseen:
+            # Rows switched back on by bulk updates that left updated_at alone
+            changed.update(self._load(Q(id__in=unseen))[0])
+        known.update(changed)
+
+        # A route may now run between other places; re-point its connections
+        for schedule_id, connection in list(known.items()):
+            route = routes.get(connection.route_id)
+            if route is None or route['origin_place_id'] is None or route['destination_place_id'] is None:
+                del known[schedule_id]
+            elif (route['origin_place_id'], route['destination_place_id']) != (connection.from_place, connection.to_place):
+                known[schedule_id] = connection._replace(
+                    from_place=route['origin_place_id'], to_place=route['destination_place_id']
+                )
+
+        self._install(known, routes, places, version, loaded_at)
+        logger.info(f"Journey timetable refreshed: {len(changed)} connection(s) reloaded, {len(known)} total")
+
+    def ensure_fresh(self):
+        """Refresh if schedules or routes changed anywhere since the last load"""
+        with self._lock:
+            if self._loaded_at is None:
+                self.rebuild()
+            elif cache.get(VERSION_CACHE_KEY, 0) != self._version:
+                self.refresh()
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def first_index(self, timestamp):
+        """Index of the first connection departing at or after timestamp"""
+        return bisect.bisect_left(self.departures, timestamp)
+
+journey_timetable = Timetable()
+
+class JourneyPlanner:
+    """Earliest-arrival and cheapest journeys over a Timetable"""
+
+    def __init__(self, timetable=None, min_transfer_minutes=None, max_legs=None, search_days=None):
+        self.timetable = timetable or journey_timetable
+        self.min_transfer = 60 * (
+            settings.JOURNEY_MIN_TRANSFER_MINUTES if min_transfer_minutes is None else min_transfer_minutes
+        )
+        self.max_legs = max_legs or settings.JOURNEY_MAX_LEGS
+        self.search_window = 86400 * (search_days or settings.JOURNEY_SEARCH_DAYS)
+
+    def _scan(self, start_time):
+        """Connections departing within the search window, in departure order"""
+        connections = self.timetable.connections
+        end_time = start_time + self.search_window
+        for index in range(self.timetable.first_index(start_time), len(connections)):
+            connection = connections[index]
+            if connection.departure > end_time:
+                break
+            yield connection
+
+    def earliest_arrival(self, origins, destinations, start_time, excluded=()):
+        """
+        Journey reaching any destination place as early as possible
+
+        Arrivals are kept per place and leg count (earliest arrival using at
+        most that many buses), so a fast arrival that used up the leg limit
+        never hides a slower one that can still connect onwards.
+
+        Returns:
+            list: Connections of the journey in order (empty if none)
+        """
+        unreached = [float('inf')] * (self.max_legs + 1)
+        ready_at = [start_time - self.min_transfer] * (self.max_legs + 1)
+        arrival_at = {place: list(ready_at) for place in origins}
+        reached_by = {}
+        best_arrival = float('inf')
+        best_place = None
+
+        for connection in self._scan(start_time):
+            if connection.departure >= best_arrival:
+                break
+            if connection.schedule_id in excluded:
+                continue
+            arrivals = arrival_at.get(connection.from_place)
+            if arrivals is None:
+                continue
+            # Fewest legs that reach the departure place in time to change buses
+            latest = connection.departure - self.min_transfer
+            legs = next((k for k in range(self.max_legs) if arrivals[k] <= latest), None)
+            if legs is None:
+                continue
+
+            onward = arrival_at.setdefault(connection.to_place, list(unreached))
+            for k in range(legs + 1, self.max_legs + 1):
+                if connection.arrival < onward[k]:
+                    onward[k] = connection.arrival
+                    reached_by[connection.to_place, k] = (connection, legs)
+
+            if connection.to_place in destinations and connection.arrival < best_arrival:
+                best_arrival = connection.arrival
+                best_place = connection.to_place
+
+        return self._trace(reached_by, best_place, self.max_legs)
+
+    @staticmethod
+    def _trace(reached_by, place, legs):
+        journey = []
+        # Origins are never in reached_by: nothing arrives before the start time
+        while (place, legs) in reached_by:
+            connection, legs = reached_by[place, legs]
+            journey.append(connection)
+            place = connection.from_place
+        return list(reversed(journey))
+
+    def cheapest(self, origins, destinations, start_time, excluded=()):
+        """
+        Cheapest journey to any destination place, ties going to fewer legs
+        then earlier arrival
+
+        Returns:
+            list: Connections of the journey in order (empty if none)
+        """
+        # Per place: heap of (ready_time, cost, legs, tiebreak, journey) not yet usable,
+        # and the cheapest usable arrival per leg count
+        pending = {}
+        ready = {}
+        best = None
+        tiebreak = 0
+
+        for connection in self._scan(start_time):
+            if connection.schedule_id in excluded:
+                continue
+
+            options = []
+            if connection.from_place in origins:
+                options.append((Decimal('0'), 0, ()))
+
+            heap = pending.get(connection.from_place)
+            released = ready.setdefault(connection.from_place, {})
+            while heap and heap[0][0] <= connection.departure:
+                _, cost, legs, _, journey = heapq.heappop(heap)
+                if legs not in released or cost < released[legs][0]:
+                    released[legs] = (cost, journey)
+            options.extend((cost, legs, journey) for legs, (cost, journey) in released.items())
+
+            for cost, legs, journey in options:
+                if legs + 1 > self.max_legs:
+                    continue
+                total = cost + connection.price
+                extended = journey + (connection,)
+                if connection.to_place in destinations:
+                    candidate = (total, legs + 1, connection.arrival)
+                    if best is None or candidate < best[0]:
+                        best = (candidate, extended)
+                elif legs + 1 < self.max_legs:
+                    tiebreak += 1
+                    heapq.heappush(
+                        pending.setdefault(connection.to_place, []),
+                        (connection.arrival + self.min_transfer, total, legs + 1, tiebreak, extended)
+                    )
+
+        return list(best[1]) if best else []
+
+    def plan(self, origins, destinations, start_time, optimize='earliest', passengers=1, max_attempts=5):
+        """
+        Best journey with enough free seats on every leg
+
+        Args:
+            origins: Place IDs the traveller can start from
+            destinations: Place IDs the traveller wants to reach
+            start_time: Earliest departure (aware datetime)
+            optimize: 'earliest' or 'cheapest'
+            passengers: Seats needed on every leg
+            max_attempts: Searches before giving up when legs keep turning out full
+
+        Returns:
+            list: Legs as dicts with current seats and price (empty if no journey)
+        """
+        from .models import Schedule
+
+        self.timetable.ensure_fresh()
+        origins, destinations = set(origins), set(destinations)
+        search = self.earliest_arrival if optimize == 'earliest' else self.cheapest
+        excluded = set()
+
+        for _ in range(max_attempts):
+            with self.timetable._lock:
+                journey = search(origins, destinations, start_time.timestamp(), excluded)
+            if not journey:
+                return []
+
+            current = {
+                schedule_id: (seats, price) for schedule_id, seats, price in Schedule.objects.filter(
+                    id__in=[connection.schedule_id for connection in journey], is_active=True
+                ).values_list('id', 'available_seats', 'price_zar')
+            }
+            full = {
+                connection.schedule_id for connection in journey
+                if current.get(connection.schedule_id, (0, None))[0] < passengers
+            }
+            if not full:
+                return [self._describe(connection, *current[connection.schedule_id]) for connection in journey]
+            excluded |= full
+
+        return []
+
+    def _describe(self, connection, available_seats, price):
+        route = self.timetable.routes[connection.route_id]
+        return {
+            'schedule_id': connection.schedule_id,
+            'route_id': connection.route_id,
+            'route_name': route['name'],
+            'origin': self.timetable.places.get(connection.from_place),
+            'destination': self.timetable.places.get(connection.to_place),
+            'departure_time': datetime.fromtimestamp(connection.departure, tz=dt_timezone.utc),
+            'arrival_time': datetime.fromtimestamp(connection.arrival, tz=dt_timezone.utc),
+            'price_zar': price,
+            'available_seats': available_seats,
+        }
+
+def summarize_journey(legs, optimize):
+    """Journey totals for the API response"""
+    if not legs:
+        return None
+    departure = legs[0]['departure_time']
+    arrival = legs[-1]['arrival_time']
+    return {
+        'optimize': optimize,
+        'departure_time': departure,
+        'arrival_time': arrival,
+        'duration_minutes': int((arrival - departure).total_seconds() // 60),
+        'transfers': len(legs) - 1,
+        'total_price_zar': sum((leg['price_zar'] for leg in legs), Decimal('0.00')),
+        'legs': legs,
+    }
+
+def _incr_version():
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 1, None)
+
+def timetable_changed():
+    """Mark every process's timetable stale, now and again once the transaction commits"""
+    _incr_version()
+    transaction.on_commit(_incr_version)
+
+def refresh_after_maintenance():
+    """Called after a schedule maintenance run; refreshes this process's timetable if loaded"""
+    timetable_changed()
+    if journey_timetable.loaded:
+        journey_timetable.ensure_fresh()
+
+def _schedules_changed(sender, instance, **kwargs):
+    timetable_changed()
+
+def connect_signals():
+    """Mark the timetable stale on schedule and route changes (called from TransportConfig.ready)"""
+    from .models import Route, Schedule
+
+    for model in (Schedule, Route):
+        post_save.connect(_schedules_changed, sender=model, dispatch_uid=f'journey_{model.__name__}_save')
+        post_delete.connect(_schedules_changed, sender=model, dispatch_uid=f'journey_{model.__name__}_delete')
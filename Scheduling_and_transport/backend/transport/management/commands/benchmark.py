@@ -0,0 +1,87 @@
+"""
+Django Management Command for performance benchmarks and stress tests
+
+Usage:
+python manage.py benchmark booking_contention
+python manage.py benchmark booking_contention --requests=500 --concurrency=64
+python manage.py benchmark seat_claim --seats=60
+python manage.py benchmark reference_allocation --concurrency=16
+python manage.py benchmark task_throughput --requests=2000 --concurrency=8
+python manage.py benchmark city_search --schedules=1000000
+python manage.py benchmark place_suggest --requests=10000
+python manage.py benchmark journey_planner --schedules=100000
+python manage.py benchmark availability_calendar --schedules=100000
+python manage.py benchmark flexible_search --schedules=100000
+python manage.py benchmark deep_pagination --schedules=1000000
+python manage.py benchmark fast_serialization --schedules=10000
+python manage.py benchmark json_rendering --requests=1000
+python manage.py benchmark booking_events --requests=5000
+python manage.py benchmark seat_events --requests=300 --seats=400
+python manage.py benchmark asset_serving --requests=300
+python manage.py benchmark spa_shell --requests=1000
+python manage.py benchmark query_instrumentation --requests=2000
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transport.benchmarks import SCENARIOS
+
+class Command(BaseCommand):
+    help = 'Run a performance benchmark or stress scenario'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenario',
+            choices=sorted(SCENARIOS),
+            help='Benchmark scenario to run',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=300,
+            help='Number of operations to perform (default: 300)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=32,
+            help='Number of parallel workers (default: 32)',
+        )
+        parser.add_argument(
+            '--schedules',
+            type=int,
+            default=1_000_000,
+            help='Schedules to generate for search benchmarks (default: 1000000)',
+        )
+        parser.add_argument(
+            '--seats',
+            type=int,
+            default=60,
+            help='Seats on the benchmark schedule (default: 60)',
+        )
+
+    def handle(self, *args, **options):
+        name = options['scenario']
+        self.stdout.write(f'⏱️  Running benchmark: {name}')
+
+        try:
+            result = SCENARIOS[name](
+                requests=options['requests'],
+                concurrency=options['concurrency'],
+                seats=options['seats'],
+                schedules=options['schedules'],
+            )
+        except Exception as e:
+            raise CommandError(f'Benchmark {name} failed: {str(e)}')
+
+        for key, value in result.items():
+            self.stdout.write(f'   • {key}: {value}')
+
+        if result.get('oversold'):
+            self.stdout.write(self.style.ERROR(f"❌ Oversold by {result['oversold']} seat(s)"))
+        elif result.get('not_run'):
+            self.stdout.write(self.style.ERROR(f"❌ {result['not_run']} item(s) were never processed"))
+        elif result.get('duplicates'):
+            self.stdout.write(self.style.ERROR(f"❌ {result['duplicates']} duplicate value(s) allocated"))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Benchmark completed'))
@@ -0,0 +1,34 @@
+"""
+Django Management Command to release expired seat holds
+
+Unpaid bookings keep their seat only until hold_expires_at. This command
+marks lapsed holds as expired and returns their seats to the schedules.
+The booking and search endpoints also sweep opportunistically; run this
+from cron for a guaranteed cadence during quiet periods.
+
+Usage:
+python manage.py release_expired_holds
+python manage.py release_expired_holds --schedule=42
+"""
+
+from django.core.management.base import BaseCommand
+
+from transport.reservation_service import SeatReservationService
+
+class Command(BaseCommand):
+    help = 'Expire lapsed unpaid seat holds and return their seats to inventory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--schedule',
+            type=int,
+            default=None,
+            help='Only sweep holds on this schedule ID',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('🧹 Releasing expired seat holds...')
+
+        released = SeatReservationService.release_expired_holds(schedule_id=options['schedule'])
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Returned {released} seat(s) to inventory'))
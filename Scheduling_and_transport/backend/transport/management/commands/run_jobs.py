@@ -0,0 +1,47 @@
+"""
+Django Management Command to run a dedicated background job worker
+
+Runs the periodic jobs (daily schedule maintenance at 2 AM and the seat
+hold sweeper) in their own process. Deploy one of these and set
+JOB_RUNNER_PERIODIC_IN_WEB=False so web workers stop scheduling them.
+
+Usage:
+python manage.py run_jobs
+python manage.py run_jobs --workers=8
+"""
+
+from django.core.management.base import BaseCommand
+import signal
+import threading
+
+from transport.jobs import JobRunner, register_periodic_jobs
+
+class Command(BaseCommand):
+    help = 'Run periodic background jobs in a dedicated worker process'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Worker threads (default: JOB_RUNNER_MAX_WORKERS)',
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+
+        def request_stop(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+
+        runner = JobRunner(max_workers=options['workers'])
+        register_periodic_jobs(runner)
+        self.stdout.write(self.style.SUCCESS(f'🚀 Job worker running with {runner.max_workers} worker(s), press Ctrl+C to stop'))
+
+        stop.wait()
+
+        self.stdout.write('🛑 Stopping job worker, waiting for running jobs...')
+        runner.shutdown(wait=True)
+        self.stdout.write(self.style.SUCCESS('✅ Job worker stopped'))
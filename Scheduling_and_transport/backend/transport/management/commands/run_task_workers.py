@@ -0,0 +1,82 @@
+"""
+Django Management Command to run durable task queue workers
+
+Claims tasks from the Task table (payment auto-confirmation, confirmation
+emails with PDF tickets, daily schedule maintenance) and runs them. Any
+number of these processes can run side by side against the same database.
+Web processes leave the queue to these workers unless TASK_QUEUE_DRAIN_IN_WEB
+is set (the default in DEBUG).
+
+Usage:
+python manage.py run_task_workers
+python manage.py run_task_workers --concurrency=4
+python manage.py run_task_workers --once
+"""
+
+from django.core.management.base import BaseCommand
+import signal
+import threading
+
+from transport.task_queue import TaskWorker
+
+class Command(BaseCommand):
+    help = 'Run workers that execute tasks from the durable task queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Worker threads in this process (default: 1)',
+        )
+        parser.add_argument(
+            '--queue',
+            default='default',
+            help='Queue to consume (default: default)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Tasks claimed per poll (default: TASK_QUEUE_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--visibility-timeout',
+            type=int,
+            default=None,
+            help='Seconds a claimed task is hidden from other workers (default: TASK_VISIBILITY_TIMEOUT_SECONDS)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run everything that is due, then exit',
+        )
+
+    def handle(self, *args, **options):
+        worker = TaskWorker(
+            queue=options['queue'],
+            concurrency=options['concurrency'],
+            batch_size=options['batch_size'],
+            visibility_timeout=options['visibility_timeout'],
+        )
+
+        if options['once']:
+            processed = worker.drain()
+            self.stdout.write(self.style.SUCCESS(f'✅ Processed {processed} task(s) from queue {worker.queue}'))
+            return
+
+        stop = threading.Event()
+
+        def request_stop(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'🚀 {worker.concurrency} task worker(s) consuming queue {worker.queue}, press Ctrl+C to stop'
+        ))
+
+        worker.run(stop)
+
+        self.stdout.write(self.style.SUCCESS('✅ Task workers stopped'))
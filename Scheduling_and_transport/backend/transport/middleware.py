@@ -0,0 +1,53 @@
+"""
+Middleware for Falcon Bus Lines
+"""
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+import random
+import re
+
+from .performance import PerformanceMonitor
+
+# Formats that are compressed already; gzip only costs CPU (and for files
+# it would replace sendfile with a compressing stream)
+_COMPRESSED_TYPES = re.compile(r'^(image/(?!svg)|video/|audio/|font/woff|application/(zip|gzip|x-brotli)\b)')
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that leaves Server-Sent Events streams and already
+    compressed media alone
+
+    gzip holds data back until it has enough to compress, which would delay
+    each event until several more had been written.
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if content_type.startswith('text/event-stream') or _COMPRESSED_TYPES.match(content_type):
+            return response
+        return super().process_response(request, response)
+
+class QueryInstrumentationMiddleware:
+    """
+    Record query counts, database time and slow statements per view for a
+    QUERY_INSTRUMENTATION_SAMPLE_RATE fraction of requests (see performance.py)
+
+    Queries run while a streaming response is consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.QUERY_INSTRUMENTATION_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        with PerformanceMonitor.instrument() as recorder:
+            try:
+                return self.get_response(request)
+            finally:
+                match = request.resolver_match
+                # Unmatched paths share one entry so the table stays bounded
+                recorder.name = match.view_name if match else 'unresolved'
@@ -0,0 +1,27 @@
+# Generated by Django 5.0 on 2026-10-18 13:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0012_booking_booking_ref_idx_booking_booking_status_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, help_text='When the unpaid seat hold lapses and the seat is returned to inventory', null=True),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('pending_payment', 'Pending Payment'), ('payment_processing', 'Payment Processing'), ('payment_failed', 'Payment Failed'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('completed', 'Completed'), ('no_show', 'No Show'), ('expired', 'Seat Hold Expired')], default='pending_payment', help_text='Current status of the booking', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'hold_expires_at'], name='booking_hold_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0 on 2026-10-18 14:01
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0013_booking_hold_expires_at_alter_booking_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='seat_number',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Selected seat number on the bus (optional)', null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(60)]),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='seat_map',
+            field=models.BinaryField(blank=True, default=bytes, help_text='Bitset of taken seat numbers (one bit per seat, see transport.seat_map)'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0 on 2026-10-18 14:03
+
+from django.db import migrations, models
+
+
+def create_booking_reference_sequence(apps, schema_editor):
+    """Seed the reference sequence; PostgreSQL uses a native, non-transactional SEQUENCE"""
+    ReferenceSequence = apps.get_model('transport', 'ReferenceSequence')
+    ReferenceSequence.objects.get_or_create(name='booking_reference', defaults={'next_value': 1})
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE SEQUENCE IF NOT EXISTS transport_booking_reference_seq INCREMENT BY 50 START WITH 1'
+        )
+
+
+def drop_booking_reference_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP SEQUENCE IF EXISTS transport_booking_reference_seq')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0014_booking_seat_number_schedule_seat_map'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Name of the sequence (e.g., booking_reference)', max_length=50, unique=True)),
+                ('next_value', models.BigIntegerField(default=1, help_text='First number not yet reserved by any worker')),
+            ],
+            options={
+                'verbose_name': 'Reference Sequence',
+                'verbose_name_plural': 'Reference Sequences',
+            },
+        ),
+        migrations.RunPython(create_booking_reference_sequence, drop_booking_reference_sequence),
+    ]
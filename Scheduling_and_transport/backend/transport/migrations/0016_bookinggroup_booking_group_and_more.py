@@ -0,0 +1,46 @@
+# Generated by Django 5.0 on 2026-10-18 14:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0015_referencesequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group_reference', models.CharField(editable=False, help_text='Human-readable group reference shared by one payment (e.g., FGQ5QWKH)', max_length=15, unique=True)),
+                ('contact_name', models.CharField(help_text='Name of the person paying for the group', max_length=100)),
+                ('contact_email', models.EmailField(help_text='Email for the group booking confirmation', max_length=254)),
+                ('contact_phone', models.CharField(help_text='Contact phone number for the group', max_length=20)),
+                ('number_of_seats', models.PositiveIntegerField(help_text='Number of passengers (one seat each) in the group')),
+                ('total_amount_zar', models.DecimalField(decimal_places=2, help_text='Total amount for all passengers in ZAR', max_digits=10)),
+                ('payfast_payment_id', models.CharField(blank=True, help_text='PayFast payment ID covering the whole group', max_length=200, null=True)),
+                ('payfast_payment_status', models.CharField(blank=True, help_text='PayFast payment status (COMPLETE, FAILED, CANCELLED)', max_length=50, null=True)),
+                ('payment_date', models.DateTimeField(blank=True, help_text='When payment was completed', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('schedule', models.ForeignKey(help_text='Which scheduled trip the group is travelling on', on_delete=django.db.models.deletion.CASCADE, to='transport.schedule')),
+            ],
+            options={
+                'verbose_name': 'Group Booking',
+                'verbose_name_plural': 'Group Bookings',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='group',
+            field=models.ForeignKey(blank=True, help_text='Group booking this passenger was booked and paid with (if any)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='transport.bookinggroup'),
+        ),
+        migrations.AddIndex(
+            model_name='bookinggroup',
+            index=models.Index(fields=['payfast_payment_id'], name='group_payment_id_idx'),
+        ),
+    ]
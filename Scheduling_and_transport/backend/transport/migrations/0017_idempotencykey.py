@@ -0,0 +1,31 @@
+# Generated by Django 5.0 on 2026-10-18 14:06
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0016_bookinggroup_booking_group_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key_hash', models.CharField(help_text='SHA-256 of the Idempotency-Key header, HTTP method and path', max_length=64, unique=True)),
+                ('request_fingerprint', models.CharField(help_text='SHA-256 of the request body, to reject a key reused for a different request', max_length=64)),
+                ('response_status', models.PositiveSmallIntegerField(blank=True, help_text='Stored response status (empty while the original request is still running)', null=True)),
+                ('response_body', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Stored response body returned to retries', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(help_text='When this key is evicted and may be used again')),
+            ],
+            options={
+                'verbose_name': 'Idempotency Key',
+                'verbose_name_plural': 'Idempotency Keys',
+                'indexes': [models.Index(fields=['expires_at'], name='idempotency_expiry_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0 on 2026-10-18 14:10
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0017_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Registered task name (see transport/tasks.py)', max_length=100)),
+                ('queue', models.CharField(default='default', help_text='Queue the task is placed on; workers consume one queue', max_length=50)),
+                ('payload', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Keyword arguments passed to the task')),
+                ('priority', models.SmallIntegerField(default=100, help_text='Lower numbers run first')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('run_after', models.DateTimeField(help_text='Earliest time the task may be claimed; while running, when its visibility timeout lapses')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('max_attempts', models.PositiveSmallIntegerField(default=5)),
+                ('claim_token', models.UUIDField(blank=True, help_text='Set by the worker that claimed the task', null=True)),
+                ('dedupe_key', models.CharField(blank=True, help_text='Optional key that prevents the same task being queued twice', max_length=100, null=True, unique=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Task',
+                'verbose_name_plural': 'Tasks',
+                'indexes': [models.Index(fields=['queue', 'status', 'run_after', 'priority'], name='task_claim_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.0 on 2026-10-18 14:13
+
+import django.db.models.deletion
+import re
+import unicodedata
+from django.db import migrations, models
+
+
+def normalize_place_name(name):
+    """Frozen copy of transport.places.normalize_place_name as of this migration"""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return re.sub(r'[\W_]+', ' ', stripped.casefold()).strip()
+
+
+def link_routes_to_places(apps, schema_editor):
+    """Create a canonical place for every existing route origin and destination"""
+    Place = apps.get_model('transport', 'Place')
+    Route = apps.get_model('transport', 'Route')
+    places = {}
+
+    def place_for(name):
+        key = normalize_place_name(name)
+        if key not in places:
+            places[key], _ = Place.objects.get_or_create(key=key, defaults={'name': name.strip()})
+        return places[key]
+
+    for route in Route.objects.all():
+        route.origin_place = place_for(route.origin)
+        route.destination_place = place_for(route.destination)
+        route.save(update_fields=['origin_place', 'destination_place'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0018_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Place',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text="Display name of the town or city (e.g., 'Cape Town')", max_length=100)),
+                ('key', models.CharField(help_text='Case-folded, accent-stripped name used for search (see transport.places)', max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Place',
+                'verbose_name_plural': 'Places',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='route',
+            name='destination_place',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Canonical place for destination (set automatically on save)', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='arriving_routes', to='transport.place'),
+        ),
+        migrations.AddField(
+            model_name='route',
+            name='origin_place',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Canonical place for origin (set automatically on save)', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='departing_routes', to='transport.place'),
+        ),
+        migrations.AddIndex(
+            model_name='route',
+            index=models.Index(fields=['origin_place', 'destination_place'], name='route_place_pair_idx'),
+        ),
+        migrations.RunPython(link_routes_to_places, migrations.RunPython.noop),
+    ]
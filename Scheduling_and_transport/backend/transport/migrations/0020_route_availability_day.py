@@ -0,0 +1,69 @@
+# Generated by Django 5.0 on 2026-10-18 14:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def fill_calendar(apps, schema_editor):
+    """Build calendar rows for every existing active schedule"""
+    Schedule = apps.get_model('transport', 'Schedule')
+    RouteAvailabilityDay = apps.get_model('transport', 'RouteAvailabilityDay')
+
+    rows = (
+        Schedule.objects.filter(is_active=True)
+        .annotate(day=TruncDate('departure_time'))
+        .values('route_id', 'day')
+        .annotate(
+            departure_count=Count('id'),
+            seat_total=Sum('available_seats'),
+            cheapest=Min('price_zar', filter=Q(available_seats__gt=0)),
+        )
+    )
+    RouteAvailabilityDay.objects.bulk_create(
+        [
+            RouteAvailabilityDay(
+                route_id=row['route_id'],
+                date=row['day'],
+                departures=row['departure_count'],
+                seats_left=max(row['seat_total'] or 0, 0),
+                min_price_zar=row['cheapest'],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0019_place'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteAvailabilityDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Departure date (in TIME_ZONE)')),
+                ('departures', models.PositiveIntegerField(default=0, help_text='Active schedules departing on this date')),
+                ('min_price_zar', models.DecimalField(blank=True, decimal_places=2, help_text='Cheapest departure that still has seats', max_digits=10, null=True)),
+                ('seats_left', models.PositiveIntegerField(default=0, help_text='Seats still available across all departures')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_days', to='transport.route')),
+            ],
+            options={
+                'verbose_name': 'Route Availability Day',
+                'verbose_name_plural': 'Route Availability Calendar',
+                'ordering': ['route', 'date'],
+                'indexes': [models.Index(fields=['date'], name='route_availability_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='routeavailabilityday',
+            constraint=models.UniqueConstraint(fields=('route', 'date'), name='route_availability_day_unique'),
+        ),
+        migrations.RunPython(fill_calendar, migrations.RunPython.noop),
+    ]
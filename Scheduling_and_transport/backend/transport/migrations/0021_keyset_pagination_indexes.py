@@ -0,0 +1,29 @@
+# Generated by Django 5.0 on 2026-10-18 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0020_route_availability_day'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='schedule',
+            name='schedule_departure_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['booking_date', 'id'], name='booking_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['departure_time', 'id'], name='schedule_departure_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 15:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0021_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='idempotencykey',
+            name='key_hash',
+            field=models.CharField(help_text='SHA-256 of the Idempotency-Key header, client, HTTP method and path', max_length=64, unique=True),
+        ),
+    ]
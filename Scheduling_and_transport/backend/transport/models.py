@@ -1,4 +1,5 @@
 ﻿from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 import uuid
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
 
@@ -49,6 +50,41 @@ class Bus(models.Model):
     def __str__(self):
         return f"{self.bus_number} ({self.bus_type})"
 
+class Place(models.Model):
+    name = models.CharField(
+        max_length=100,
+        help_text="Display name of the town or city (e.g., 'Cape Town')"
+    )
+    key = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text='Case-folded, accent-stripped name used for search (see transport.places)'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Place'
+        verbose_name_plural = 'Places'
+        ordering = ['name']
+
+    @classmethod
+    def for_name(cls, name):
+        """Get or create the canonical place for a town name"""
+        from .places import normalize_place_name
+        place, _ = cls.objects.get_or_create(
+            key=normalize_place_name(name),
+            defaults={'name': name.strip()}
+        )
+        return place
+
+    def save(self, *args, **kwargs):
+        from .places import normalize_place_name
+        self.key = normalize_place_name(self.name)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
 class Route(models.Model):
     ROUTE_TYPES = [
         ('one_way', 'One Way'),
@@ -67,6 +103,24 @@ class Route(models.Model):
         max_length=100,
         help_text="Ending city (e.g., 'Johannesburg')"
     )
+    origin_place = models.ForeignKey(
+        Place,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='departing_routes',
+        help_text='Canonical place for origin (set automatically on save)'
+    )
+    destination_place = models.ForeignKey(
+        Place,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='arriving_routes',
+        help_text='Canonical place for destination (set automatically on save)'
+    )
     distance_km = models.FloatField(
         validators=[MinValueValidator(1.0)],
         help_text='Distance in kilometers'
@@ -117,6 +171,7 @@ class Route(models.Model):
             models.Index(fields=['origin'], name='route_origin_idx'),
             models.Index(fields=['destination'], name='route_dest_idx'),
             models.Index(fields=['origin', 'destination'], name='route_origin_dest_idx'),
+            models.Index(fields=['origin_place', 'destination_place'], name='route_place_pair_idx'),
             models.Index(fields=['is_active'], name='route_active_idx'),
             models.Index(fields=['base_price_zar'], name='route_price_idx'),
         ]
@@ -134,6 +189,14 @@ class Route(models.Model):
                     'Please check distance and duration values.'
                 )
 
+    def save(self, *args, **kwargs):
+        # Keep the canonical places in step with the free-text city names
+        self.origin_place = Place.for_name(self.origin)
+        self.destination_place = Place.for_name(self.destination)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'origin_place', 'destination_place'}
+        super().save(*args, **kwargs)
+
     def operates_on_day(self, day_name):
         """
         Check if this route operates on a specific day
@@ -171,6 +234,12 @@ class Schedule(models.Model):
     available_seats = models.IntegerField(
         help_text='Number of seats still available for booking'
     )
+    seat_map = models.BinaryField(
+        default=bytes,
+        blank=True,
+        editable=False,
+        help_text='Bitset of taken seat numbers (one bit per seat, see transport.seat_map)'
+    )
     price_zar = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -188,7 +257,7 @@ class Schedule(models.Model):
         verbose_name_plural = 'Bus Schedules'
         ordering = ['departure_time']
         indexes = [
-            models.Index(fields=['departure_time'], name='schedule_departure_idx'),
+            models.Index(fields=['departure_time', 'id'], name='schedule_departure_id_idx'),
             models.Index(fields=['route', 'departure_time'], name='schedule_route_time_idx'),
             models.Index(fields=['is_active', 'departure_time'], name='schedule_active_time_idx'),
             models.Index(fields=['available_seats'], name='schedule_seats_idx'),
@@ -198,6 +267,117 @@ class Schedule(models.Model):
     def __str__(self):
         return f"{self.route.name} - {self.departure_time.strftime('%Y-%m-%d %H:%M')}"
 
+class RouteAvailabilityDay(models.Model):
+    """
+    Availability of one route on one day, maintained from its schedules
+    (see transport/availability_calendar.py) so date pickers never
+    aggregate schedules per request
+    """
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.CASCADE,
+        related_name='availability_days'
+    )
+    date = models.DateField(help_text='Departure date (in TIME_ZONE)')
+    departures = models.PositiveIntegerField(
+        default=0,
+        help_text='Active schedules departing on this date'
+    )
+    min_price_zar = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        help_text='Cheapest departure that still has seats'
+    )
+    seats_left = models.PositiveIntegerField(
+        default=0,
+        help_text='Seats still available across all departures'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Route Availability Day'
+        verbose_name_plural = 'Route Availability Calendar'
+        ordering = ['route', 'date']
+        constraints = [
+            models.UniqueConstraint(fields=['route', 'date'], name='route_availability_day_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='route_availability_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.route.name} on {self.date}: {self.seats_left} seat(s) left"
+
+class BookingGroup(models.Model):
+    group_reference = models.CharField(
+        max_length=15,
+        unique=True,
+        editable=False,
+        help_text='Human-readable group reference shared by one payment (e.g., FGQ5QWKH)'
+    )
+    schedule = models.ForeignKey(
+        Schedule,
+        on_delete=models.CASCADE,
+        help_text='Which scheduled trip the group is travelling on'
+    )
+    contact_name = models.CharField(
+        max_length=100,
+        help_text='Name of the person paying for the group'
+    )
+    contact_email = models.EmailField(
+        help_text='Email for the group booking confirmation'
+    )
+    contact_phone = models.CharField(
+        max_length=20,
+        help_text='Contact phone number for the group'
+    )
+    number_of_seats = models.PositiveIntegerField(
+        help_text='Number of passengers (one seat each) in the group'
+    )
+    total_amount_zar = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        help_text='Total amount for all passengers in ZAR'
+    )
+    payfast_payment_id = models.CharField(
+        max_length=200,
+        blank=True,
+        null=True,
+        help_text='PayFast payment ID covering the whole group'
+    )
+    payfast_payment_status = models.CharField(
+        max_length=50,
+        blank=True,
+        null=True,
+        help_text='PayFast payment status (COMPLETE, FAILED, CANCELLED)'
+    )
+    payment_date = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='When payment was completed'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Group Booking'
+        verbose_name_plural = 'Group Bookings'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['payfast_payment_id'], name='group_payment_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.group_reference:
+            from .references import allocate_booking_reference
+            self.group_reference = allocate_booking_reference(prefix='FG')
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.group_reference} - {self.contact_name} ({self.number_of_seats} passengers)"
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('pending_payment', 'Pending Payment'),
@@ -207,6 +387,7 @@ class Booking(models.Model):
         ('cancelled', 'Cancelled'),
         ('completed', 'Completed'),
         ('no_show', 'No Show'),
+        ('expired', 'Seat Hold Expired'),
     ]
     
     booking_id = models.UUIDField(
@@ -228,6 +409,14 @@ class Booking(models.Model):
         on_delete=models.CASCADE,
         help_text='Which scheduled trip this booking is for'
     )
+    group = models.ForeignKey(
+        BookingGroup,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='bookings',
+        help_text='Group booking this passenger was booked and paid with (if any)'
+    )
     passenger_name = models.CharField(
         max_length=100,
         help_text='Full name of the passenger'
@@ -263,6 +452,12 @@ class Booking(models.Model):
         blank=True,
         help_text='Emergency contact phone number'
     )
+    seat_number = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(1), MaxValueValidator(60)],
+        help_text='Selected seat number on the bus (optional)'
+    )
     number_of_seats = models.IntegerField(
         default=1,
         validators=[MinValueValidator(1), MaxValueValidator(1)],
@@ -296,6 +491,11 @@ class Booking(models.Model):
         null=True,
         help_text='When payment was completed'
     )
+    hold_expires_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='When the unpaid seat hold lapses and the seat is returned to inventory'
+    )
     payment_failure_reason = models.TextField(
         blank=True,
         help_text='Reason for payment failure (if applicable)'
@@ -351,33 +551,138 @@ class Booking(models.Model):
             models.Index(fields=['status'], name='booking_status_idx'),
             models.Index(fields=['passenger_email'], name='booking_email_idx'),
             models.Index(fields=['schedule', 'status'], name='booking_schedule_status_idx'),
-            models.Index(fields=['booking_date'], name='booking_date_idx'),
+            models.Index(fields=['booking_date', 'id'], name='booking_date_id_idx'),
             models.Index(fields=['payfast_payment_id'], name='booking_payment_id_idx'),
+            models.Index(fields=['status', 'hold_expires_at'], name='booking_hold_expiry_idx'),
         ]
 
     def save(self, *args, **kwargs):
-        # Save first to get the ID, then generate reference
+        # Allocate the reference before inserting so creating a booking is one write
         if not self.booking_reference:
-            # Save without reference first to get the ID
-            super().save(*args, **kwargs)
-            
-            # Generate reference using ID to ensure uniqueness
-            import random
-            from datetime import datetime
-            
-            # Use ID + timestamp + random for guaranteed uniqueness
-            timestamp = datetime.now().strftime('%M%S')  # MMSS
-            random_digit = random.randint(0, 9)
-            self.booking_reference = f'FB{self.id}{timestamp}{random_digit}'
-            
-            # Save again with the reference
-            super().save(update_fields=['booking_reference'])
-        else:
-            super().save(*args, **kwargs)
+            from .references import allocate_booking_reference
+            self.booking_reference = allocate_booking_reference()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.passenger_name} - {self.schedule}"
 
+class ReferenceSequence(models.Model):
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text='Name of the sequence (e.g., booking_reference)'
+    )
+    next_value = models.BigIntegerField(
+        default=1,
+        help_text='First number not yet reserved by any worker'
+    )
+
+    class Meta:
+        verbose_name = 'Reference Sequence'
+        verbose_name_plural = 'Reference Sequences'
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+class IdempotencyKey(models.Model):
+    key_hash = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text='SHA-256 of the Idempotency-Key header, client, HTTP method and path'
+    )
+    request_fingerprint = models.CharField(
+        max_length=64,
+        help_text='SHA-256 of the request body, to reject a key reused for a different request'
+    )
+    response_status = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        help_text='Stored response status (empty while the original request is still running)'
+    )
+    response_body = models.JSONField(
+        blank=True,
+        null=True,
+        encoder=DjangoJSONEncoder,
+        help_text='Stored response body returned to retries'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(
+        help_text='When this key is evicted and may be used again'
+    )
+
+    class Meta:
+        verbose_name = 'Idempotency Key'
+        verbose_name_plural = 'Idempotency Keys'
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key_hash[:12]}... ({self.response_status or 'in progress'})"
+
+class Task(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(
+        max_length=100,
+        help_text='Registered task name (see transport/tasks.py)'
+    )
+    queue = models.CharField(
+        max_length=50,
+        default='default',
+        help_text='Queue the task is placed on; workers consume one queue'
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        help_text='Keyword arguments passed to the task'
+    )
+    priority = models.SmallIntegerField(
+        default=100,
+        help_text='Lower numbers run first'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='queued'
+    )
+    run_after = models.DateTimeField(
+        help_text='Earliest time the task may be claimed; while running, when its visibility timeout lapses'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    claim_token = models.UUIDField(
+        blank=True,
+        null=True,
+        help_text='Set by the worker that claimed the task'
+    )
+    dedupe_key = models.CharField(
+        max_length=100,
+        unique=True,
+        blank=True,
+        null=True,
+        help_text='Optional key that prevents the same task being queued twice'
+    )
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Task'
+        verbose_name_plural = 'Tasks'
+        indexes = [
+            models.Index(fields=['queue', 'status', 'run_after', 'priority'], name='task_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
 class ContactInfo(models.Model):
     company_name = models.CharField(
         max_length=200,
@@ -0,0 +1,118 @@
+"""
+Keyset (cursor) pagination for Falcon Bus Lines
+Page-number pagination runs an OFFSET scan and a COUNT(*) on every page,
+so deep pages of schedules and bookings get slower as data grows. These
+paginators instead remember the (sort value, id) of the last row served
+and fetch the next page with
+
+    WHERE (departure_time, id) > (:last_time, :last_id) ORDER BY departure_time, id
+
+which walks the (departure_time, id) index from that point. Pages carry
+next/previous links but no total count, and rows inserted while a client
+pages through are never skipped or repeated.
+"""
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+import json
+
+def _reverse(ordering):
+    return tuple(field[1:] if field.startswith('-') else '-' + field for field in ordering)
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on a (field, id) keyset
+
+    Unlike DRF's CursorPagination, which positions on the first ordering
+    field and skips ties with an offset, the cursor holds both values so
+    every page is one index range scan no matter how many rows share a
+    timestamp.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def _position(self, instance):
+        # Pages hold model instances or values() rows
+        if isinstance(instance, dict):
+            values = [instance[field.lstrip('-')] for field in self.ordering]
+        else:
+            values = [getattr(instance, field.lstrip('-')) for field in self.ordering]
+        return json.dumps([str(value) for value in values])
+
+    def _after(self, queryset, ordering, position):
+        """Rows strictly after position in the given ordering"""
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(ordering):
+                raise ValueError
+            values = [
+                queryset.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(ordering, values)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y), per field direction; the
+        # extra a >= x bound lets the database start an index range scan at x
+        first = ordering[0]
+        bound = {f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": values[0]}
+        condition = Q()
+        for i, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = f"{name}__{'lt' if field.startswith('-') else 'gt'}"
+            equal = {other.lstrip('-'): value for other, value in zip(ordering[:i], values[:i])}
+            condition |= Q(**equal, **{lookup: values[i]})
+        return queryset.filter(condition, **bound)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self.cursor.position if self.cursor else None
+
+        ordering = _reverse(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = self._after(queryset, ordering, position)
+
+        # One extra row tells us whether another page follows
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self._position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self._position(self.page[0])))
+
+class SchedulePagination(KeysetPagination):
+    """Schedules in departure order (schedule_departure_id_idx)"""
+    ordering = ('departure_time', 'id')
+
+class BookingPagination(KeysetPagination):
+    """Newest bookings first (booking_date_id_idx)"""
+    ordering = ('-booking_date', '-id')
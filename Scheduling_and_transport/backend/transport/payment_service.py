@@ -2,11 +2,10 @@ import hashlib
 import urllib.parse
 import requests
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from decimal import Decimal
 import logging
-import threading
-import time
 
 logger = logging.getLogger(__name__)
 
@@ -113,6 +112,80 @@ class PayFastPaymentService:
             logger.error(f"Error creating PayFast payment for booking {booking.booking_reference}: {str(e)}")
             raise Exception(f"Payment setup failed: {str(e)}")
     
+    @staticmethod
+    def create_group_payment_form_data(group):
+        """
+        Create a single PayFast payment covering every passenger in a group booking
+        
+        Args:
+            group: BookingGroup instance with its bookings already created
+            
+        Returns:
+            dict: PayFast form data including signature
+        """
+        try:
+            route = group.schedule.route
+            contact_names = group.contact_name.split()
+            
+            payfast_data = {
+                'merchant_id': settings.PAYFAST_MERCHANT_ID,
+                'merchant_key': settings.PAYFAST_MERCHANT_KEY,
+                'return_url': settings.PAYFAST_RETURN_URL,
+                'cancel_url': settings.PAYFAST_CANCEL_URL,
+                'notify_url': settings.PAYFAST_NOTIFY_URL,
+                
+                # Transaction details
+                'name_first': contact_names[0] if contact_names else 'Passenger',
+                'name_last': contact_names[-1] if len(contact_names) > 1 else '',
+                'email_address': group.contact_email,
+                'cell_number': group.contact_phone.replace(' ', '').replace('+', ''),
+                
+                # Payment details
+                'amount': f"{group.total_amount_zar:.2f}",
+                'item_name': f"Bus Tickets x{group.number_of_seats} - {route.name}",
+                'item_description': f"Group booking {group.group_reference} - {route.origin} to {route.destination}",
+                
+                # Custom fields for tracking (custom_str4 marks a group payment)
+                'custom_int1': group.id,
+                'custom_str1': group.group_reference,
+                'custom_str2': f"{group.schedule.departure_time.strftime('%Y-%m-%d %H:%M')}",
+                'custom_str4': 'group',
+                
+                'payment_method': 'cc',
+            }
+            
+            payfast_data['signature'] = PayFastPaymentService.generate_signature(
+                payfast_data,
+                settings.PAYFAST_PASSPHRASE
+            )
+            
+            # One payment reference shared by the group and all its bookings
+            group.payfast_payment_id = f"PF_{group.group_reference}_{group.id}"
+            group.payfast_payment_status = 'PENDING'
+            group.save(update_fields=['payfast_payment_id', 'payfast_payment_status', 'updated_at'])
+            
+            group.bookings.update(
+                payfast_payment_id=group.payfast_payment_id,
+                payfast_payment_status='PENDING',
+                status='payment_processing',
+                updated_at=timezone.now()
+            )
+            
+            # Simulate automatic payment confirmation after 5 seconds (for testing)
+            PayFastPaymentService.simulate_payment_confirmation(None, delay_seconds=5, group_id=group.id)
+            
+            logger.info(f"PayFast group payment form created for {group.group_reference} ({group.number_of_seats} passengers)")
+            
+            return {
+                'form_data': payfast_data,
+                'action_url': settings.PAYFAST_BASE_URL,
+                'payment_id': group.payfast_payment_id
+            }
+            
+        except Exception as e:
+            logger.error(f"Error creating PayFast payment for group {group.group_reference}: {str(e)}")
+            raise Exception(f"Payment setup failed: {str(e)}")
+    
     @staticmethod
     def validate_webhook_data(post_data):
         """
@@ -180,6 +253,9 @@ class PayFastPaymentService:
             if not PayFastPaymentService.validate_webhook_data(post_data):
                 raise Exception("Invalid PayFast webhook data")
             
+            if post_data.get('custom_str4') == 'group':
+                return PayFastPaymentService.process_group_payment_notification(post_data)
+            
             # Extract booking information
             booking_id = post_data.get('custom_int1')
             booking_reference = post_data.get('custom_str1')
@@ -189,53 +265,74 @@ class PayFastPaymentService:
             if not booking_id:
                 raise Exception("No booking ID in PayFast notification")
             
-            # Find the booking
             from .models import Booking
-            try:
-                booking = Booking.objects.get(id=booking_id, booking_reference=booking_reference)
-            except Booking.DoesNotExist:
-                raise Exception(f"Booking not found: {booking_id}, {booking_reference}")
-            
-            # Process based on payment status
-            if payment_status == 'COMPLETE':
-                # Payment successful
-                booking.status = 'confirmed'
-                booking.payment_date = timezone.now()
-                booking.payfast_payment_status = 'COMPLETE'
-                booking.payment_failure_reason = ''
-                
-                logger.info(f"Payment completed for booking {booking.booking_reference}")
-                
-            elif payment_status == 'FAILED':
-                # Payment failed
-                booking.status = 'payment_failed'
-                booking.payfast_payment_status = 'FAILED'
-                booking.payment_failure_reason = 'Payment failed at PayFast'
-                
-                # Release the reserved seat
-                booking.schedule.available_seats += booking.number_of_seats
-                booking.schedule.save()
-                
-                logger.warning(f"Payment failed for booking {booking.booking_reference}")
+            from .reservation_service import SeatReservationService
+            
+            with transaction.atomic():
+                # Find and lock the booking: the hold sweeper skips locked rows, and a
+                # booking it already expired is seen here as expired, not as holding a seat
+                try:
+                    booking = Booking.objects.select_for_update().get(id=booking_id, booking_reference=booking_reference)
+                except Booking.DoesNotExist:
+                    raise Exception(f"Booking not found: {booking_id}, {booking_reference}")
                 
-            elif payment_status == 'CANCELLED':
-                # Payment cancelled by user
-                booking.status = 'cancelled'
-                booking.payfast_payment_status = 'CANCELLED'
-                booking.payment_failure_reason = 'Payment cancelled by user'
+                # Only bookings that still hold their seat may give it back
+                holds_seat = booking.status in SeatReservationService.SEAT_HOLDING_STATUSES
+                was_confirmed = booking.status == 'confirmed'
                 
-                # Release the reserved seat
-                booking.schedule.available_seats += booking.number_of_seats
-                booking.schedule.save()
+                # Process based on payment status
+                if payment_status == 'COMPLETE' and not holds_seat and not SeatReservationService.reserve_booking(booking):
+                    # Paid after the seat hold lapsed and the seat has since been resold
+                    booking.status = 'payment_failed'
+                    booking.payment_date = timezone.now()
+                    booking.payfast_payment_status = 'COMPLETE'
+                    booking.payment_failure_reason = 'Payment received after seat hold expired and the schedule sold out - refund required'
+                    
+                    logger.warning(f"Late payment for expired booking {booking.booking_reference} could not be honoured")
+                    
+                elif payment_status == 'COMPLETE':
+                    # Payment successful
+                    booking.status = 'confirmed'
+                    booking.payment_date = timezone.now()
+                    booking.payfast_payment_status = 'COMPLETE'
+                    booking.payment_failure_reason = ''
+                    
+                    logger.info(f"Payment completed for booking {booking.booking_reference}")
+                    
+                elif payment_status == 'FAILED':
+                    # Payment failed
+                    booking.status = 'payment_failed'
+                    booking.payfast_payment_status = 'FAILED'
+                    booking.payment_failure_reason = 'Payment failed at PayFast'
+                    
+                    # Release the reserved seat
+                    if holds_seat:
+                        SeatReservationService.release_booking(booking)
+                    
+                    logger.warning(f"Payment failed for booking {booking.booking_reference}")
+                    
+                elif payment_status == 'CANCELLED':
+                    # Payment cancelled by user
+                    booking.status = 'cancelled'
+                    booking.payfast_payment_status = 'CANCELLED'
+                    booking.payment_failure_reason = 'Payment cancelled by user'
+                    
+                    # Release the reserved seat
+                    if holds_seat:
+                        SeatReservationService.release_booking(booking)
+                    
+                    logger.info(f"Payment cancelled for booking {booking.booking_reference}")
+                    
+                else:
+                    # Unknown status
+                    logger.warning(f"Unknown payment status for booking {booking.booking_reference}: {payment_status}")
+                    booking.payfast_payment_status = payment_status
                 
-                logger.info(f"Payment cancelled for booking {booking.booking_reference}")
+                booking.save()
                 
-            else:
-                # Unknown status
-                logger.warning(f"Unknown payment status for booking {booking.booking_reference}: {payment_status}")
-                booking.payfast_payment_status = payment_status
-            
-            booking.save()
+                if booking.status == 'confirmed' and not was_confirmed:
+                    from .email_service import BookingEmailService
+                    BookingEmailService.queue_booking_confirmations([booking.id])
             
             return {
                 'status': payment_status,
@@ -248,6 +345,95 @@ class PayFastPaymentService:
             logger.error(f"Error processing PayFast payment notification: {str(e)}")
             raise Exception(f"Payment notification processing failed: {str(e)}")
     
+    @staticmethod
+    def process_group_payment_notification(post_data):
+        """
+        Apply an already validated PayFast notification to every booking in a group
+        
+        Args:
+            post_data: Dictionary of POST data from PayFast
+            
+        Returns:
+            dict: Processing result
+        """
+        from .booking_events import bookings_changed
+        from .models import BookingGroup
+        from .reservation_service import SeatReservationService
+        
+        group_id = post_data.get('custom_int1')
+        group_reference = post_data.get('custom_str1')
+        payment_status = post_data.get('payment_status')
+        
+        try:
+            group = BookingGroup.objects.get(id=group_id, group_reference=group_reference)
+        except BookingGroup.DoesNotExist:
+            raise Exception(f"Group booking not found: {group_id}, {group_reference}")
+        
+        bookings = list(group.bookings.all())
+        holding = [b for b in bookings if b.status in SeatReservationService.SEAT_HOLDING_STATUSES]
+        lapsed = [b for b in bookings if b.status in ('expired', 'payment_failed')]
+        now = timezone.now()
+        
+        if payment_status == 'COMPLETE':
+            # Passengers whose hold expired get their seats back if the schedule still has room
+            if lapsed and not SeatReservationService.reserve(
+                group.schedule_id,
+                seats=sum(b.number_of_seats for b in lapsed),
+                seat_numbers=[b.seat_number for b in lapsed if b.seat_number]
+            ):
+                group.bookings.filter(id__in=[b.id for b in lapsed]).update(
+                    status='payment_failed',
+                    payfast_payment_status='COMPLETE',
+                    payment_date=now,
+                    payment_failure_reason='Payment received after seat hold expired and the schedule sold out - refund required',
+                    updated_at=now
+                )
+                logger.warning(f"Late payment for group {group.group_reference}: {len(lapsed)} passenger(s) could not be seated")
+                lapsed = []
+            
+            group.bookings.filter(id__in=[b.id for b in holding + lapsed]).update(
+                status='confirmed',
+                payfast_payment_status='COMPLETE',
+                payment_date=now,
+                payment_failure_reason='',
+                updated_at=now
+            )
+            group.payment_date = now
+            
+            from .email_service import BookingEmailService
+            BookingEmailService.queue_booking_confirmations(
+                [b.id for b in holding + lapsed if b.status != 'confirmed']
+            )
+            logger.info(f"Payment completed for group {group.group_reference}")
+            
+        elif payment_status in ('FAILED', 'CANCELLED'):
+            failed = payment_status == 'FAILED'
+            group.bookings.filter(id__in=[b.id for b in holding]).update(
+                status='payment_failed' if failed else 'cancelled',
+                payfast_payment_status=payment_status,
+                payment_failure_reason='Payment failed at PayFast' if failed else 'Payment cancelled by user',
+                updated_at=now
+            )
+            
+            # Release all reserved seats of the group at once
+            SeatReservationService.release_bookings(group.schedule_id, holding)
+            logger.info(f"Payment {payment_status.lower()} for group {group.group_reference}")
+            
+        else:
+            logger.warning(f"Unknown payment status for group {group.group_reference}: {payment_status}")
+        
+        # Bulk updates fire no post_save, so open status streams are woken here
+        bookings_changed([b.id for b in bookings])
+        group.payfast_payment_status = payment_status
+        group.save(update_fields=['payfast_payment_status', 'payment_date', 'updated_at'])
+        
+        return {
+            'status': payment_status,
+            'group_reference': group.group_reference,
+            'booking_statuses': dict(group.bookings.values_list('booking_reference', 'status')),
+            'amount': post_data.get('amount_gross'),
+        }
+    
     @staticmethod
     def cancel_payment(booking):
         """
@@ -259,15 +445,19 @@ class PayFastPaymentService:
         Returns:
             dict: Cancellation result
         """
+        from .reservation_service import SeatReservationService
+        
         try:
+            holds_seat = booking.status in SeatReservationService.SEAT_HOLDING_STATUSES
+            
             # Update booking status
             booking.status = 'cancelled'
             booking.payfast_payment_status = 'CANCELLED'
             booking.save()
             
-            # Release the reserved seat
-            booking.schedule.available_seats += booking.number_of_seats
-            booking.schedule.save()
+            # Release the reserved seat (failed payments already gave it back)
+            if holds_seat:
+                SeatReservationService.release_booking(booking)
             
             logger.info(f"Payment cancelled for booking {booking.booking_reference}")
             
@@ -281,55 +471,78 @@ class PayFastPaymentService:
             raise Exception(f"Payment cancellation failed: {str(e)}")
     
     @staticmethod
-    def simulate_payment_confirmation(booking_id, delay_seconds=5):
+    def simulate_payment_confirmation(booking_id, delay_seconds=5, group_id=None):
         """
         Simulate PayFast payment confirmation after a delay (for testing only)
         
         Args:
             booking_id: ID of the booking to confirm
             delay_seconds: Seconds to wait before confirming (default 5)
+            group_id: Confirm every booking in this group instead (optional)
         """
-        def confirm_after_delay():
-            try:
-                time.sleep(delay_seconds)
-                
-                # Import here to avoid circular imports
-                from .models import Booking
-                
-                booking = Booking.objects.get(id=booking_id)
-                
-                # Only confirm if still in payment_processing state
-                if booking.status == 'payment_processing':
-                    booking.status = 'confirmed'
-                    booking.payfast_payment_status = 'COMPLETE'
-                    booking.payment_date = timezone.now()
-                    booking.save()
-                    
-                    logger.info(f"Auto-confirmed payment for booking {booking.booking_reference} after {delay_seconds} seconds")
-                else:
-                    logger.info(f"Booking {booking.booking_reference} status already changed to {booking.status}, skipping auto-confirmation")
-                    
-            except Exception as e:
-                logger.error(f"Error in simulated payment confirmation for booking {booking_id}: {str(e)}")
+        from .task_queue import enqueue
+        
+        label = f"group {group_id}" if group_id else f"booking {booking_id}"
+        
+        # Durable delayed task, so a deploy within the delay does not lose it
+        enqueue(
+            'confirm_simulated_payment',
+            {'booking_id': booking_id, 'group_id': group_id},
+            delay=delay_seconds
+        )
+        
+        logger.info(f"Started simulated payment confirmation for {label} (will confirm in {delay_seconds} seconds)")
+    
+    @staticmethod
+    def confirm_simulated_payment(booking_id, group_id=None):
+        """Task body for simulate_payment_confirmation"""
+        # Import here to avoid circular imports
+        from .booking_events import bookings_changed
+        from .models import Booking
+        from .email_service import BookingEmailService
+        
+        label = f"group {group_id}" if group_id else f"booking {booking_id}"
+        
+        if group_id:
+            bookings = Booking.objects.filter(group_id=group_id)
+        else:
+            bookings = Booking.objects.filter(id=booking_id)
         
-        # Start confirmation in background thread
-        thread = threading.Thread(target=confirm_after_delay)
-        thread.daemon = True
-        thread.start()
+        # Only confirm bookings still in payment_processing state
+        with transaction.atomic():
+            confirmed_ids = list(
+                bookings.filter(status='payment_processing')
+                .select_for_update()
+                .values_list('id', flat=True)
+            )
+            Booking.objects.filter(id__in=confirmed_ids).update(
+                status='confirmed',
+                payfast_payment_status='COMPLETE',
+                payment_date=timezone.now(),
+                updated_at=timezone.now()
+            )
+            
+            if confirmed_ids:
+                BookingEmailService.queue_booking_confirmations(confirmed_ids)
+                bookings_changed(confirmed_ids)
         
-        logger.info(f"Started simulated payment confirmation for booking {booking_id} (will confirm in {delay_seconds} seconds)")
+        if confirmed_ids:
+            logger.info(f"Auto-confirmed payment for {label} ({len(confirmed_ids)} booking(s))")
+        else:
+            logger.info(f"{label.capitalize()} status already changed, skipping auto-confirmation")
 
 class PaymentStatusTracker:
     """Helper class to track payment status transitions"""
     
     VALID_TRANSITIONS = {
-        'pending_payment': ['payment_processing', 'cancelled'],
-        'payment_processing': ['confirmed', 'payment_failed', 'cancelled'],
+        'pending_payment': ['payment_processing', 'cancelled', 'expired'],
+        'payment_processing': ['confirmed', 'payment_failed', 'cancelled', 'expired'],
         'payment_failed': ['payment_processing', 'cancelled'],
         'confirmed': ['completed', 'cancelled'],
         'cancelled': [],  # Terminal state
         'completed': [],  # Terminal state
         'no_show': [],    # Terminal state
+        'expired': [],    # Terminal state
     }
     
     @classmethod
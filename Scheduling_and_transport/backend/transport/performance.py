@@ -3,59 +3,162 @@ Performance monitoring and optimization utilities for Falcon Bus Lines
 """
 
 from django.core.cache import cache
-from django.db import connection
+from django.db import connections
 from django.conf import settings
+from django.utils import timezone
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from collections import deque
+from contextlib import ExitStack, contextmanager
 from datetime import datetime, timedelta
+from functools import wraps
+import os
+import threading
 import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+class QueryRecorder:
+    """
+    connection.execute_wrapper that counts the queries of one request or
+    block, their total time and the statements slower than SLOW_QUERY_MS
+
+    Works with DEBUG off, unlike connection.queries, and keeps only the
+    slow statements.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self.count = 0
+        self.db_time = 0.0
+        self.slow = []
+        self._threshold = settings.SLOW_QUERY_MS / 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.db_time += elapsed
+            if elapsed >= self._threshold:
+                self.slow.append((sql, elapsed))
+
+def _truncate(sql):
+    return sql[:200] + '...' if len(sql) > 200 else sql
+
+class QueryStats:
+    """Query counts and database time per view, and recent slow statements, for this process"""
+
+    MAX_SLOW_QUERIES = 50
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.since = timezone.now()
+            self.requests = 0
+            self.queries = 0
+            self.db_time = 0.0
+            self.views = {}
+            self.slow = deque(maxlen=self.MAX_SLOW_QUERIES)
+
+    def record(self, recorder, elapsed):
+        with self._lock:
+            self.requests += 1
+            self.queries += recorder.count
+            self.db_time += recorder.db_time
+            view = self.views.get(recorder.name)
+            if view is None:
+                view = self.views[recorder.name] = {'requests': 0, 'queries': 0, 'max_queries': 0, 'db_time': 0.0, 'time': 0.0}
+            view['requests'] += 1
+            view['queries'] += recorder.count
+            view['max_queries'] = max(view['max_queries'], recorder.count)
+            view['db_time'] += recorder.db_time
+            view['time'] += elapsed
+            for sql, took in recorder.slow:
+                self.slow.append({'sql': _truncate(sql), 'time': round(took, 4), 'view': recorder.name, 'at': timezone.now().isoformat()})
+
+    def summary(self, views=10):
+        """Totals, the views with the most database time and recent slow statements"""
+        with self._lock:
+            busiest = sorted(self.views.items(), key=lambda item: item[1]['db_time'], reverse=True)[:views]
+            return {
+                'process': os.getpid(),
+                'since': self.since.isoformat(),
+                'sample_rate': settings.QUERY_INSTRUMENTATION_SAMPLE_RATE,
+                'sampled_requests': self.requests,
+                'total_queries': self.queries,
+                'total_db_time_ms': round(self.db_time * 1000, 2),
+                'views': [
+                    {
+                        'view': name,
+                        'requests': view['requests'],
+                        'avg_queries': round(view['queries'] / view['requests'], 1),
+                        'max_queries': view['max_queries'],
+                        'avg_db_time_ms': round(view['db_time'] * 1000 / view['requests'], 2),
+                        'avg_time_ms': round(view['time'] * 1000 / view['requests'], 2),
+                        'total_db_time_ms': round(view['db_time'] * 1000, 2),
+                    }
+                    for name, view in busiest
+                ],
+            }
+
+query_stats = QueryStats()
+
 class PerformanceMonitor:
     """Monitor database and API performance"""
     
+    @staticmethod
+    @contextmanager
+    def instrument(name=None):
+        """
+        Record the queries run by this thread inside the block
+
+        Feeds query_stats and the log: a debug line per block, a warning when
+        it ran more than QUERY_COUNT_WARNING queries and one per slow statement.
+        Set recorder.name inside the block if the name is not known up front.
+        """
+        recorder = QueryRecorder(name)
+        start_time = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(recorder))
+                yield recorder
+        finally:
+            execution_time = time.perf_counter() - start_time
+            query_stats.record(recorder, execution_time)
+            
+            logger.debug(
+                f"VIEW: {recorder.name} | QUERIES: {recorder.count} | "
+                f"DB: {recorder.db_time * 1000:.1f}ms | TIME: {execution_time:.3f}s"
+            )
+            if recorder.count > settings.QUERY_COUNT_WARNING:
+                logger.warning(f"HIGH QUERY COUNT in {recorder.name}: {recorder.count} queries")
+            for sql, took in recorder.slow:
+                logger.warning(f"SLOW QUERY in {recorder.name} ({took * 1000:.0f}ms): {_truncate(sql)}")
+    
     @staticmethod
     def log_query_count(view_name):
         """Decorator to log database query count for views"""
         def decorator(view_func):
+            @wraps(view_func)
             def wrapper(*args, **kwargs):
-                # Reset query log
-                from django.db import reset_queries
-                reset_queries()
-                
-                start_time = time.time()
-                result = view_func(*args, **kwargs)
-                end_time = time.time()
-                
-                # Log performance metrics
-                query_count = len(connection.queries)
-                execution_time = end_time - start_time
-                
-                logger.info(f"VIEW: {view_name} | QUERIES: {query_count} | TIME: {execution_time:.3f}s")
-                
-                if query_count > 10:
-                    logger.warning(f"HIGH QUERY COUNT in {view_name}: {query_count} queries")
-                
-                return result
+                with PerformanceMonitor.instrument(view_name):
+                    return view_func(*args, **kwargs)
             return wrapper
         return decorator
     
     @staticmethod
     def get_slow_queries():
-        """Get slow queries from Django connection (development only)"""
-        if not settings.DEBUG:
-            return []
-        
-        slow_queries = []
-        for query in connection.queries:
-            time_taken = float(query['time'])
-            if time_taken > 0.1:  # Queries taking more than 100ms
-                slow_queries.append({
-                    'sql': query['sql'][:200] + '...' if len(query['sql']) > 200 else query['sql'],
-                    'time': time_taken
-                })
+        """Recent slow queries recorded in this process, slowest first"""
+        with query_stats._lock:
+            slow_queries = list(query_stats.slow)
         
         return sorted(slow_queries, key=lambda x: x['time'], reverse=True)
 
@@ -133,7 +236,7 @@ def performance_dashboard(request):
     try:
         dashboard_data = {
             'database': {
-                'total_queries': len(connection.queries),
+                **query_stats.summary(),
                 'slow_queries': PerformanceMonitor.get_slow_queries()[:5],
             },
             'cache': {
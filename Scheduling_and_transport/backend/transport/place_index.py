@@ -0,0 +1,301 @@
+"""
+In-memory place autocomplete index for Falcon Bus Lines
+A per-process prefix trie over the canonical places used by active
+routes. Every trie node keeps its best-ranked places precomputed, so a
+suggestion lookup walks len(query) nodes and touches no database.
+
+Places are ranked by how many active routes depart from (or arrive at)
+them. Each word of a place name is indexed, so 'eliz' finds Port
+Elizabeth as well as 'port'.
+
+The index is built on the job runner at startup (or by the first lookup,
+if that comes sooner) and then patched when a route is saved or deleted
+in this process. Changes made by other processes bump a version number
+in the cache; a stale index is rebuilt on the job runner while the old
+one keeps answering.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+import logging
+import threading
+
+from .places import normalize_place_name
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'place_index_version'
+
+# Suggestions precomputed per trie node
+TOP_K = 10
+
+ROLES = ('origin', 'destination')
+
+# Rankings precomputed per node: overall, by departures and by arrivals
+RANKINGS = (None,) + ROLES
+
+class _Node:
+    __slots__ = ('children', 'keys', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.keys = set()
+        self.top = {}
+
+class PlaceIndex:
+    """Prefix trie of places with per-node top-K suggestions"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._root = _Node()
+        self._places = {}
+        self._built = False
+        self._version = None
+        self._rebuilding = False
+
+    @staticmethod
+    def _index_terms(key):
+        """The key itself and every word-start suffix of it"""
+        words = key.split(' ')
+        return {' '.join(words[i:]) for i in range(len(words))}
+
+    @staticmethod
+    def _score(place, role):
+        if role == 'origin':
+            return place['departures']
+        if role == 'destination':
+            return place['arrivals']
+        return place['departures'] + place['arrivals']
+
+    def _rank(self, keys, role=None):
+        if role is not None:
+            keys = [key for key in keys if self._score(self._places[key], role)]
+        ranked = sorted(
+            keys,
+            key=lambda key: (-self._score(self._places[key], role), self._places[key]['name'])
+        )
+        return tuple(ranked[:TOP_K])
+
+    def _path(self, term, create=False):
+        """Nodes from the root down to term (None if the prefix is unknown)"""
+        node = self._root
+        path = [node]
+        for char in term:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[char] = _Node()
+            node = child
+            path.append(node)
+        return path
+
+    def _refresh_top(self, path):
+        for node in path:
+            node.top = {role: self._rank(node.keys, role) for role in RANKINGS}
+
+    def _insert(self, key, refresh=True):
+        for term in self._index_terms(key):
+            path = self._path(term, create=True)
+            for node in path:
+                node.keys.add(key)
+            if refresh:
+                self._refresh_top(path)
+
+    def _refresh_all(self):
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            self._refresh_top([node])
+            stack.extend(node.children.values())
+
+    def _remove(self, key):
+        for term in self._index_terms(key):
+            path = self._path(term)
+            if path is None:
+                continue
+            for node in path:
+                node.keys.discard(key)
+            self._refresh_top(path)
+            # Prune branches that no longer lead to any place
+            for parent, node, char in reversed(list(zip(path, path[1:], term))):
+                if node.keys:
+                    break
+                del parent.children[char]
+
+    def _load_places(self, place_ids=None):
+        """Active-route counts per place, straight from the database"""
+        from django.db.models import Count, Q
+        from .models import Place
+
+        places = Place.objects.annotate(
+            departures=Count('departing_routes', filter=Q(departing_routes__is_active=True), distinct=True),
+            arrivals=Count('arriving_routes', filter=Q(arriving_routes__is_active=True), distinct=True),
+        )
+        if place_ids is not None:
+            places = places.filter(id__in=place_ids)
+
+        return {
+            place.key: {
+                'id': place.id,
+                'name': place.name,
+                'departures': place.departures,
+                'arrivals': place.arrivals,
+            }
+            for place in places
+        }
+
+    def rebuild(self):
+        """Rebuild the whole trie from the database"""
+        version = cache.get(VERSION_CACHE_KEY, 0)
+        places = {key: place for key, place in self._load_places().items() if place['departures'] or place['arrivals']}
+
+        # Build aside and swap in, so lookups keep using the old trie meanwhile
+        fresh = PlaceIndex()
+        fresh._places = places
+        for key in places:
+            fresh._insert(key, refresh=False)
+        fresh._refresh_all()
+
+        with self._lock:
+            self._root = fresh._root
+            self._places = places
+            self._built = True
+            self._version = version
+
+        logger.info(f"Place index built with {len(places)} place(s)")
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        finally:
+            self._rebuilding = False
+
+    def refresh_places(self, place_ids):
+        """Re-read the given places and patch the trie without a full rebuild"""
+        loaded = self._load_places(place_ids)
+        with self._lock:
+            if not self._built:
+                return
+            stale = [key for key, place in self._places.items() if place['id'] in place_ids and key not in loaded]
+            for key in stale:
+                self._remove(key)
+                del self._places[key]
+
+            for key, place in loaded.items():
+                active = place['departures'] or place['arrivals']
+                if key in self._places:
+                    self._remove(key)
+                    del self._places[key]
+                if active:
+                    self._places[key] = place
+                    self._insert(key)
+
+    def mark_changed(self, place_ids):
+        """Patch this process and tell other processes their index is stale"""
+        try:
+            version = cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            version = 1
+            cache.set(VERSION_CACHE_KEY, version, None)
+        self.refresh_places(place_ids)
+        with self._lock:
+            # Only skip a rebuild if no other process changed anything in between
+            if self._built and self._version == version - 1:
+                self._version = version
+
+    def _ensure_fresh(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.rebuild()
+            return
+
+        if cache.get(VERSION_CACHE_KEY, 0) == self._version or self._rebuilding:
+            return
+
+        # Another process changed routes: rebuild off the request path
+        from .jobs import job_runner
+
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        try:
+            job_runner.submit(self._rebuild_in_background, name='place-index-rebuild')
+        except Exception as e:
+            self._rebuilding = False
+            logger.error(f"Could not schedule place index rebuild: {str(e)}")
+
+    def suggest(self, query, role=None, limit=TOP_K):
+        """
+        Ranked places whose name (or any word of it) starts with query
+
+        Args:
+            query: Text typed so far
+            role: 'origin' or 'destination' to rank by departures or arrivals
+            limit: Maximum suggestions (at most TOP_K)
+
+        Returns:
+            list: Dicts with id, name, departures and arrivals
+        """
+        self._ensure_fresh()
+        term = normalize_place_name(query)
+
+        with self._lock:
+            path = self._path(term) if term else None
+            if path is None:
+                return []
+            return [dict(self._places[key]) for key in path[-1].top.get(role, ())[:limit]]
+
+place_index = PlaceIndex()
+
+def warm(runner=None):
+    """Build the index on the runner so the first suggestion request does not wait for it"""
+    from .jobs import job_runner
+
+    runner = runner or job_runner
+    runner.submit(place_index._ensure_fresh, name='place-index-warm')
+
+def _route_place_ids(route):
+    return {route.origin_place_id, route.destination_place_id} - {None}
+
+def _remember_previous_places(sender, instance, **kwargs):
+    from .models import Route
+
+    instance._previous_place_ids = set()
+    if instance.pk:
+        previous = Route.objects.filter(pk=instance.pk).values('origin_place_id', 'destination_place_id').first()
+        if previous:
+            instance._previous_place_ids = {previous['origin_place_id'], previous['destination_place_id']} - {None}
+
+def places_changed(place_ids):
+    """Update the index for these places once the current transaction commits"""
+    place_ids = set(place_ids)
+
+    def update():
+        try:
+            place_index.mark_changed(place_ids)
+        except Exception as e:
+            logger.error(f"Could not update place index: {str(e)}")
+
+    transaction.on_commit(update)
+
+def routes_changed(routes):
+    """Call after bulk route updates that bypass save() (e.g. queryset.update)"""
+    place_ids = set()
+    for origin_id, destination_id in routes.values_list('origin_place_id', 'destination_place_id'):
+        place_ids.update({origin_id, destination_id} - {None})
+    places_changed(place_ids)
+
+def _route_changed(sender, instance, **kwargs):
+    places_changed(_route_place_ids(instance) | getattr(instance, '_previous_place_ids', set()))
+
+def connect_signals():
+    """Keep the index in step with Route changes (called from TransportConfig.ready)"""
+    from .models import Route
+
+    pre_save.connect(_remember_previous_places, sender=Route, dispatch_uid='place_index_pre_save')
+    post_save.connect(_route_changed, sender=Route, dispatch_uid='place_index_post_save')
+    post_delete.connect(_route_changed, sender=Route, dispatch_uid='place_index_post_delete')
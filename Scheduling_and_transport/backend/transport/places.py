@@ -0,0 +1,47 @@
+"""
+Canonical place names for Falcon Bus Lines
+Routes reference Place rows keyed by a normalised form of the town name
+(case-folded, accents stripped, punctuation collapsed to single spaces),
+so 'Ga-Rankuwa', 'ga rankuwa' and 'GA RANKUWA' are the same place and
+searches can use the unique index on Place.key instead of scanning.
+"""
+
+import re
+import unicodedata
+
+# Most places a prefix search expands to
+MAX_PREFIX_MATCHES = 50
+
+_SEPARATORS = re.compile(r'[\W_]+')
+
+def normalize_place_name(name):
+    """
+    Search key for a place name
+
+    Example: normalize_place_name(' Ga-Rankuwa ') == 'ga rankuwa'
+    """
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _SEPARATORS.sub(' ', stripped.casefold()).strip()
+
+def match_place_ids(query):
+    """
+    IDs of the places a search term refers to
+
+    An exact key match wins; otherwise every place whose key starts with
+    the term matches (e.g. 'port' -> Port Elizabeth, Port Shepstone).
+    Both are answered from the index on Place.key.
+    """
+    from .models import Place
+
+    key = normalize_place_name(query)
+    if not key:
+        return []
+
+    matches = list(
+        Place.objects.filter(key__startswith=key)
+        .order_by('key')
+        .values_list('id', 'key')[:MAX_PREFIX_MATCHES]
+    )
+    exact = [place_id for place_id, place_key in matches if place_key == key]
+    return exact or [place_id for place_id, _ in matches]
@@ -0,0 +1,141 @@
+"""
+Booking reference allocation for Falcon Bus Lines
+
+References are assigned before a booking is inserted, so creating a
+booking is a single INSERT. Each worker reserves a block of sequence
+numbers from the database and hands them out from memory; a reference is
+'FB' followed by the sequence number, scrambled and encoded as six
+Crockford base32 characters (e.g. FB3K7Q0M). Group bookings draw from
+the same sequence with an 'FG' prefix.
+
+On PostgreSQL the block comes from a database SEQUENCE, which is never
+rolled back, so numbers are unique even if the booking transaction fails.
+Other databases use the ReferenceSequence table instead. A block reserved
+inside a transaction stays pending until that transaction commits: its
+first number is handed out, but the rest are used only once an on_commit
+hook has marked the block committed. If the transaction (or the savepoint
+the block was reserved in) is rolled back the hook never runs, so the
+block is discarded and never reused.
+
+The transaction that reserved a block cannot take more numbers from it,
+since the allocator cannot tell whether the reservation survived a
+savepoint rollback. Outside PostgreSQL, every further number that
+transaction needs reserves another block. The booking views therefore
+allocate references before they open their transaction (create_group
+takes all its passengers' references up front), so they write to
+ReferenceSequence at most once per block however many bookings they
+insert.
+
+References from before this scheme were 'FB' followed by digits only
+(FB<booking id><MMSS><digit>). Sequence numbers whose encoding is all
+digits are skipped so new references can never collide with them.
+"""
+
+from django.db import connection, transaction
+from django.db.models import F
+import os
+import threading
+
+from .models import ReferenceSequence
+
+# Must match INCREMENT BY of the PostgreSQL sequence (see migration 0015)
+BLOCK_SIZE = 50
+
+BOOKING_SEQUENCE = 'booking_reference'
+POSTGRES_SEQUENCE = 'transport_booking_reference_seq'
+
+REFERENCE_PREFIX = 'FB'
+REFERENCE_LENGTH = 6
+CROCKFORD_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+# Six base32 characters hold 30 bits; multiplying by an odd constant is a
+# bijection modulo 2**30, so scrambled references never collide but do not
+# reveal how many bookings have been made
+REFERENCE_SPACE = 32 ** REFERENCE_LENGTH
+REFERENCE_MULTIPLIER = 0x2E5BF271
+
+def encode_reference(value, prefix=REFERENCE_PREFIX):
+    """Encode a sequence number as a booking reference"""
+    scrambled = (value * REFERENCE_MULTIPLIER) % REFERENCE_SPACE
+    chars = []
+    for _ in range(REFERENCE_LENGTH):
+        scrambled, digit = divmod(scrambled, 32)
+        chars.append(CROCKFORD_ALPHABET[digit])
+    return prefix + ''.join(reversed(chars))
+
+class BlockAllocator:
+    """Hands out sequence numbers from blocks reserved in the database"""
+
+    def __init__(self, sequence_name=BOOKING_SEQUENCE, postgres_sequence=POSTGRES_SEQUENCE, block_size=BLOCK_SIZE):
+        self.sequence_name = sequence_name
+        self.postgres_sequence = postgres_sequence
+        self.block_size = block_size
+        self._local = threading.local()
+
+    def reset(self):
+        """Forget cached blocks (called in forked child processes)"""
+        self._local = threading.local()
+
+    def next_value(self):
+        """Next unused sequence number for this worker thread"""
+        state = self._local
+        if not self._block_is_usable(state):
+            state.next, state.limit = self._reserve_block()
+            state.pending = None
+            if self._needs_commit():
+                # Owned by the current transaction until it commits
+                block = object()
+
+                def mark_committed():
+                    if state.pending is block:
+                        state.pending = None
+
+                state.pending = block
+                transaction.on_commit(mark_committed)
+
+        value = state.next
+        state.next += 1
+        return value
+
+    def _block_is_usable(self, state):
+        if getattr(state, 'next', None) is None or state.next >= state.limit:
+            return False
+        # A pending block may have been rolled back with its transaction, in
+        # which case the same numbers can be reserved again by another worker
+        return state.pending is None
+
+    def _needs_commit(self):
+        return connection.vendor != 'postgresql' and connection.in_atomic_block
+
+    def _reserve_block(self):
+        """Reserve block_size numbers and return (first, limit)"""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT nextval(%s)', [self.postgres_sequence])
+                first = cursor.fetchone()[0]
+            return first, first + self.block_size
+
+        with transaction.atomic():
+            # UPDATE first so the row (or database) write lock is held before reading
+            updated = ReferenceSequence.objects.filter(name=self.sequence_name).update(
+                next_value=F('next_value') + self.block_size
+            )
+            if not updated:
+                ReferenceSequence.objects.create(name=self.sequence_name, next_value=1 + self.block_size)
+            limit = ReferenceSequence.objects.filter(name=self.sequence_name).values_list(
+                'next_value', flat=True
+            ).get()
+        return limit - self.block_size, limit
+
+booking_reference_allocator = BlockAllocator()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=booking_reference_allocator.reset)
+
+def allocate_booking_reference(prefix=REFERENCE_PREFIX):
+    """Allocate a new, unique booking reference without touching the bookings table"""
+    while True:
+        reference = encode_reference(booking_reference_allocator.next_value(), prefix)
+        # All-digit references are the legacy format
+        if not reference[len(prefix):].isdigit():
+            return reference
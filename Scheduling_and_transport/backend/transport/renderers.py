@@ -0,0 +1,122 @@
+"""
+Fast JSON and MessagePack rendering for the REST API
+FastJSONRenderer and FastJSONParser encode and decode with orjson when it
+is installed and fall back to DRF's stdlib JSONRenderer and JSONParser
+otherwise. The output matches what DRF would send: compact UTF-8,
+Decimal as a number, datetimes in the current zone with 'Z' for UTC, and
+\\u2028/\\u2029 escaped. Every value orjson does not map exactly the same
+way goes through DRF's own encoder.
+
+Floats are the exception. orjson writes NaN and Infinity as null, so
+when the output holds a null the data is checked for them and handed to
+JSONRenderer, which refuses them as before. Very large and very small
+floats are the same numbers but spelled differently (1e16 for 1e+16,
+0.00001 for 1e-05).
+
+MessagePackRenderer is an opt-in compact binary format for internal
+clients that send Accept: application/msgpack. It is only enabled when
+msgpack is installed (see REST_FRAMEWORK in settings).
+"""
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+import math
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# DRF's conversions for dates, times, Decimal, lazy strings, querysets etc.
+_default = JSONEncoder().default
+
+if orjson is not None:
+    # Datetimes go through DRF's encoder ('Z' suffix); int dictionary keys
+    # become strings as with the json module
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+def _has_non_finite_float(data):
+    """True if data holds NaN or an infinity, which orjson would write as null"""
+    pending = [data]
+    while pending:
+        value = pending.pop()
+        kind = type(value)
+        # Exact type checks first: most values are plain scalars
+        if kind is str or kind is int or kind is bool or value is None:
+            continue
+        if kind is float:
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+        elif isinstance(value, float) and not math.isfinite(value):
+            return True
+    return False
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson (stdlib json when orjson is missing or for indented output)"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # Values orjson rejects outright (e.g. integers over 64 bits)
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'null' in ret and _has_non_finite_float(data):
+            # Raises 'Out of range float values are not JSON compliant'
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Keep the output a strict JavaScript subset, as JSONRenderer does
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+class FastJSONParser(JSONParser):
+    """JSONParser backed by orjson (stdlib json when orjson is missing)"""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            # orjson rejects NaN and Infinity, as strict JSONParser does
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack for internal clients (Accept: application/msgpack)
+
+    Values are converted as for JSON, so a client decodes the same
+    structure it would get from the JSON API.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True, datetime=False)
@@ -0,0 +1,321 @@
+"""
+Seat reservation service for Falcon Bus Lines
+Reserves and releases seats with single conditional UPDATE statements
+so concurrent bookings can never oversell a schedule, claims specific
+seats on the per-schedule seat map, and expires unpaid seat holds so
+abandoned checkouts return their seats
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+from .models import Schedule, Booking
+from .search_cache import SearchCache
+from .availability_calendar import AvailabilityCalendar
+from .seat_map import SeatMap
+from . import booking_events, seat_events
+
+logger = logging.getLogger(__name__)
+
+class SeatSelectionError(Exception):
+    """Raised when a seat selection request cannot be processed"""
+
+class SeatReservationService:
+    """Atomic seat inventory operations on Schedule.available_seats"""
+
+    # Booking statuses that currently occupy a seat on their schedule
+    SEAT_HOLDING_STATUSES = ('pending_payment', 'payment_processing', 'confirmed')
+    
+    # Unpaid statuses whose seat is only held until hold_expires_at
+    HOLD_STATUSES = ('pending_payment', 'payment_processing')
+    
+    SWEEP_BATCH_SIZE = 500
+    SWEEP_CACHE_KEY = 'seat_hold_sweep_lock'
+    
+    # Compare-and-swap retries before giving up on a contended seat map
+    SEAT_MAP_MAX_ATTEMPTS = 50
+
+    @staticmethod
+    def hold_expiry():
+        """Expiry timestamp for a seat hold created now"""
+        return timezone.now() + timedelta(minutes=settings.SEAT_HOLD_MINUTES)
+
+    @staticmethod
+    def reserve_seats(schedule_id, seats=1):
+        """
+        Take seats from a schedule if enough are still available
+
+        The availability check and the decrement happen in one guarded
+        UPDATE ... WHERE available_seats >= seats, so the database row lock
+        is held only for the duration of that statement.
+
+        Args:
+            schedule_id: ID of the schedule to reserve on
+            seats: Number of seats to take
+
+        Returns:
+            bool: True if the seats were reserved, False if sold out
+        """
+        updated = Schedule.objects.filter(
+            id=schedule_id,
+            available_seats__gte=seats
+        ).update(
+            available_seats=F('available_seats') - seats,
+            updated_at=timezone.now()
+        )
+
+        if updated:
+            SearchCache.schedules_changed([schedule_id])
+            AvailabilityCalendar.schedules_changed([schedule_id])
+            seat_events.schedules_changed([schedule_id])
+        else:
+            logger.info(f"Seat reservation refused for schedule {schedule_id}: fewer than {seats} seats left")
+
+        return updated == 1
+
+    @classmethod
+    def release_seats(cls, schedule_id, seats=1, seat_numbers=None):
+        """
+        Give previously reserved seats back to a schedule
+
+        Args:
+            schedule_id: ID of the schedule to release on
+            seats: Number of seats to return
+            seat_numbers: Selected seat numbers to free on the seat map (optional)
+        """
+        if seat_numbers:
+            cls._update_seat_map(schedule_id, seat_numbers, seats_delta=seats, claim=False)
+        else:
+            Schedule.objects.filter(id=schedule_id).update(
+                available_seats=F('available_seats') + seats,
+                updated_at=timezone.now()
+            )
+            SearchCache.schedules_changed([schedule_id])
+            AvailabilityCalendar.schedules_changed([schedule_id])
+            seat_events.schedules_changed([schedule_id])
+
+        logger.info(f"Released {seats} seat(s) on schedule {schedule_id}")
+
+    @classmethod
+    def claim_seats(cls, schedule_id, seat_numbers):
+        """
+        Take specific seats from a schedule's seat map
+
+        The seat map and available_seats are updated together by a
+        compare-and-swap UPDATE that only succeeds if the map is unchanged
+        since it was read, so two buyers can never claim the same seat.
+
+        Args:
+            schedule_id: ID of the schedule to claim on
+            seat_numbers: Seat numbers to claim (1-based)
+
+        Returns:
+            bool: True if every seat was claimed, False if any is taken or the schedule is sold out
+
+        Raises:
+            SeatSelectionError: Unknown schedule, invalid seat number or persistent contention
+        """
+        seat_numbers = sorted(set(seat_numbers))
+        return cls._update_seat_map(schedule_id, seat_numbers, seats_delta=-len(seat_numbers), claim=True)
+
+    @classmethod
+    def _update_seat_map(cls, schedule_id, seat_numbers, seats_delta, claim):
+        """Compare-and-swap the seat map and available_seats of one schedule"""
+        for attempt in range(cls.SEAT_MAP_MAX_ATTEMPTS):
+            row = Schedule.objects.filter(id=schedule_id).values(
+                'seat_map', 'available_seats', 'bus__total_seats'
+            ).first()
+            if row is None:
+                raise SeatSelectionError(f'Schedule {schedule_id} not found')
+
+            current = bytes(row['seat_map'] or b'')
+            seat_map = SeatMap.from_bytes(current, row['bus__total_seats'])
+
+            try:
+                if claim and not seat_map.is_free(seat_numbers):
+                    return False
+            except ValueError as e:
+                raise SeatSelectionError(str(e))
+
+            if row['available_seats'] + seats_delta < 0:
+                return False
+
+            if claim:
+                seat_map.claim(seat_numbers)
+            else:
+                seat_map.release(seat_numbers)
+
+            updated = Schedule.objects.filter(id=schedule_id, seat_map=current).update(
+                seat_map=seat_map.to_bytes(),
+                available_seats=F('available_seats') + seats_delta,
+                updated_at=timezone.now()
+            )
+            if updated:
+                SearchCache.schedules_changed([schedule_id])
+                AvailabilityCalendar.schedules_changed([schedule_id])
+                seat_events.schedules_changed([schedule_id])
+                return True
+
+        raise SeatSelectionError('Seat map is busy, please try again')
+
+    @classmethod
+    def reserve(cls, schedule_id, seats=1, seat_numbers=None):
+        """
+        Take seats by number where a selection was made and by count for the rest
+
+        All or nothing: if any part fails, nothing is reserved.
+
+        Args:
+            schedule_id: ID of the schedule to reserve on
+            seats: Total number of seats to take
+            seat_numbers: Specific seat numbers among those seats (optional)
+
+        Returns:
+            bool: True if every seat was reserved
+        """
+        seat_numbers = seat_numbers or []
+        unnumbered = seats - len(seat_numbers)
+
+        if not seat_numbers:
+            return cls.reserve_seats(schedule_id, seats)
+        if not unnumbered:
+            return cls.claim_seats(schedule_id, seat_numbers)
+
+        with transaction.atomic():
+            if cls.claim_seats(schedule_id, seat_numbers):
+                if cls.reserve_seats(schedule_id, unnumbered):
+                    return True
+                transaction.set_rollback(True)
+        return False
+
+    @classmethod
+    def reserve_booking(cls, booking):
+        """Take the seat(s) for a booking, honouring its selected seat number"""
+        return cls.reserve(
+            booking.schedule_id,
+            booking.number_of_seats,
+            seat_numbers=[booking.seat_number] if booking.seat_number else None
+        )
+
+    @classmethod
+    def release_booking(cls, booking):
+        """Return the seat(s) held by a booking, freeing its selected seat number"""
+        cls.release_seats(
+            booking.schedule_id,
+            booking.number_of_seats,
+            seat_numbers=[booking.seat_number] if booking.seat_number else None
+        )
+
+    @classmethod
+    def release_bookings(cls, schedule_id, bookings):
+        """Return the seats held by several bookings on one schedule in a single update"""
+        bookings = list(bookings)
+        if not bookings:
+            return
+        cls.release_seats(
+            schedule_id,
+            sum(booking.number_of_seats for booking in bookings),
+            seat_numbers=[booking.seat_number for booking in bookings if booking.seat_number]
+        )
+
+    @staticmethod
+    def get_seat_map(schedule):
+        """
+        Describe seat occupancy for a schedule
+
+        Seats reserved without a seat number are not on the map, so
+        available_seats can be lower than the count of free map positions.
+        """
+        seat_map = SeatMap.from_bytes(schedule.seat_map, schedule.bus.total_seats)
+        return {
+            'schedule_id': schedule.id,
+            'total_seats': seat_map.total_seats,
+            'available_seats': schedule.available_seats,
+            'taken_seats': seat_map.taken_seats(),
+            'seat_map': seat_map.to_bytes().hex(),
+        }
+
+    @classmethod
+    def release_expired_holds(cls, schedule_id=None):
+        """
+        Expire unpaid bookings whose hold has lapsed and return their seats
+
+        Expired bookings are marked in one UPDATE per batch and seats are
+        given back with one UPDATE per affected schedule, not per booking.
+
+        Args:
+            schedule_id: Only sweep holds on this schedule (default: all)
+
+        Returns:
+            int: Number of seats returned to inventory
+        """
+        released = 0
+
+        while True:
+            with transaction.atomic():
+                expired = Booking.objects.filter(
+                    status__in=cls.HOLD_STATUSES,
+                    hold_expires_at__lte=timezone.now()
+                )
+                if schedule_id is not None:
+                    expired = expired.filter(schedule_id=schedule_id)
+
+                # Lock the batch so concurrent sweepers skip rows already being expired
+                booking_ids = list(
+                    expired.select_for_update(skip_locked=True)
+                    .values_list('id', flat=True)[:cls.SWEEP_BATCH_SIZE]
+                )
+                if not booking_ids:
+                    break
+
+                seats_by_schedule = {}
+                for row in (
+                    Booking.objects.filter(id__in=booking_ids)
+                    .values('schedule_id', 'seat_number')
+                    .annotate(seats=Sum('number_of_seats'))
+                ):
+                    held = seats_by_schedule.setdefault(row['schedule_id'], {'seats': 0, 'seat_numbers': []})
+                    held['seats'] += row['seats']
+                    if row['seat_number']:
+                        held['seat_numbers'].append(row['seat_number'])
+
+                Booking.objects.filter(id__in=booking_ids).update(
+                    status='expired',
+                    payfast_payment_status='EXPIRED',
+                    payment_failure_reason='Seat hold expired before payment was completed',
+                    updated_at=timezone.now()
+                )
+                booking_events.bookings_changed(booking_ids)
+
+                for held_schedule_id, held in seats_by_schedule.items():
+                    cls.release_seats(held_schedule_id, held['seats'], seat_numbers=held['seat_numbers'])
+                    released += held['seats']
+
+            if len(booking_ids) < cls.SWEEP_BATCH_SIZE:
+                break
+
+        if released:
+            logger.info(f"Seat hold sweep returned {released} seat(s) to inventory")
+
+        return released
+
+    @classmethod
+    def release_expired_holds_if_due(cls):
+        """
+        Run the hold sweeper at most once per sweep interval across workers
+
+        Cheap enough to call from request paths that read availability.
+        """
+        if not cache.add(cls.SWEEP_CACHE_KEY, True, settings.SEAT_HOLD_SWEEP_INTERVAL_SECONDS):
+            return 0
+
+        try:
+            return cls.release_expired_holds()
+        except Exception as e:
+            logger.error(f"Seat hold sweep failed: {str(e)}")
+            return 0
@@ -15,6 +15,7 @@ Features:
 from django.utils import timezone
 from datetime import datetime, timedelta, time
 from transport.models import Route, Bus, Schedule
+from transport.availability_calendar import AvailabilityCalendar
 import random
 import logging
 
@@ -65,54 +66,62 @@ class ScheduleManager:
         }
         
         try:
-            # Step 1: Clean up past schedules
-            if cleanup_past:
-                if dry_run:
-                    cleanup_result = self.cleanup_past_schedules(dry_run=True)
-                    stats['would_clean'] = cleanup_result.get('would_delete', 0)
-                else:
-                    stats['cleaned_schedules'] = self.cleanup_past_schedules()
-            
-            # Step 2: Generate missing schedules
-            if dry_run:
-                # For dry run, we need to count what would be created without actually creating
-                today = timezone.now().date()
-                target_date = today + timedelta(days=self.days_ahead)
+            # Per-schedule calendar refreshes are replaced by one rebuild in step 4
+            with AvailabilityCalendar.suspended():
+                # Step 1: Clean up past schedules
+                if cleanup_past:
+                    if dry_run:
+                        cleanup_result = self.cleanup_past_schedules(dry_run=True)
+                        stats['would_clean'] = cleanup_result.get('would_delete', 0)
+                    else:
+                        stats['cleaned_schedules'] = self.cleanup_past_schedules()
                 
-                routes = Route.objects.filter(is_active=True)
-                would_create = 0
-                
-                for route in routes:
-                    operating_days = route.get_operating_days_list()
-                    departure_times = self.route_schedules.get(route.origin, ['08:00'])
+                # Step 2: Generate missing schedules
+                if dry_run:
+                    # For dry run, we need to count what would be created without actually creating
+                    today = timezone.now().date()
+                    target_date = today + timedelta(days=self.days_ahead)
                     
-                    current_date = today
-                    while current_date <= target_date:
-                        day_name = self.weekdays[current_date.weekday()]
-                        
-                        if day_name in operating_days:
-                            for time_str in departure_times:
-                                hour, minute = map(int, time_str.split(':'))
-                                departure_datetime = timezone.make_aware(
-                                    datetime.combine(current_date, time(hour, minute))
-                                )
-                                
-                                # Check if schedule already exists
-                                if not Schedule.objects.filter(
-                                    route=route,
-                                    departure_time=departure_datetime
-                                ).exists():
-                                    would_create += 1
+                    routes = Route.objects.filter(is_active=True)
+                    would_create = 0
+                    
+                    for route in routes:
+                        operating_days = route.get_operating_days_list()
+                        departure_times = self.route_schedules.get(route.origin, ['08:00'])
                         
-                        current_date += timedelta(days=1)
-                
-                stats['would_create'] = would_create
-            else:
-                stats['created_schedules'] = self.generate_missing_schedules()
+                        current_date = today
+                        while current_date <= target_date:
+                            day_name = self.weekdays[current_date.weekday()]
+                            
+                            if day_name in operating_days:
+                                for time_str in departure_times:
+                                    hour, minute = map(int, time_str.split(':'))
+                                    departure_datetime = timezone.make_aware(
+                                        datetime.combine(current_date, time(hour, minute))
+                                    )
+                                    
+                                    # Check if schedule already exists
+                                    if not Schedule.objects.filter(
+                                        route=route,
+                                        departure_time=departure_datetime
+                                    ).exists():
+                                        would_create += 1
+                            
+                            current_date += timedelta(days=1)
+                    
+                    stats['would_create'] = would_create
+                else:
+                    stats['created_schedules'] = self.generate_missing_schedules()
             
             # Step 3: Get final count
             stats['total_future_schedules'] = self.get_future_schedules_count()
             
+            # Step 4: Bring the availability calendar and journey planner timetables up to date
+            if not dry_run:
+                from .journey_planner import refresh_after_maintenance
+                AvailabilityCalendar.rebuild()
+                refresh_after_maintenance()
+            
             logger.info(f"Schedule maintenance completed: {stats}")
             return stats
             
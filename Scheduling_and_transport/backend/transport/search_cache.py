@@ -0,0 +1,276 @@
+"""
+Versioned schedule search cache for Falcon Bus Lines
+Search responses are cached under a key built from version numbers kept
+in the cache:
+
+- a network version, bumped when routes, buses or places change
+- one availability version per route, bumped whenever seats, prices or
+  activity of any of its schedules change (and when schedules are added
+  or removed)
+
+Flexible-date searches read a compact availability matrix instead: per
+route, one (departures, seats left, cheapest fare) cell per calendar day,
+built from RouteAvailabilityDay and cached under the same network and
+route versions.
+
+A change bumps the versions it touches, so later searches build a new key
+and never see the old entry; nothing has to be deleted. Versions are
+bumped both when the change is made and again after its transaction
+commits, so a search that read the data mid-transaction cannot leave a
+stale entry behind. A repeated search resolves its routes, versions and
+result from the cache without querying the database.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from datetime import datetime, timedelta
+import hashlib
+import json
+import logging
+import time
+
+from .places import normalize_place_name
+
+logger = logging.getLogger(__name__)
+
+NETWORK_VERSION_KEY = 'search:network_version'
+ALL_ROUTES_VERSION_KEY = 'search:all_routes_version'
+ROUTE_VERSION_KEY = 'search:route_version:{}'
+SCHEDULE_ROUTE_KEY = 'search:schedule_route:{}'
+MATRIX_KEY = 'search:matrix:{}:{}:{}:{}'
+
+def _initial_version():
+    # A version key evicted from the cache must not restart at a number it
+    # has used before, so versions start from the clock instead of zero
+    return time.time_ns()
+
+def _get_versions(keys):
+    """Current values of version keys, creating any that are missing"""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return versions
+
+def _incr(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), None)
+
+def _bump(keys):
+    """Bump now and again once the current transaction commits"""
+    keys = list(keys)
+    if not keys:
+        return
+    _incr(keys)
+    transaction.on_commit(lambda: _incr(keys))
+
+class SearchCache:
+    """Cached schedule search results keyed by route availability versions"""
+
+    @staticmethod
+    def routes_changed(route_ids):
+        """Invalidate searches covering these routes (seats, prices or schedules changed)"""
+        _bump([ROUTE_VERSION_KEY.format(route_id) for route_id in set(route_ids)] + [ALL_ROUTES_VERSION_KEY])
+
+    @classmethod
+    def schedules_changed(cls, schedule_ids):
+        """Invalidate searches covering the routes of these schedules"""
+        cls.routes_changed(cls.route_ids_for_schedules(schedule_ids))
+
+    @staticmethod
+    def network_changed():
+        """Invalidate every search (routes, buses or places changed)"""
+        _bump([NETWORK_VERSION_KEY, ALL_ROUTES_VERSION_KEY])
+
+    @staticmethod
+    def availability_version():
+        """Version that changes whenever any route's availability or the network changes"""
+        return _get_versions([ALL_ROUTES_VERSION_KEY])[ALL_ROUTES_VERSION_KEY]
+
+    @staticmethod
+    def route_ids_for_schedules(schedule_ids):
+        """Route of each schedule, remembered in the cache since it never changes"""
+        from .models import Schedule
+
+        schedule_ids = set(schedule_ids)
+        cached = cache.get_many([SCHEDULE_ROUTE_KEY.format(schedule_id) for schedule_id in schedule_ids])
+        route_ids = set(cached.values())
+
+        missing = [
+            schedule_id for schedule_id in schedule_ids
+            if SCHEDULE_ROUTE_KEY.format(schedule_id) not in cached
+        ]
+        if missing:
+            rows = dict(Schedule.objects.filter(id__in=missing).values_list('id', 'route_id'))
+            cache.set_many({SCHEDULE_ROUTE_KEY.format(schedule_id): route_id for schedule_id, route_id in rows.items()}, None)
+            route_ids.update(rows.values())
+
+        return route_ids
+
+    @staticmethod
+    def _key(*parts):
+        return 'search:result:' + hashlib.sha1(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def _matching_route_ids(cls, network_version, origin, destination, route):
+        """Route IDs for the search terms, cached per network version"""
+        from .search_service import ScheduleSearchService
+
+        key = cls._key('routes', network_version, normalize_place_name(origin), normalize_place_name(destination), route)
+        route_ids = cache.get(key)
+        if route_ids is None:
+            route_ids = sorted(ScheduleSearchService.matching_route_ids(origin, destination, route))
+            cache.set(key, route_ids, settings.SEARCH_CACHE_TTL_SECONDS)
+        return route_ids
+
+    @classmethod
+    def search(cls, origin=None, destination=None, route=None, date=None, fields=None, include=()):
+        """
+        Serialized search results, from the cache when nothing they depend on changed
+
+        fields and include select a sparse or sideloading rendering (see
+        FastSerializer); with include the result is {'results', 'included'}.
+
+        Raises:
+            ValueError: date is not YYYY-MM-DD
+        """
+        from .fast_serializers import FastSerializer
+        from .search_service import ScheduleSearchService
+        from .serializers import SimpleScheduleSerializer
+
+        if date:
+            # Validate before building a key, so bad input is never cached
+            ScheduleSearchService.day_bounds(date)
+
+        network_version = _get_versions([NETWORK_VERSION_KEY])[NETWORK_VERSION_KEY]
+
+        if origin or destination or route:
+            route_ids = cls._matching_route_ids(network_version, origin, destination, route)
+            if not route_ids:
+                return {'results': [], 'included': {}} if include else []
+            version_keys = [ROUTE_VERSION_KEY.format(route_id) for route_id in route_ids]
+            versions = _get_versions(version_keys)
+            key = cls._key('search', network_version, [versions[k] for k in version_keys], route_ids, date, fields, include)
+        else:
+            route_ids = None
+            all_routes_version = _get_versions([ALL_ROUTES_VERSION_KEY])[ALL_ROUTES_VERSION_KEY]
+            key = cls._key('search', network_version, all_routes_version, date, fields, include)
+
+        data = cache.get(key)
+        if data is not None:
+            return data
+
+        # Plain dicts straight from one values() query, same output as SimpleScheduleSerializer
+        schedules = ScheduleSearchService.queryset(route_ids=route_ids, date=date)
+        fast = FastSerializer.for_class(SimpleScheduleSerializer, fields, include)
+        included = {}
+        data = fast.serialize(schedules, included) if schedules is not None else []
+        if include:
+            data = {'results': data, 'included': included}
+        cache.set(key, data, settings.SEARCH_CACHE_TTL_SECONDS)
+        return data
+
+    @staticmethod
+    def availability_matrix(route_ids, network_version=None):
+        """
+        Availability per route and day for the calendar window, cached per
+        network and route version
+
+        A calendar rebuild only bumps the network version, so the matrix
+        must not outlive it.
+
+        Returns:
+            tuple: (first date, {route_id: list with one cell per day}) where a
+            cell is (departures, seats_left, min_price_zar) or None without departures
+        """
+        from .models import RouteAvailabilityDay
+
+        start = timezone.localdate()
+        days = settings.AVAILABILITY_CALENDAR_DAYS
+        if network_version is None:
+            network_version = _get_versions([NETWORK_VERSION_KEY])[NETWORK_VERSION_KEY]
+        version_keys = {route_id: ROUTE_VERSION_KEY.format(route_id) for route_id in route_ids}
+        versions = _get_versions(list(version_keys.values()))
+        keys = {
+            route_id: MATRIX_KEY.format(network_version, route_id, versions[version_key], start.toordinal())
+            for route_id, version_key in version_keys.items()
+        }
+
+        cached = cache.get_many(list(keys.values()))
+        matrix = {route_id: cached[key] for route_id, key in keys.items() if key in cached}
+
+        missing = [route_id for route_id in route_ids if route_id not in matrix]
+        if missing:
+            fresh = {route_id: [None] * days for route_id in missing}
+            rows = RouteAvailabilityDay.objects.filter(
+                route_id__in=missing, date__gte=start, date__lt=start + timedelta(days=days)
+            ).values_list('route_id', 'date', 'departures', 'seats_left', 'min_price_zar')
+            for route_id, day, departures, seats_left, min_price in rows:
+                fresh[route_id][(day - start).days] = (departures, seats_left, min_price)
+            cache.set_many({keys[route_id]: cells for route_id, cells in fresh.items()}, settings.SEARCH_CACHE_TTL_SECONDS)
+            matrix.update(fresh)
+
+        return start, matrix
+
+    @classmethod
+    def flexible_search(cls, origin=None, destination=None, route=None, date=None, flex_days=3):
+        """
+        Departures, seats left and cheapest fare per day for date +/- flex_days
+
+        Days before today are left out; days with no departures are included
+        with zero departures so the client can show a full strip of dates.
+
+        Returns:
+            list: One dict per day with date, departures, seats_left and min_price_zar
+
+        Raises:
+            ValueError: date is not YYYY-MM-DD
+        """
+        center = datetime.strptime(date, '%Y-%m-%d').date()
+
+        network_version = _get_versions([NETWORK_VERSION_KEY])[NETWORK_VERSION_KEY]
+        route_ids = cls._matching_route_ids(network_version, origin, destination, route)
+        start, matrix = cls.availability_matrix(route_ids, network_version)
+
+        results = []
+        for shift in range(-flex_days, flex_days + 1):
+            day = center + timedelta(days=shift)
+            offset = (day - start).days
+            if offset < 0:
+                continue
+            cells = [
+                cells_by_day[offset] for cells_by_day in matrix.values()
+                if offset < len(cells_by_day) and cells_by_day[offset] is not None
+            ]
+            prices = [min_price for _, seats_left, min_price in cells if min_price is not None and seats_left > 0]
+            results.append({
+                'date': day,
+                'departures': sum(departures for departures, _, _ in cells),
+                'seats_left': sum(seats_left for _, seats_left, _ in cells),
+                'min_price_zar': min(prices) if prices else None,
+            })
+        return results
+
+def _schedule_changed(sender, instance, **kwargs):
+    cache.set(SCHEDULE_ROUTE_KEY.format(instance.pk), instance.route_id, None)
+    SearchCache.routes_changed([instance.route_id])
+
+def _network_changed(sender, instance, **kwargs):
+    SearchCache.network_changed()
+
+def connect_signals():
+    """Invalidate cached searches on model changes (called from TransportConfig.ready)"""
+    from .models import Bus, Place, Route, Schedule
+
+    post_save.connect(_schedule_changed, sender=Schedule, dispatch_uid='search_cache_schedule_save')
+    post_delete.connect(_schedule_changed, sender=Schedule, dispatch_uid='search_cache_schedule_delete')
+    for model in (Route, Bus, Place):
+        post_save.connect(_network_changed, sender=model, dispatch_uid=f'search_cache_{model.__name__}_save')
+        post_delete.connect(_network_changed, sender=model, dispatch_uid=f'search_cache_{model.__name__}_delete')
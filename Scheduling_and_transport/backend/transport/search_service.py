@@ -0,0 +1,101 @@
+"""
+Schedule search for Falcon Bus Lines
+Resolves origin and destination to canonical places first, then looks up
+schedules by route and departure-time range so every step is an index
+lookup (Place.key, route_place_pair_idx, schedule_route_time_idx) rather
+than a case-insensitive substring scan over every schedule.
+"""
+
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+
+from .models import Route, Schedule
+from .places import match_place_ids
+
+class ScheduleSearchService:
+    """Indexed schedule search by origin, destination, route and date"""
+
+    MAX_RESULTS = 100
+
+    @staticmethod
+    def day_bounds(date_string):
+        """
+        Start and end of a calendar day in the current time zone
+
+        Raises:
+            ValueError: date_string is not YYYY-MM-DD
+        """
+        day = datetime.strptime(date_string, '%Y-%m-%d').date()
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        return start, start + timedelta(days=1)
+
+    @staticmethod
+    def matching_route_ids(origin=None, destination=None, route=None):
+        """
+        IDs of routes matching the search terms, or None if no route filter applies
+
+        Origin and destination match canonical place names exactly, or by
+        prefix when no place matches exactly.
+        """
+        if not (origin or destination or route):
+            return None
+
+        routes = Route.objects.all()
+        if origin:
+            routes = routes.filter(origin_place_id__in=match_place_ids(origin))
+        if destination:
+            routes = routes.filter(destination_place_id__in=match_place_ids(destination))
+        if route:
+            routes = routes.filter(id=route)
+        return list(routes.values_list('id', flat=True))
+
+    @classmethod
+    def queryset(cls, origin=None, destination=None, route=None, date=None, limit=None, route_ids=None):
+        """
+        Sliced queryset of active schedules matching the search, in departure order
+
+        Takes the same arguments as search(). Callers that only need column
+        values can project it with values() instead of loading models.
+
+        Returns:
+            QuerySet: Schedules with route and bus selected, or None when no route matches
+
+        Raises:
+            ValueError: date is not YYYY-MM-DD
+        """
+        queryset = Schedule.objects.select_related('route', 'bus').filter(is_active=True)
+
+        if route_ids is None:
+            route_ids = cls.matching_route_ids(origin, destination, route)
+        if route_ids is not None:
+            if not route_ids:
+                return None
+            queryset = queryset.filter(route_id__in=route_ids)
+
+        if date:
+            start, end = cls.day_bounds(date)
+            queryset = queryset.filter(departure_time__gte=start, departure_time__lt=end)
+
+        return queryset.order_by('departure_time')[:limit or cls.MAX_RESULTS]
+
+    @classmethod
+    def search(cls, origin=None, destination=None, route=None, date=None, limit=None, route_ids=None):
+        """
+        Active schedules matching the search, in departure order
+
+        Args:
+            origin: Origin town (exact or prefix, case and accent insensitive)
+            destination: Destination town (same matching as origin)
+            route: Route ID
+            date: Departure date as YYYY-MM-DD
+            limit: Maximum results (default MAX_RESULTS)
+            route_ids: Already resolved route IDs (replaces origin, destination and route)
+
+        Returns:
+            list: Schedule objects with route and bus loaded
+
+        Raises:
+            ValueError: date is not YYYY-MM-DD
+        """
+        queryset = cls.queryset(origin, destination, route, date, limit, route_ids)
+        return list(queryset) if queryset is not None else []
@@ -0,0 +1,88 @@
+"""
+Live seat availability for Falcon Bus Lines
+The schedule selection page opens one Server-Sent Events stream for the
+schedules it shows (/api/schedules/events/?ids=12,13,14) instead of
+re-running the search to refresh seat counts:
+
+    retry: 3000
+    event: seats
+    data: {"12": 31, "13": 0, "14": 44}
+
+The first event carries every schedule's available_seats; later events
+carry only the schedules whose count changed since the previous one.
+
+Counts go through a PollingHub (see event_streams.py) keyed by schedule
+id. Reservations and releases in this process wake it once their
+transaction commits, and loads are at least SEAT_EVENTS_COALESCE_SECONDS
+apart, so during a sales rush a client gets one delta per interval
+however many seats are sold, and every open stream shares one query.
+Changes made by other processes arrive within SEAT_EVENTS_POLL_SECONDS.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from . import event_streams
+
+class SeatAvailabilityHub(event_streams.PollingHub):
+    """available_seats of watched schedules, keyed by schedule id"""
+
+    thread_name = 'seat-availability-hub'
+
+    @property
+    def poll_seconds(self):
+        return settings.SEAT_EVENTS_POLL_SECONDS
+
+    @property
+    def coalesce_seconds(self):
+        return settings.SEAT_EVENTS_COALESCE_SECONDS
+
+    def _load(self, schedule_ids):
+        return current_seats(schedule_ids)
+
+seat_availability_hub = SeatAvailabilityHub()
+
+def current_seats(schedule_ids):
+    """available_seats of active schedules by id (unknown and inactive schedules are left out)"""
+    from .models import Schedule
+
+    seats = {}
+    for start in range(0, len(schedule_ids), 1000):
+        chunk = schedule_ids[start:start + 1000]
+        seats.update(Schedule.objects.filter(id__in=chunk, is_active=True).values_list('id', 'available_seats'))
+    return seats
+
+def _render(changes):
+    return event_streams.sse_event('seats', changes)
+
+def _finished(sent):
+    return False
+
+def stream(seats):
+    """SSE byte chunks for the schedules in seats ({id: available_seats}), waiting on a thread (WSGI)"""
+    return event_streams.stream(
+        seat_availability_hub, seats, _render, _finished,
+        settings.SEAT_EVENTS_HEARTBEAT_SECONDS, settings.SEAT_EVENTS_MAX_SECONDS
+    )
+
+def astream(seats):
+    """SSE byte chunks for the schedules in seats, waiting on the event loop (ASGI)"""
+    return event_streams.astream(
+        seat_availability_hub, seats, _render, _finished,
+        settings.SEAT_EVENTS_HEARTBEAT_SECONDS, settings.SEAT_EVENTS_MAX_SECONDS
+    )
+
+def schedules_changed(schedule_ids):
+    """Push new seat counts of these schedules once the current transaction commits"""
+    if any(seat_availability_hub.watching(schedule_id) for schedule_id in schedule_ids):
+        transaction.on_commit(seat_availability_hub.wake)
+
+def _schedule_saved(sender, instance, **kwargs):
+    schedules_changed([instance.id])
+
+def connect_signals():
+    """Push seat counts edited through the admin or the API (called from TransportConfig.ready)"""
+    from .models import Schedule
+
+    post_save.connect(_schedule_saved, sender=Schedule, dispatch_uid='seat_events_post_save')
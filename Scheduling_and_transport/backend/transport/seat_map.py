@@ -0,0 +1,55 @@
+"""
+Compact per-schedule seat map for Falcon Bus Lines
+Stores seat occupancy as a bitset (one bit per seat, seat 1 = lowest bit)
+so a 60-seat coach fits in 8 bytes of Schedule.seat_map
+"""
+
+class SeatMap:
+    """Bitset of taken seats for one schedule"""
+
+    def __init__(self, total_seats, bits=0):
+        self.total_seats = total_seats
+        self.bits = bits
+
+    @classmethod
+    def from_bytes(cls, data, total_seats):
+        """Build a seat map from its stored binary form (empty = all free)"""
+        return cls(total_seats, int.from_bytes(bytes(data or b''), 'little'))
+
+    def to_bytes(self):
+        """Binary form for storage, sized to the coach"""
+        return self.bits.to_bytes((self.total_seats + 7) // 8, 'little')
+
+    def validate(self, seat_numbers):
+        """Raise ValueError if any seat number is outside the coach"""
+        for seat in seat_numbers:
+            if not 1 <= seat <= self.total_seats:
+                raise ValueError(f'Seat {seat} does not exist on this bus (1-{self.total_seats})')
+
+    def mask(self, seat_numbers):
+        """Bitmask covering the given seat numbers"""
+        self.validate(seat_numbers)
+        mask = 0
+        for seat in seat_numbers:
+            mask |= 1 << (seat - 1)
+        return mask
+
+    def is_free(self, seat_numbers):
+        """True if none of the given seats are taken"""
+        return not self.bits & self.mask(seat_numbers)
+
+    def claim(self, seat_numbers):
+        """Mark seats as taken"""
+        self.bits |= self.mask(seat_numbers)
+
+    def release(self, seat_numbers):
+        """Mark seats as free"""
+        self.bits &= ~self.mask(seat_numbers)
+
+    def taken_seats(self):
+        """Sorted list of taken seat numbers"""
+        return [seat for seat in range(1, self.total_seats + 1) if self.bits >> (seat - 1) & 1]
+
+    def taken_count(self):
+        """Number of taken seats"""
+        return bin(self.bits).count('1')
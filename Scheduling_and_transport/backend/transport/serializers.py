@@ -1,5 +1,7 @@
 ﻿from rest_framework import serializers
-from .models import Route, Bus, Schedule, Booking, ContactInfo, FAQ
+from django.conf import settings
+from .models import Route, Bus, Schedule, Booking, BookingGroup, ContactInfo, FAQ
+from .journey_planner import OPTIMIZE_CHOICES
 
 class BusSerializer(serializers.ModelSerializer):
     class Meta:
@@ -19,7 +21,7 @@ class ScheduleSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Schedule
-        fields = '__all__'
+        exclude = ['seat_map']
 
 class BookingSerializer(serializers.ModelSerializer):
     schedule = ScheduleSerializer(read_only=True)
@@ -56,6 +58,116 @@ class SimpleScheduleSerializer(serializers.ModelSerializer):
         fields = ['id', 'route', 'bus_number', 'bus_type', 'departure_time', 
                  'arrival_time', 'available_seats', 'price_zar']
 
+# Group booking serializers
+class GroupPassengerSerializer(serializers.ModelSerializer):
+    """One passenger in a group booking; contact details default to the group's"""
+    passenger_email = serializers.EmailField(required=False)
+    passenger_phone = serializers.CharField(
+        max_length=20, required=False,
+        validators=Booking._meta.get_field('passenger_phone').validators
+    )
+    
+    class Meta:
+        model = Booking
+        fields = ['passenger_name', 'passenger_email', 'passenger_phone', 'passenger_id_number',
+                 'date_of_birth', 'emergency_contact', 'emergency_phone', 'special_requests',
+                 'discount_type', 'seat_number']
+
+class GroupBookingSerializer(serializers.Serializer):
+    """Request body for booking several passengers on one schedule with one payment"""
+    schedule_id = serializers.IntegerField()
+    contact_name = serializers.CharField(max_length=100)
+    contact_email = serializers.EmailField()
+    contact_phone = serializers.CharField(
+        max_length=20,
+        validators=Booking._meta.get_field('passenger_phone').validators
+    )
+    passengers = GroupPassengerSerializer(many=True)
+    
+    def validate_passengers(self, passengers):
+        if not passengers:
+            raise serializers.ValidationError('At least one passenger is required.')
+        if len(passengers) > settings.GROUP_BOOKING_MAX_PASSENGERS:
+            raise serializers.ValidationError(
+                f'A group booking is limited to {settings.GROUP_BOOKING_MAX_PASSENGERS} passengers.'
+            )
+        seat_numbers = [p['seat_number'] for p in passengers if p.get('seat_number')]
+        if len(seat_numbers) != len(set(seat_numbers)):
+            raise serializers.ValidationError('Each passenger must select a different seat.')
+        return passengers
+
+class GroupMemberSerializer(serializers.ModelSerializer):
+    """Per-passenger booking summary inside a group response"""
+    class Meta:
+        model = Booking
+        fields = ['id', 'booking_id', 'booking_reference', 'passenger_name', 'seat_number',
+                 'discount_type', 'original_amount', 'discount_amount', 'total_amount_zar',
+                 'status', 'hold_expires_at']
+
+class BookingGroupSerializer(serializers.ModelSerializer):
+    schedule = SimpleScheduleSerializer(read_only=True)
+    bookings = GroupMemberSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = BookingGroup
+        fields = '__all__'
+
+# Availability calendar serializers
+class CalendarDaySerializer(serializers.Serializer):
+    """One day of a route's availability calendar"""
+    date = serializers.DateField()
+    departures = serializers.IntegerField()
+    min_price_zar = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True)
+    seats_left = serializers.IntegerField()
+
+class RouteCalendarSerializer(serializers.Serializer):
+    """A route with its availability per day"""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    origin = serializers.CharField()
+    destination = serializers.CharField()
+    days = CalendarDaySerializer(many=True)
+
+# Journey planner serializers
+class JourneyQuerySerializer(serializers.Serializer):
+    """Query parameters for /api/journeys/"""
+    origin = serializers.CharField(max_length=100)
+    destination = serializers.CharField(max_length=100)
+    depart_after = serializers.DateTimeField(required=False)
+    date = serializers.DateField(required=False)
+    optimize = serializers.ChoiceField(choices=OPTIMIZE_CHOICES, default='earliest')
+    passengers = serializers.IntegerField(min_value=1, default=1)
+    max_transfers = serializers.IntegerField(min_value=0, required=False)
+    
+    def validate_max_transfers(self, value):
+        if value + 1 > settings.JOURNEY_MAX_LEGS:
+            raise serializers.ValidationError(
+                f'At most {settings.JOURNEY_MAX_LEGS - 1} transfers are supported.'
+            )
+        return value
+
+class JourneyLegSerializer(serializers.Serializer):
+    """One bus ride within a journey"""
+    schedule_id = serializers.IntegerField()
+    route_id = serializers.IntegerField()
+    route_name = serializers.CharField()
+    origin = serializers.CharField()
+    destination = serializers.CharField()
+    departure_time = serializers.DateTimeField()
+    arrival_time = serializers.DateTimeField()
+    price_zar = serializers.DecimalField(max_digits=10, decimal_places=2)
+    available_seats = serializers.IntegerField()
+
+class JourneySerializer(serializers.Serializer):
+    """A planned journey with its totals"""
+    optimize = serializers.CharField()
+    departure_time = serializers.DateTimeField()
+    arrival_time = serializers.DateTimeField()
+    duration_minutes = serializers.IntegerField()
+    transfers = serializers.IntegerField()
+    total_price_zar = serializers.DecimalField(max_digits=10, decimal_places=2)
+    legs = JourneyLegSerializer(many=True)
+
 # Ultra-lightweight serializers for list views
 class MinimalRouteSerializer(serializers.ModelSerializer):
     """Minimal route data for quick loading"""
@@ -0,0 +1,300 @@
+"""
+Durable task queue for Falcon Bus Lines
+Background work that must survive deploys and worker restarts is stored
+in the Task table and executed by `manage.py run_task_workers`, with no
+outside broker.
+
+Workers claim tasks in batches. On PostgreSQL the batch is selected with
+SELECT ... FOR UPDATE SKIP LOCKED so workers never wait on each other;
+on SQLite the claim is a single conditional UPDATE that only matches rows
+nobody else has claimed. A claimed task stays hidden for the visibility
+timeout; if its worker dies, it becomes claimable again afterwards.
+
+Usage:
+    from transport.task_queue import enqueue
+    enqueue('send_booking_confirmation', {'booking_id': 42})
+"""
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from datetime import timedelta
+import importlib
+import logging
+import threading
+import uuid
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Statuses a task can be claimed from (running only once its visibility timeout lapsed)
+CLAIMABLE_STATUSES = ('queued', 'running')
+
+# Re-reads when another worker claimed the whole batch first (non-PostgreSQL only)
+CLAIM_ATTEMPTS = 3
+
+TASKS = {}
+
+class TaskDefinition:
+    """A registered task function and its queueing defaults"""
+
+    def __init__(self, name, func, queue='default', priority=100, max_attempts=5, retry_delay=30):
+        self.name = name
+        self.func = func
+        self.queue = queue
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+def task(name, queue='default', priority=100, max_attempts=5, retry_delay=30):
+    """
+    Register a function as a task under the given name
+
+    The function is called with the task payload as keyword arguments, so
+    payloads must be JSON serialisable. Failed attempts are retried after
+    retry_delay seconds, doubling each time, up to max_attempts in total.
+    """
+    def decorator(func):
+        TASKS[name] = TaskDefinition(name, func, queue, priority, max_attempts, retry_delay)
+        return func
+    return decorator
+
+_tasks_loaded = False
+
+def get_task_definition(name):
+    """Look up a registered task, loading transport.tasks on first use"""
+    global _tasks_loaded
+    if not _tasks_loaded:
+        importlib.import_module('transport.tasks')
+        _tasks_loaded = True
+    try:
+        return TASKS[name]
+    except KeyError:
+        raise Exception(f"Unknown task: {name}")
+
+def _build_task(definition, payload, delay, priority, dedupe_key):
+    return Task(
+        name=definition.name,
+        queue=definition.queue,
+        payload=payload or {},
+        priority=definition.priority if priority is None else priority,
+        max_attempts=definition.max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+        dedupe_key=dedupe_key,
+    )
+
+def enqueue(name, payload=None, delay=0, priority=None, dedupe_key=None):
+    """
+    Add a task to the queue
+
+    Args:
+        name: Registered task name
+        payload: Keyword arguments for the task
+        delay: Seconds before the task may run
+        priority: Override the task's default priority (lower runs first)
+        dedupe_key: If a task with this key exists, nothing is queued
+
+    Returns:
+        Task or None: The queued task, or None if deduplicated
+    """
+    definition = get_task_definition(name)
+    try:
+        with transaction.atomic():
+            queued = _build_task(definition, payload, delay, priority, dedupe_key)
+            queued.save()
+    except IntegrityError:
+        if dedupe_key:
+            logger.info(f"Task {name} with key {dedupe_key} already queued")
+            return None
+        raise
+    return queued
+
+def enqueue_many(name, payloads, delay=0, priority=None):
+    """Add one task per payload with a single INSERT"""
+    definition = get_task_definition(name)
+    return Task.objects.bulk_create([
+        _build_task(definition, payload, delay, priority, None)
+        for payload in payloads
+    ])
+
+def enqueue_on_commit(name, payloads, **options):
+    """Queue tasks once the current transaction commits, so workers see committed data"""
+    payloads = list(payloads)
+    if not payloads:
+        return
+
+    def add():
+        try:
+            enqueue_many(name, payloads, **options)
+        except Exception as e:
+            logger.error(f"Could not queue {len(payloads)} {name} task(s): {str(e)}")
+
+    transaction.on_commit(add)
+
+def claim_tasks(queue='default', batch_size=None, visibility_timeout=None):
+    """
+    Claim up to batch_size due tasks for this worker
+
+    Returns:
+        list: Claimed Task objects, all sharing one claim_token
+    """
+    batch_size = batch_size or settings.TASK_QUEUE_BATCH_SIZE
+    visibility_timeout = visibility_timeout or settings.TASK_VISIBILITY_TIMEOUT_SECONDS
+    now = timezone.now()
+    token = uuid.uuid4()
+
+    claimable = Task.objects.filter(
+        queue=queue,
+        status__in=CLAIMABLE_STATUSES,
+        run_after__lte=now
+    )
+    claim = {
+        'status': 'running',
+        'claim_token': token,
+        'run_after': now + timedelta(seconds=visibility_timeout),
+        'attempts': F('attempts') + 1,
+    }
+
+    if connection.vendor == 'postgresql':
+        with transaction.atomic():
+            task_ids = list(
+                claimable.order_by('priority', 'run_after')
+                .select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not task_ids:
+                return []
+            Task.objects.filter(id__in=task_ids).update(**claim)
+    else:
+        for attempt in range(CLAIM_ATTEMPTS):
+            task_ids = list(
+                claimable.order_by('priority', 'run_after')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not task_ids:
+                return []
+            # Repeat the claimable filter in the UPDATE: rows another worker claimed
+            # since they were read no longer match and are skipped
+            if claimable.filter(id__in=task_ids).update(**claim):
+                break
+        else:
+            return []
+
+    return list(Task.objects.filter(claim_token=token).order_by('priority', 'run_after'))
+
+def _finish(tasks, token, status, **fields):
+    """Mark tasks finished, ignoring any that were reclaimed after our visibility timeout lapsed"""
+    if not tasks:
+        return
+    updated = Task.objects.filter(
+        id__in=[t.id for t in tasks],
+        claim_token=token
+    ).update(status=status, finished_at=timezone.now(), **fields)
+    if updated < len(tasks):
+        logger.warning(f"{len(tasks) - updated} task(s) were reclaimed by another worker before they finished")
+
+def _retry_or_fail(queued, token, definition, error):
+    if definition is not None and queued.attempts < queued.max_attempts:
+        backoff = definition.retry_delay * 2 ** (queued.attempts - 1)
+        Task.objects.filter(id=queued.id, claim_token=token).update(
+            status='queued',
+            claim_token=None,
+            run_after=timezone.now() + timedelta(seconds=backoff),
+            last_error=error
+        )
+        logger.warning(f"Task {queued} failed (attempt {queued.attempts}), retrying in {backoff}s: {error}")
+    else:
+        _finish([queued], token, 'failed', last_error=error)
+        logger.error(f"Task {queued} failed permanently after {queued.attempts} attempt(s): {error}")
+
+def run_tasks(tasks):
+    """Execute claimed tasks and record the outcome, acknowledging successes in one UPDATE"""
+    succeeded = []
+    for claimed in tasks:
+        try:
+            definition = get_task_definition(claimed.name)
+        except Exception as e:
+            _retry_or_fail(claimed, claimed.claim_token, None, str(e))
+            continue
+
+        if claimed.attempts > claimed.max_attempts:
+            _retry_or_fail(claimed, claimed.claim_token, None, 'Exceeded max attempts after worker timeouts')
+            continue
+
+        try:
+            definition.func(**claimed.payload)
+        except Exception as e:
+            _retry_or_fail(claimed, claimed.claim_token, definition, str(e))
+        else:
+            succeeded.append(claimed)
+
+    if succeeded:
+        _finish(succeeded, succeeded[0].claim_token, 'done', last_error='')
+    return len(tasks)
+
+def purge_finished_tasks(days=None):
+    """Delete done and failed tasks older than TASK_RETENTION_DAYS"""
+    days = settings.TASK_RETENTION_DAYS if days is None else days
+    deleted, _ = Task.objects.filter(
+        status__in=('done', 'failed'),
+        finished_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()
+    if deleted:
+        logger.info(f"Purged {deleted} finished task(s)")
+    return deleted
+
+class TaskWorker:
+    """Claims and runs tasks from one queue on a number of threads"""
+
+    def __init__(self, queue='default', concurrency=1, batch_size=None, visibility_timeout=None, poll_interval=None):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.batch_size = batch_size or settings.TASK_QUEUE_BATCH_SIZE
+        self.visibility_timeout = visibility_timeout or settings.TASK_VISIBILITY_TIMEOUT_SECONDS
+        self.poll_interval = settings.TASK_QUEUE_POLL_SECONDS if poll_interval is None else poll_interval
+
+    def run_once(self):
+        """Claim and run one batch; returns the number of tasks processed"""
+        close_old_connections()
+        tasks = claim_tasks(self.queue, self.batch_size, self.visibility_timeout)
+        return run_tasks(tasks)
+
+    def drain(self, max_batches=None):
+        """Run batches until the queue has nothing due (or max_batches is reached)"""
+        processed = batches = 0
+        while max_batches is None or batches < max_batches:
+            count = self.run_once()
+            if not count:
+                break
+            processed += count
+            batches += 1
+        return processed
+
+    def run(self, stop_event):
+        """Process tasks on `concurrency` threads until stop_event is set"""
+        def loop():
+            try:
+                while not stop_event.is_set():
+                    try:
+                        if not self.run_once():
+                            stop_event.wait(self.poll_interval)
+                    except Exception as e:
+                        logger.error(f"Task worker error on queue {self.queue}: {str(e)}", exc_info=True)
+                        stop_event.wait(self.poll_interval)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=loop, name=f'task-worker-{self.queue}-{i}', daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+def drain_task_queue():
+    """Periodic job for web processes: run whatever is due on the default queue"""
+    TaskWorker().drain(max_batches=10)
@@ -0,0 +1,33 @@
+"""
+Durable background tasks for Falcon Bus Lines
+Each task is registered with the task queue under a stable name; queue
+them with transport.task_queue.enqueue(name, payload).
+"""
+
+from .task_queue import task, purge_finished_tasks
+
+@task('confirm_simulated_payment', priority=50, max_attempts=3, retry_delay=5)
+def confirm_simulated_payment(booking_id=None, group_id=None):
+    """Auto-confirm a test payment (see PayFastPaymentService.simulate_payment_confirmation)"""
+    from .payment_service import PayFastPaymentService
+
+    PayFastPaymentService.confirm_simulated_payment(booking_id, group_id=group_id)
+
+@task('send_booking_confirmation', priority=80, max_attempts=4, retry_delay=30)
+def send_booking_confirmation(booking_id):
+    """Generate the PDF ticket and email the booking confirmation"""
+    from .email_service import BookingEmailService
+
+    BookingEmailService.send_booking_confirmation_job(booking_id)
+
+@task('maintain_schedules', priority=200, max_attempts=3, retry_delay=300)
+def maintain_schedules(days_ahead=90):
+    """Daily schedule maintenance: keep ~3 months of schedules generated ahead"""
+    from .schedule_management import auto_maintain_schedules
+
+    auto_maintain_schedules(days_ahead=days_ahead, dry_run=False)
+
+@task('purge_finished_tasks', priority=250, max_attempts=1)
+def purge_old_tasks(days=None):
+    """Delete finished tasks past their retention period"""
+    purge_finished_tasks(days)
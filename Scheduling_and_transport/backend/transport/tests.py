@@ -1,3 +1,674 @@
-﻿from django.test import TestCase
+﻿from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection, connections, transaction
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+import json
+from unittest import mock
+import multiprocessing
+import os
 
-# Create your tests here.
+from . import booking_events, event_streams, seat_events
+from .fast_serializers import FastSerializer, parse_fieldsets
+from .idempotency import idempotent, purge_expired_keys
+from .models import Booking, Bus, ContactInfo, FAQ, IdempotencyKey, ReferenceSequence, Route, Schedule
+from .place_index import PlaceIndex, warm as warm_place_index
+from . import references
+from .renderers import FastJSONRenderer
+from .serializers import (
+    BookingGroupSerializer, BookingSerializer, BusSerializer, RouteSerializer, ScheduleSerializer,
+    SimpleScheduleSerializer,
+)
+from .reservation_service import SeatReservationService
+from . import views
+from .views import BookingViewSet, BusViewSet, ContactInfoViewSet, FAQViewSet, RouteViewSet, ScheduleViewSet
+
+def create_schedule(total_seats):
+    bus = Bus.objects.create(bus_number='TEST001', bus_type='standard', total_seats=total_seats)
+    route = Route.objects.create(
+        name='Cape Town to Durban',
+        origin='Cape Town',
+        destination='Durban',
+        distance_km=1600,
+        duration_hours=22,
+        base_price_zar=Decimal('650.00'),
+    )
+    departure = timezone.now() + timedelta(days=7)
+    return Schedule.objects.create(
+        route=route,
+        bus=bus,
+        departure_time=departure,
+        arrival_time=departure + timedelta(hours=22),
+        available_seats=total_seats,
+        price_zar=route.base_price_zar,
+    )
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """Parallel booking requests for one schedule, each on its own database connection"""
+
+    seats = 10
+    requests = 40
+
+    def setUp(self):
+        self.schedule = create_schedule(self.seats)
+        self.factory = APIRequestFactory()
+        self.create_view = BookingViewSet.as_view({'post': 'create'}, throttle_classes=[])
+
+    def create_booking(self, i):
+        request = self.factory.post('/api/bookings/', {
+            'schedule_id': self.schedule.id,
+            'passenger_name': f'Passenger {i}',
+            'passenger_email': f'passenger{i}@example.com',
+            'passenger_phone': '083 123 4567',
+            'total_amount_zar': '650.00',
+        }, format='json')
+        try:
+            return self.create_view(request).status_code
+        finally:
+            connection.close()
+
+    def test_parallel_bookings_do_not_oversell(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            codes = list(pool.map(self.create_booking, range(self.requests)))
+
+        self.schedule.refresh_from_db()
+        holding = Booking.objects.filter(
+            schedule=self.schedule,
+            status__in=SeatReservationService.SEAT_HOLDING_STATUSES
+        ).count()
+
+        self.assertEqual(codes.count(201), self.seats)
+        self.assertEqual(codes.count(400), self.requests - self.seats)
+        self.assertEqual(holding, self.seats)
+        self.assertEqual(Booking.objects.filter(schedule=self.schedule).count(), self.seats)
+        self.assertGreaterEqual(self.schedule.available_seats, 0)
+        self.assertEqual(self.schedule.available_seats, 0)
+
+class _RolledBack(Exception):
+    pass
+
+def _allocate_references(count=120):
+    """References kept by one worker, some allocated in rolled-back transactions"""
+    kept = []
+    try:
+        for i in range(count):
+            if i % 7 == 3:
+                try:
+                    with transaction.atomic():
+                        references.allocate_booking_reference()
+                        raise _RolledBack()
+                except _RolledBack:
+                    continue
+            with transaction.atomic():
+                kept.append(references.allocate_booking_reference())
+    finally:
+        connections.close_all()
+    return kept
+
+class ReferenceAllocationTests(TransactionTestCase):
+    """Booking references allocated from several connections and processes at once"""
+
+    def setUp(self):
+        references.booking_reference_allocator.reset()
+
+    def tearDown(self):
+        references.booking_reference_allocator.reset()
+
+    def allocate(self, worker):
+        return _allocate_references()
+
+    def test_references_are_unique_across_connections(self):
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            batches = list(pool.map(self.allocate, range(6)))
+
+        allocated = [reference for batch in batches for reference in batch]
+        self.assertEqual(len(allocated), len(set(allocated)))
+        for reference in allocated:
+            self.assertRegex(reference, r'^FB[0-9A-HJKMNP-TV-Z]{6}$')
+
+    def test_references_are_unique_across_processes(self):
+        if not hasattr(os, 'fork'):
+            self.skipTest('Needs fork')
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Processes cannot share an in-memory test database')
+
+        # Each forked worker opens its own connection to the test database
+        connections.close_all()
+        with multiprocessing.get_context('fork').Pool(processes=4) as pool:
+            batches = pool.map(_allocate_references, [120] * 4)
+
+        allocated = [reference for batch in batches for reference in batch]
+        self.assertEqual(len(allocated), 4 * 103)
+        self.assertEqual(len(allocated), len(set(allocated)))
+        for reference in allocated:
+            self.assertRegex(reference, r'^FB[0-9A-HJKMNP-TV-Z]{6}$')
+
+    def test_committed_block_is_reused_without_queries(self):
+        with transaction.atomic():
+            first = references.booking_reference_allocator.next_value()
+        with self.assertNumQueries(0):
+            self.assertEqual(references.booking_reference_allocator.next_value(), first + 1)
+
+    def test_rolled_back_block_is_discarded(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('PostgreSQL sequences are never rolled back')
+        try:
+            with transaction.atomic():
+                references.booking_reference_allocator.next_value()
+                raise _RolledBack()
+        except _RolledBack:
+            pass
+        with CaptureQueriesContext(connection) as queries:
+            references.booking_reference_allocator.next_value()
+        self.assertTrue(any('transport_referencesequence' in query['sql'] for query in queries))
+
+    def sequence_writes(self, queries):
+        return [
+            query for query in queries
+            if 'transport_referencesequence' in query['sql'] and query['sql'].startswith('UPDATE')
+        ]
+
+    def test_block_reserved_in_a_transaction_serves_one_number(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('PostgreSQL sequences are never rolled back')
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                first = references.booking_reference_allocator.next_value()
+                second = references.booking_reference_allocator.next_value()
+        self.assertEqual(len(self.sequence_writes(queries)), 2)
+        self.assertEqual(second, first + references.BLOCK_SIZE)
+
+    def test_group_booking_reserves_at_most_one_block(self):
+        schedule = create_schedule(10)
+        request = APIRequestFactory().post('/api/bookings/group/', {
+            'schedule_id': schedule.id,
+            'contact_name': 'Group Contact',
+            'contact_email': 'group@example.com',
+            'contact_phone': '083 123 4567',
+            'passengers': [{'passenger_name': f'Passenger {i}'} for i in range(5)],
+        }, format='json')
+        view = BookingViewSet.as_view({'post': 'create_group'}, throttle_classes=[])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request)
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Booking.objects.filter(schedule=schedule).count(), 5)
+        self.assertLessEqual(len(self.sequence_writes(queries)), 1)
+
+    def test_legacy_all_digit_references_are_never_allocated(self):
+        legacy = 'FB123450'
+        # Sequence number that would encode to the legacy reference
+        value = int(legacy[2:], 32) * pow(references.REFERENCE_MULTIPLIER, -1, references.REFERENCE_SPACE)
+        value %= references.REFERENCE_SPACE
+        self.assertEqual(references.encode_reference(value), legacy)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT setval(%s, %s, false)', [references.POSTGRES_SEQUENCE, value])
+        else:
+            ReferenceSequence.objects.update_or_create(
+                name=references.BOOKING_SEQUENCE, defaults={'next_value': value}
+            )
+
+        reference = references.allocate_booking_reference()
+        self.assertNotEqual(reference, legacy)
+        self.assertFalse(reference[2:].isdigit())
+
+class FastJSONRendererTests(SimpleTestCase):
+    """FastJSONRenderer output against DRF's JSONRenderer"""
+
+    def test_floats_render_as_the_same_numbers(self):
+        data = {'floats': [1600.0, 0.1, -0.0, 1e-4, 1e-05, 1.5e-07, 1e15, 1e16, 1.2345678901234568e+17], 'name': None}
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+        self.assertEqual(FastJSONRenderer().render({'distance_km': 1600.0}), b'{"distance_km":1600.0}')
+
+    def test_non_finite_floats_are_refused(self):
+        for value in (float('nan'), float('inf'), float('-inf')):
+            with self.assertRaisesMessage(ValueError, 'Out of range float values are not JSON compliant'):
+                FastJSONRenderer().render({'results': [{'value': value}]})
+
+class _CountingViewSet(viewsets.ViewSet):
+    """Counts how often its create actually runs"""
+
+    authentication_classes = []
+    permission_classes = []
+    throttle_classes = []
+    calls = 0
+
+    @idempotent
+    def create(self, request):
+        type(self).calls += 1
+        return Response({'call': type(self).calls, 'echo': request.data}, status=status.HTTP_201_CREATED)
+
+class IdempotencyTests(TestCase):
+    """The Idempotency-Key header on a view wrapped with @idempotent"""
+
+    def setUp(self):
+        _CountingViewSet.calls = 0
+        self.factory = APIRequestFactory()
+        self.view = _CountingViewSet.as_view({'post': 'create'})
+
+    def post(self, data, key='retry-1', user=None):
+        request = self.factory.post('/api/bookings/', data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+        if user is not None:
+            force_authenticate(request, user=user)
+        return self.view(request)
+
+    def test_retry_gets_the_stored_response(self):
+        first = self.post({'schedule_id': 1})
+        retry = self.post({'schedule_id': 1})
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(_CountingViewSet.calls, 1)
+
+    def test_key_reused_with_a_different_body_is_refused(self):
+        self.post({'schedule_id': 1})
+        response = self.post({'schedule_id': 2})
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(_CountingViewSet.calls, 1)
+
+    def test_key_is_scoped_to_the_client(self):
+        alice = User.objects.create_user('alice')
+        bob = User.objects.create_user('bob')
+        self.post({'schedule_id': 1}, user=alice)
+        response = self.post({'schedule_id': 1}, user=bob)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(response.data['call'], 2)
+
+    def test_request_still_running_gets_409(self):
+        self.post({'schedule_id': 1})
+        IdempotencyKey.objects.update(response_status=None, response_body=None)
+        response = self.post({'schedule_id': 1})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(_CountingViewSet.calls, 1)
+
+    def test_expired_keys_are_purged_and_run_again(self):
+        self.post({'schedule_id': 1})
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(purge_expired_keys(), 1)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        response = self.post({'schedule_id': 1})
+        self.assertEqual(response.data['call'], 2)
+
+class ScheduleSearchValidationTests(TestCase):
+    """Bad query parameters on /api/schedules/search/ get an error naming the parameter"""
+
+    def setUp(self):
+        self.schedule = create_schedule(10)
+        self.view = ScheduleViewSet.as_view({'get': 'search'}, throttle_classes=[])
+        self.factory = APIRequestFactory()
+
+    def search(self, **params):
+        return self.view(self.factory.get('/api/schedules/search/', params))
+
+    def test_non_numeric_route_is_refused(self):
+        response = self.search(route='abc', date='2026-01-01')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'route must be a numeric route ID')
+
+    def test_non_numeric_route_is_refused_in_flexible_search(self):
+        response = self.search(route='abc', date='2026-01-01', flex='3')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'route must be a numeric route ID')
+
+    def test_bad_date_is_still_reported_as_such(self):
+        response = self.search(route=str(self.schedule.route_id), date='01/01/2026')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Date must be in YYYY-MM-DD format')
+
+    def test_numeric_route_finds_its_schedules(self):
+        response = self.search(route=str(self.schedule.route_id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data], [self.schedule.id])
+
+class ConditionalGetTests(TestCase):
+    """ETag and Last-Modified on the read-mostly list endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        create_schedule(10)
+        FAQ.objects.create(question='Can I change my booking?', answer='Yes, up to 24 hours before departure.')
+        ContactInfo.objects.create(
+            phone_primary='021 123 4567', email='info@example.com', whatsapp_number='082 123 4567',
+            address='1 Main Road, Cape Town', emergency_contact='082 765 4321'
+        )
+
+    def get(self, viewset, **headers):
+        view = viewset.as_view({'get': 'list'}, throttle_classes=[])
+        return view(self.factory.get('/api/resource/', **headers))
+
+    def test_matching_etag_gets_304_without_queries(self):
+        for viewset in (RouteViewSet, BusViewSet, FAQViewSet, ContactInfoViewSet):
+            with self.subTest(viewset=viewset.__name__):
+                etag = self.get(viewset)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.get(viewset, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_save_and_delete_change_the_etag(self):
+        route = Route.objects.get()
+        bus = Bus.objects.get()
+        faq = FAQ.objects.get()
+        contact = ContactInfo.objects.get()
+        changes = [
+            (RouteViewSet, lambda: route.save()),
+            (BusViewSet, lambda: bus.save()),
+            (FAQViewSet, lambda: faq.save()),
+            (ContactInfoViewSet, lambda: contact.save()),
+            (FAQViewSet, lambda: faq.delete()),
+            (ContactInfoViewSet, lambda: contact.delete()),
+        ]
+        for viewset, change in changes:
+            with self.subTest(viewset=viewset.__name__):
+                etag = self.get(viewset)['ETag']
+                change()
+                response = self.get(viewset, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since_sees_a_change_in_the_same_second(self):
+        last_modified = self.get(RouteViewSet)['Last-Modified']
+        self.assertEqual(self.get(RouteViewSet, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        # The stamp moves to a later second, so no sleep is needed
+        Route.objects.get().save()
+        response = self.get(RouteViewSet, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['Last-Modified'], last_modified)
+
+class FastSerializerTests(TestCase):
+    """FastSerializer output against the DRF serializers it stands in for"""
+
+    def setUp(self):
+        self.schedule = create_schedule(10)
+        second_bus = Bus.objects.create(bus_number='TEST002', bus_type='luxury', total_seats=40)
+        departure = self.schedule.departure_time + timedelta(days=1)
+        self.other = Schedule.objects.create(
+            route=self.schedule.route,
+            bus=second_bus,
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=22),
+            available_seats=40,
+            price_zar=Decimal('699.50'),
+        )
+        for schedule in (self.schedule, self.other):
+            Booking.objects.create(
+                schedule=schedule,
+                passenger_name='Thandi Mokoena',
+                passenger_email='thandi@example.com',
+                passenger_phone='083 123 4567',
+                total_amount_zar=schedule.price_zar,
+            )
+        self.factory = APIRequestFactory()
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_output_matches_drf(self):
+        cases = [
+            (ScheduleSerializer, Schedule.objects.order_by('id')),
+            (SimpleScheduleSerializer, Schedule.objects.order_by('id')),
+            (BookingSerializer, Booking.objects.order_by('id')),
+        ]
+        for serializer_class, queryset in cases:
+            with self.subTest(serializer=serializer_class.__name__):
+                fast = FastSerializer.for_class(serializer_class).serialize(queryset)
+                self.assertEqual(self.render(fast), self.render(serializer_class(queryset, many=True).data))
+
+    def test_sparse_fieldsets_keep_the_selected_fields(self):
+        fields, include = parse_fieldsets({'fields': 'route.name, id,departure_time'})
+        self.assertEqual(fields, ('departure_time', 'id', 'route.name'))
+
+        data = FastSerializer.for_class(ScheduleSerializer, fields, include).serialize(Schedule.objects.order_by('id'))
+        full = ScheduleSerializer(Schedule.objects.order_by('id'), many=True).data
+        self.assertEqual(data, [
+            {'id': row['id'], 'route': {'name': row['route']['name']}, 'departure_time': row['departure_time']}
+            for row in full
+        ])
+
+    def test_include_sideloads_each_object_once(self):
+        included = {}
+        fast = FastSerializer.for_class(ScheduleSerializer, None, ('bus', 'route'))
+        data = fast.serialize(Schedule.objects.order_by('id'), included)
+
+        self.assertEqual([row['route'] for row in data], [self.schedule.route_id] * 2)
+        self.assertEqual([row['bus'] for row in data], [self.schedule.bus_id, self.other.bus_id])
+        self.assertEqual(
+            self.render(included['route']),
+            self.render({self.schedule.route_id: RouteSerializer(self.schedule.route).data})
+        )
+        self.assertEqual(
+            self.render(included['bus']),
+            self.render({bus.id: BusSerializer(bus).data for bus in (self.schedule.bus, self.other.bus)})
+        )
+
+    def test_include_through_the_list_endpoint(self):
+        view = ScheduleViewSet.as_view({'get': 'list'}, throttle_classes=[])
+        response = view(self.factory.get('/api/schedules/', {'include': 'route,bus', 'fields': 'id,route,bus'}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['included']), {'route', 'bus'})
+        self.assertEqual(response.data['results'][0], {
+            'id': self.schedule.id, 'route': self.schedule.route_id, 'bus': self.schedule.bus_id
+        })
+
+    def test_bad_selections_get_400(self):
+        view = ScheduleViewSet.as_view({'get': 'list'}, throttle_classes=[])
+        cases = {
+            'unknown field': {'fields': 'id,colour'},
+            'unknown nested field': {'fields': 'route.colour'},
+            'path into a plain field': {'fields': 'departure_time.year'},
+            'write-only field': {'fields': 'route_id'},
+            'unknown include': {'include': 'driver'},
+            'flat include': {'include': 'departure_time'},
+        }
+        for case, params in cases.items():
+            with self.subTest(case):
+                response = view(self.factory.get('/api/schedules/', params))
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+
+    def test_lists_of_objects_cannot_be_selected(self):
+        for fields, include in ((('bookings',), ()), (None, ('bookings',))):
+            with self.subTest(fields=fields, include=include):
+                with self.assertRaises(ValueError):
+                    FastSerializer(BookingGroupSerializer, fields, include)
+
+class _TestHub(event_streams.PollingHub):
+    """PollingHub whose poller never loads anything; tests publish values themselves"""
+
+    poll_seconds = 3600
+
+    def _load(self, keys):
+        return {}
+
+class BookingEventsTests(TestCase):
+    """Fan-out of booking status changes to event streams"""
+
+    def setUp(self):
+        self.hub = _TestHub()
+        self.booking = Booking.objects.create(
+            schedule=create_schedule(10),
+            passenger_name='Thandi Mokoena',
+            passenger_email='thandi@example.com',
+            passenger_phone='083 123 4567',
+            total_amount_zar=Decimal('650.00'),
+            status='pending_payment',
+            hold_expires_at=timezone.now() - timedelta(minutes=1),
+        )
+
+    def snapshot(self, status):
+        self.booking.status = status
+        return booking_events.status_snapshot(self.booking)
+
+    def test_publish_sends_each_waiter_only_what_changed(self):
+        one = self.hub.subscribe({1: 'a'})
+        both = self.hub.subscribe({1: 'a', 2: 'b'})
+        gone = self.hub.subscribe({2: 'b'})
+        self.hub.unsubscribe(gone)
+
+        self.hub.publish({1: 'a', 2: 'c', 3: 'x'})
+
+        self.assertTrue(one.queue.empty())
+        self.assertEqual(both.queue.get_nowait(), {2: 'c'})
+        self.assertTrue(gone.queue.empty())
+        self.assertEqual(both.last, {1: 'a', 2: 'c'})
+
+        # Publishing the same values again sends nothing
+        self.hub.publish({1: 'a', 2: 'c'})
+        self.assertTrue(both.queue.empty())
+
+    def test_stream_ends_once_the_booking_stops_waiting(self):
+        with mock.patch.object(booking_events, 'booking_status_hub', self.hub):
+            chunks = booking_events.stream(self.booking.id, self.snapshot('pending_payment'))
+            first = next(chunks)
+            self.assertTrue(first.startswith(b'retry: '))
+            self.assertIn(b'"status":"pending_payment"', first)
+
+            self.hub.publish({self.booking.id: self.snapshot('payment_processing')})
+            self.assertIn(b'"status":"payment_processing"', next(chunks))
+
+            self.hub.publish({self.booking.id: self.snapshot('confirmed')})
+            last = next(chunks)
+            self.assertTrue(last.startswith(b'event: status\ndata: '))
+            self.assertIn(b'"can_download_ticket":true', last)
+            with self.assertRaises(StopIteration):
+                next(chunks)
+
+        self.assertFalse(self.hub.watching(self.booking.id))
+
+    def test_bulk_hold_expiry_wakes_the_hub(self):
+        self.hub.subscribe({self.booking.id: self.snapshot('pending_payment')})
+        with mock.patch.object(booking_events, 'booking_status_hub', self.hub), \
+                mock.patch.object(self.hub, 'wake') as wake, \
+                self.captureOnCommitCallbacks(execute=True):
+            SeatReservationService.release_expired_holds()
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, 'expired')
+        wake.assert_called_once_with()
+
+    @override_settings(EVENT_STREAMS_UNDER_WSGI=False)
+    def test_streams_are_refused_under_wsgi(self):
+        factory = RequestFactory()
+        responses = [
+            views.booking_events(factory.get(f'/api/bookings/{self.booking.id}/events/'), self.booking.id),
+            views.schedule_events(factory.get('/api/schedules/events/', {'ids': str(self.booking.schedule_id)})),
+        ]
+        for response in responses:
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Cache-Control'], 'no-store')
+            self.assertEqual(json.loads(response.content), {'error': 'Event streams are not available on this server, poll instead'})
+
+class _TestSeatHub(seat_events.SeatAvailabilityHub):
+    poll_seconds = 3600
+    coalesce_seconds = 0
+
+    def _load(self, schedule_ids):
+        return {}
+
+class SeatEventsTests(TestCase):
+    """Seat availability streams and their request validation"""
+
+    def test_changes_published_before_a_read_arrive_as_one_event(self):
+        hub = _TestSeatHub()
+        with mock.patch.object(seat_events, 'seat_availability_hub', hub):
+            chunks = seat_events.stream({12: 31, 13: 5, 14: 44})
+            self.assertEqual(next(chunks), b'retry: 3000\nevent: seats\ndata: {"12":31,"13":5,"14":44}\n\n')
+
+            hub.publish({12: 30, 13: 5, 14: 44})
+            hub.publish({12: 29, 13: 4, 14: 44})
+            hub.publish({12: 28, 13: 4, 14: 44})
+            self.assertEqual(next(chunks), b'event: seats\ndata: {"12":28,"13":4}\n\n')
+
+            chunks.close()
+        self.assertFalse(any(hub.watching(schedule_id) for schedule_id in (12, 13, 14)))
+
+    @override_settings(EVENT_STREAMS_UNDER_WSGI=True, SEAT_EVENTS_MAX_SCHEDULES=3)
+    def test_bad_ids_are_rejected(self):
+        factory = RequestFactory()
+        cases = [
+            ('abc', 400, 'ids must be a comma-separated list of schedule IDs'),
+            ('1,2.5', 400, 'ids must be a comma-separated list of schedule IDs'),
+            (None, 400, 'ids parameter is required'),
+            (' , ', 400, 'ids parameter is required'),
+            ('1,2,3,4', 400, 'At most 3 schedules can be watched per stream'),
+            ('999998,999999', 404, 'No matching schedules found'),
+        ]
+        for ids, status_code, error in cases:
+            with self.subTest(ids=ids):
+                params = {} if ids is None else {'ids': ids}
+                response = views.schedule_events(factory.get('/api/schedules/events/', params))
+                self.assertEqual(response.status_code, status_code)
+                self.assertEqual(json.loads(response.content), {'error': error})
+
+class PlaceIndexTests(TestCase):
+    """Place autocomplete from the in-memory trie"""
+
+    def setUp(self):
+        for origin, destination, is_active in [
+            ('Cape Town', 'Durban', True),
+            ('Cape Town', 'Port Elizabeth', True),
+            ('Durban', 'Port Elizabeth', True),
+            ('Port Shepstone', 'Durban', True),
+            ('Polokwane', 'Pretoria', False),
+        ]:
+            Route.objects.create(
+                name=f'{origin} to {destination}',
+                origin=origin,
+                destination=destination,
+                distance_km=500,
+                duration_hours=6,
+                base_price_zar=Decimal('300.00'),
+                is_active=is_active,
+            )
+        self.index = PlaceIndex()
+
+    def names(self, query, role=None):
+        return [place['name'] for place in self.index.suggest(query, role=role)]
+
+    def test_prefixes_match_any_word_ranked_by_active_routes(self):
+        self.assertEqual(self.names('d'), ['Durban'])
+        self.assertEqual(self.names('  PORT '), ['Port Elizabeth', 'Port Shepstone'])
+        # Polokwane and Pretoria only have an inactive route
+        self.assertEqual(self.names('p'), ['Port Elizabeth', 'Port Shepstone'])
+        self.assertEqual(self.names('eliz'), ['Port Elizabeth'])
+        self.assertEqual(self.names('town'), ['Cape Town'])
+        self.assertEqual(self.names('xyz'), [])
+        self.assertEqual(self.names(''), [])
+
+    def test_roles_rank_by_departures_or_arrivals(self):
+        self.assertEqual(self.names('', role='origin'), [])
+        self.assertEqual(self.names('port', role='origin'), ['Port Shepstone'])
+        self.assertEqual(self.names('port', role='destination'), ['Port Elizabeth'])
+        durban = self.index.suggest('durban', role='destination')[0]
+        self.assertEqual((durban['departures'], durban['arrivals']), (1, 2))
+
+    def test_warm_builds_the_index_on_the_runner(self):
+        runner = mock.Mock()
+        runner.submit.side_effect = lambda func, name: func()
+        with mock.patch('transport.place_index.place_index', self.index):
+            warm_place_index(runner)
+
+        runner.submit.assert_called_once()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names('cape'), ['Cape Town'])
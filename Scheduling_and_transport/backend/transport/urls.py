@@ -7,12 +7,17 @@ router = DefaultRouter()
 router.register(r'routes', views.RouteViewSet)
 router.register(r'buses', views.BusViewSet)
 router.register(r'schedules', views.ScheduleViewSet)
+router.register(r'places', views.PlaceViewSet, basename='place')
+router.register(r'journeys', views.JourneyViewSet, basename='journey')
 router.register(r'bookings', views.BookingViewSet)
 router.register(r'contact-info', views.ContactInfoViewSet)
 router.register(r'faqs', views.FAQViewSet)
 
 urlpatterns = [
+    path('schedules/events/', views.schedule_events, name='schedule_events'),
+    path('bookings/<int:booking_id>/events/', views.booking_events, name='booking_events'),
     path('', include(router.urls)),
+    path('bootstrap/', views.bootstrap, name='bootstrap'),
     path('admin/schedule-maintenance/', views.admin_schedule_maintenance, name='admin_schedule_maintenance'),
     path('payfast/webhook/', views.payfast_webhook, name='payfast_webhook'),
     # Performance monitoring endpoints
@@ -1,26 +1,81 @@
 ﻿from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAdminUser
+from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
 from decimal import Decimal
 import logging
-from .models import Route, Bus, Schedule, Booking, ContactInfo, FAQ
+import re
+from django.utils import timezone
+from .models import Route, Bus, Schedule, RouteAvailabilityDay, Booking, BookingGroup, ContactInfo, FAQ
 from .serializers import (
     RouteSerializer, BusSerializer, ScheduleSerializer, BookingSerializer,
-    ContactInfoSerializer, FAQSerializer, SimpleScheduleSerializer
+    ContactInfoSerializer, FAQSerializer, SimpleScheduleSerializer,
+    GroupBookingSerializer, BookingGroupSerializer, JourneyQuerySerializer, JourneySerializer,
+    RouteCalendarSerializer, CalendarDaySerializer
 )
 from .schedule_management import auto_maintain_schedules, check_schedule_health
 from .pdf_generator import generate_booking_pdf
 from .payment_service import PayFastPaymentService, PaymentStatusTracker
+from .reservation_service import SeatReservationService, SeatSelectionError
+from .search_cache import SearchCache
+from .availability_calendar import AvailabilityCalendar
+from .place_index import place_index, ROLES as PLACE_ROLES
+from .places import match_place_ids
+from .search_service import ScheduleSearchService
+from .journey_planner import JourneyPlanner, summarize_journey
+from .references import allocate_booking_reference
+from .idempotency import idempotent
+from .pagination import SchedulePagination, BookingPagination
+from .fast_serializers import FastSerializer, parse_fieldsets
+from .conditional import ConditionalGetMixin
+from .bootstrap import BootstrapDocument
+from .booking_events import SNAPSHOT_FIELDS, status_snapshot, stream as booking_stream, astream as booking_astream
+from .seat_events import current_seats, stream as seat_stream, astream as seat_astream
+from .email_service import BookingEmailService
 
 logger = logging.getLogger(__name__)
 
-class RouteViewSet(viewsets.ModelViewSet):
+class FastListMixin:
+    """
+    List action rendered by FastSerializer from one values() query
+
+    Output matches the viewset's serializer. Supports ?fields= (dotted for
+    nested objects, e.g. fields=id,departure_time,route.name) and
+    ?include= to sideload nested objects once per id under 'included'.
+    """
+    
+    def list(self, request, *args, **kwargs):
+        fields, include = parse_fieldsets(request.query_params)
+        try:
+            fast = FastSerializer.for_class(self.get_serializer_class(), fields, include)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Keyset pagination reads its position from the rows, selected or not
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        rows = fast.project(self.filter_queryset(self.get_queryset()), *(field.lstrip('-') for field in ordering))
+        page = self.paginate_queryset(rows)
+        included = {}
+        if page is None:
+            data = fast.render(rows, included)
+            return Response({'results': data, 'included': included} if include else data)
+        
+        response = self.get_paginated_response(fast.render(page, included))
+        if include:
+            response.data['included'] = included
+        return response
+
+class RouteViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Route.objects.all()
     serializer_class = RouteSerializer
     
@@ -39,7 +94,7 @@ class RouteViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(route)
         return Response(serializer.data)
 
-class BusViewSet(viewsets.ModelViewSet):
+class BusViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Bus.objects.all()
     serializer_class = BusSerializer
     
@@ -50,9 +105,10 @@ class BusViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(is_active=is_active.lower() == 'true')
         return queryset
 
-class ScheduleViewSet(viewsets.ModelViewSet):
+class ScheduleViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Schedule.objects.select_related('route', 'bus').all()
     serializer_class = ScheduleSerializer
+    pagination_class = SchedulePagination
     
     def get_queryset(self):
         queryset = Schedule.objects.select_related('route', 'bus').all()
@@ -63,30 +119,108 @@ class ScheduleViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def search(self, request):
-        """Search schedules by various criteria"""
+        """
+        Search schedules by various criteria
+        
+        With flex=N (and a date plus origin/destination or route) returns the
+        departures, seats left and cheapest fare per day for date +/- N days
+        instead of schedules. ?fields= and ?include=route work as on the list
+        endpoint; with include the response is {'results': [...], 'included': {...}}.
+        """
         origin = request.query_params.get('origin')
         destination = request.query_params.get('destination')
         route = request.query_params.get('route')
         date = request.query_params.get('date')
+        flex = request.query_params.get('flex')
         
-        queryset = Schedule.objects.select_related('route', 'bus').filter(is_active=True)
-        
-        if origin:
-            queryset = queryset.filter(route__origin__icontains=origin)
-        if destination:
-            queryset = queryset.filter(route__destination__icontains=destination)
+        # Checked here so the ValueError handlers below only ever mean a bad date
         if route:
-            queryset = queryset.filter(route__id=route)
-        if date:
-            queryset = queryset.filter(departure_time__date=date)
-            
-        # Limit results to prevent large responses
-        queryset = queryset[:100]
+            if not route.isdigit():
+                return Response(
+                    {'error': 'route must be a numeric route ID'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            route = int(route)
         
-        print(f"Schedule search: {queryset.count()} results found")
+        # Return lapsed seat holds to inventory before reporting availability
+        SeatReservationService.release_expired_holds_if_due()
         
-        serializer = SimpleScheduleSerializer(queryset, many=True)
-        return Response(serializer.data)
+        if flex is not None:
+            return self._flexible_search(origin, destination, route, date, flex)
+        
+        # Sparse fieldsets (?fields=) and sideloaded routes (?include=route)
+        fields, include = parse_fieldsets(request.query_params)
+        try:
+            FastSerializer.for_class(SimpleScheduleSerializer, fields, include)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Indexed lookup by canonical place and departure range (limited to 100 results),
+        # served from the versioned search cache while the matching routes are unchanged
+        try:
+            results = SearchCache.search(
+                origin=origin,
+                destination=destination,
+                route=route,
+                date=date,
+                fields=fields,
+                include=include
+            )
+        except ValueError:
+            return Response(
+                {'error': 'Date must be in YYYY-MM-DD format'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        print(f"Schedule search: {len(results['results'] if include else results)} results found")
+        
+        return Response(results)
+    
+    def _flexible_search(self, origin, destination, route, date, flex):
+        """Per-day availability around a date, from the cached availability matrix"""
+        max_flex = settings.FLEX_SEARCH_MAX_DAYS
+        if not flex.isdigit() or not 1 <= int(flex) <= max_flex:
+            return Response(
+                {'error': f'flex must be a number of days between 1 and {max_flex}'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not date or not (origin or destination or route):
+            return Response(
+                {'error': 'Flexible search needs a date and an origin, destination or route'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            days = SearchCache.flexible_search(
+                origin=origin,
+                destination=destination,
+                route=route,
+                date=date,
+                flex_days=int(flex)
+            )
+        except ValueError:
+            return Response(
+                {'error': 'Date must be in YYYY-MM-DD format'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        priced = [day for day in days if day['min_price_zar'] is not None]
+        cheapest = min(priced, key=lambda day: (day['min_price_zar'], day['date'])) if priced else None
+        
+        return Response({
+            'origin': origin,
+            'destination': destination,
+            'date': date,
+            'flex': int(flex),
+            'cheapest_date': cheapest['date'] if cheapest else None,
+            'days': CalendarDaySerializer(days, many=True).data
+        })
+    
+    @action(detail=True, methods=['get'])
+    def seats(self, request, pk=None):
+        """Get the seat map for a schedule (taken seat numbers and raw bitset)"""
+        schedule = self.get_object()
+        return Response(SeatReservationService.get_seat_map(schedule))
     
     @action(detail=False, methods=['get'])
     def available_dates(self, request):
@@ -107,16 +241,16 @@ class ScheduleViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Get future schedules for this route with available seats
-        from django.utils import timezone
-        today = timezone.now().date()
+        SeatReservationService.release_expired_holds_if_due()
+        
+        # Dates with seats left, from the maintained availability calendar
+        today = timezone.localdate()
         
-        schedules = Schedule.objects.filter(
+        schedules = RouteAvailabilityDay.objects.filter(
             route_id=route_id,
-            is_active=True,
-            departure_time__date__gte=today,
-            available_seats__gt=0
-        ).values_list('departure_time__date', flat=True).distinct().order_by('departure_time__date')
+            date__gte=today,
+            seats_left__gt=0
+        ).order_by('date').values_list('date', flat=True)
         
         # Convert to list and format as strings
         available_dates = [date.strftime('%Y-%m-%d') for date in schedules]
@@ -127,11 +261,121 @@ class ScheduleViewSet(viewsets.ModelViewSet):
             'available_dates': available_dates,
             'total_dates': len(available_dates)
         })
+    
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Availability of every active route for the coming days in one response
+        
+        Query params: days (default and maximum AVAILABILITY_CALENDAR_DAYS), route (optional)
+        """
+        try:
+            days = int(request.query_params.get('days', settings.AVAILABILITY_CALENDAR_DAYS))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= settings.AVAILABILITY_CALENDAR_DAYS:
+            return Response(
+                {'error': f'days must be between 1 and {settings.AVAILABILITY_CALENDAR_DAYS}'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        route_id = request.query_params.get('route')
+        if route_id is not None and not route_id.isdigit():
+            return Response(
+                {'error': 'Route ID must be a number'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        SeatReservationService.release_expired_holds_if_due()
+        
+        start, end, routes = AvailabilityCalendar.calendar(
+            days=days, route_ids=None if route_id is None else [int(route_id)]
+        )
+        return Response({
+            'start_date': start,
+            'end_date': end,
+            'days': days,
+            'routes': RouteCalendarSerializer(routes, many=True).data
+        })
+
+class PlaceViewSet(viewsets.ViewSet):
+    """Place lookups for the origin and destination pickers"""
+    throttle_scope = 'place_suggest'
+    throttle_classes = [ScopedRateThrottle]
+    
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        Autocomplete town names from the in-memory place index
+        
+        Query params: q (text typed so far), role (origin/destination, optional)
+        """
+        query = request.query_params.get('q', '')
+        role = request.query_params.get('role') or None
+        
+        if role is not None and role not in PLACE_ROLES:
+            return Response(
+                {'error': f"role must be one of: {', '.join(PLACE_ROLES)}"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({
+            'query': query,
+            'suggestions': place_index.suggest(query, role=role)
+        })
+
+class JourneyViewSet(viewsets.ViewSet):
+    """Connecting journeys across routes (e.g. Phalaborwa -> Pretoria -> Potchefstroom)"""
+    
+    def list(self, request):
+        """
+        Plan a journey between two towns, changing buses where needed
+        
+        Query params: origin, destination, depart_after (ISO datetime) or date (YYYY-MM-DD),
+        optimize (earliest/cheapest), passengers, max_transfers
+        """
+        query = JourneyQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(
+                {'error': 'Invalid journey query', 'details': query.errors}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        params = query.validated_data
+        
+        origins = set(match_place_ids(params['origin']))
+        destinations = set(match_place_ids(params['destination'])) - origins
+        if not origins or not destinations:
+            return Response(
+                {'error': 'No matching origin or destination town'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        start_time = timezone.now()
+        if params.get('depart_after'):
+            start_time = max(start_time, params['depart_after'])
+        elif params.get('date'):
+            start_time = max(start_time, ScheduleSearchService.day_bounds(params['date'].isoformat())[0])
+        
+        max_transfers = params.get('max_transfers')
+        planner = JourneyPlanner(max_legs=None if max_transfers is None else max_transfers + 1)
+        legs = planner.plan(
+            origins, destinations, start_time, 
+            optimize=params['optimize'], passengers=params['passengers']
+        )
+        journey = summarize_journey(legs, params['optimize'])
+        
+        return Response({
+            'origin': params['origin'],
+            'destination': params['destination'],
+            'depart_after': start_time,
+            'journey': JourneySerializer(journey).data if journey else None
+        })
 
 @method_decorator(csrf_exempt, name='dispatch')
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
+    pagination_class = BookingPagination
     
     def get_queryset(self):
         queryset = Booking.objects.select_related('schedule__route', 'schedule__bus').all()
@@ -141,6 +385,7 @@ class BookingViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(status=status_filter)
         return queryset
     
+    @idempotent
     def create(self, request, *args, **kwargs):
         print(f"Received booking data: {request.data}")
         
@@ -167,43 +412,50 @@ class BookingViewSet(viewsets.ModelViewSet):
                 )
             
             seats_requested = 1  # Fixed to 1 seat per booking
-            print(f"Seats requested: {seats_requested}, Available: {schedule.available_seats}")
-            
-            if schedule.available_seats < 1:
-                return Response(
-                    {'error': f'No seats available on this schedule.'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            seat_number = serializer.validated_data.get('seat_number')
+            seat_numbers = [seat_number] if seat_number else None
+            print(f"Seats requested: {seats_requested}, Seat number: {seat_number}, Available: {schedule.available_seats}")
             
             # Calculate pricing with discount (1 seat)
-            base_price = schedule.price_zar  # No multiplication needed for 1 seat
             discount_type = serializer.validated_data.get('discount_type', 'none')
-            discount_amount = Decimal('0.00')
-            
-            # Apply R40 discount for eligible categories
-            if discount_type in ['scholar', 'student', 'pensioner']:
-                discount_amount = Decimal('40.00')
-            
-            final_price = max(base_price - discount_amount, Decimal('0.00'))  # Ensure price doesn't go negative
+            base_price, discount_amount, final_price = self._calculate_price(schedule, discount_type)
             
             print(f"Base price: R{base_price}, Discount: R{discount_amount}, Final price: R{final_price}")
             
-            # Create booking with pending payment status
+            # Reserve the seat and create the booking in one transaction so a
+            # failed insert never leaks a seat and concurrent requests cannot oversell
             print("Creating booking...")
-            booking = serializer.save(
-                schedule=schedule,
-                number_of_seats=1,  # Fixed to 1 seat
-                original_amount=base_price,
-                discount_amount=discount_amount,
-                total_amount_zar=final_price,
-                status='pending_payment'  # Start with pending payment
-            )
-            print(f"Booking created successfully: {booking.booking_reference}")
-            
-            # Reserve the seat temporarily (reduce available seats)
-            schedule.available_seats -= 1
-            schedule.save()
-            print(f"Seat reserved, updated available seats to: {schedule.available_seats}")
+            with transaction.atomic():
+                try:
+                    reserved = SeatReservationService.reserve(schedule.id, seats_requested, seat_numbers)
+                    if not reserved:
+                        # Seats held by abandoned checkouts may have lapsed; reclaim them and retry once
+                        if SeatReservationService.release_expired_holds(schedule_id=schedule.id):
+                            reserved = SeatReservationService.reserve(schedule.id, seats_requested, seat_numbers)
+                except SeatSelectionError as e:
+                    return Response(
+                        {'error': str(e)}, 
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                
+                if not reserved:
+                    error = f'Seat {seat_number} is no longer available.' if seat_number else 'No seats available on this schedule.'
+                    return Response(
+                        {'error': error}, 
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                
+                # Create booking with pending payment status and a time-limited seat hold
+                booking = serializer.save(
+                    schedule=schedule,
+                    number_of_seats=1,  # Fixed to 1 seat
+                    original_amount=base_price,
+                    discount_amount=discount_amount,
+                    total_amount_zar=final_price,
+                    status='pending_payment',  # Start with pending payment
+                    hold_expires_at=SeatReservationService.hold_expiry()
+                )
+            print(f"Booking created successfully: {booking.booking_reference}, seat reserved")
             
             # Create PayFast payment form data
             try:
@@ -223,8 +475,7 @@ class BookingViewSet(viewsets.ModelViewSet):
                 # Cancel the booking and release the seat
                 booking.status = 'cancelled'
                 booking.save()
-                schedule.available_seats += 1
-                schedule.save()
+                SeatReservationService.release_booking(booking)
                 
                 return Response(
                     {'error': f'Payment setup failed: {str(payment_error)}'}, 
@@ -240,7 +491,121 @@ class BookingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    def _calculate_price(self, schedule, discount_type):
+        """Return (base price, discount, final price) for one seat on a schedule"""
+        base_price = schedule.price_zar  # No multiplication needed for 1 seat
+        discount_amount = Decimal('0.00')
+        
+        # Apply R40 discount for eligible categories
+        if discount_type in ['scholar', 'student', 'pensioner']:
+            discount_amount = Decimal('40.00')
+        
+        final_price = max(base_price - discount_amount, Decimal('0.00'))  # Ensure price doesn't go negative
+        return base_price, discount_amount, final_price
+    
+    @action(detail=False, methods=['post'], url_path='group')
+    @idempotent
+    def create_group(self, request):
+        """
+        Book several passengers on one schedule with a single payment
+        
+        All seats are reserved in one atomic operation and all bookings are
+        inserted with one bulk INSERT; the response carries one PayFast form.
+        """
+        serializer = GroupBookingSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {'error': 'Validation failed', 'details': serializer.errors}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        data = serializer.validated_data
+        passengers = data['passengers']
+        
+        try:
+            schedule = Schedule.objects.select_related('route').get(id=data['schedule_id'])
+        except Schedule.DoesNotExist:
+            return Response(
+                {'error': 'Schedule not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        seats_requested = len(passengers)
+        seat_numbers = [p['seat_number'] for p in passengers if p.get('seat_number')]
+        hold_expires_at = SeatReservationService.hold_expiry()
+        
+        bookings = []
+        for passenger in passengers:
+            base_price, discount_amount, final_price = self._calculate_price(
+                schedule, passenger.get('discount_type', 'none')
+            )
+            passenger_fields = {
+                'passenger_email': data['contact_email'],
+                'passenger_phone': data['contact_phone'],
+                **passenger
+            }
+            bookings.append(Booking(
+                schedule=schedule,
+                **passenger_fields,
+                booking_reference=allocate_booking_reference(),
+                number_of_seats=1,
+                original_amount=base_price,
+                discount_amount=discount_amount,
+                total_amount_zar=final_price,
+                status='pending_payment',
+                hold_expires_at=hold_expires_at
+            ))
+        
+        with transaction.atomic():
+            try:
+                reserved = SeatReservationService.reserve(schedule.id, seats_requested, seat_numbers)
+                if not reserved and SeatReservationService.release_expired_holds(schedule_id=schedule.id):
+                    reserved = SeatReservationService.reserve(schedule.id, seats_requested, seat_numbers)
+            except SeatSelectionError as e:
+                return Response(
+                    {'error': str(e)}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            if not reserved:
+                return Response(
+                    {'error': f'Not enough seats available on this schedule for {seats_requested} passengers'
+                              f'{" or a selected seat is taken" if seat_numbers else ""}.'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            group = BookingGroup.objects.create(
+                schedule=schedule,
+                contact_name=data['contact_name'],
+                contact_email=data['contact_email'],
+                contact_phone=data['contact_phone'],
+                number_of_seats=seats_requested,
+                total_amount_zar=sum(b.total_amount_zar for b in bookings)
+            )
+            for booking in bookings:
+                booking.group = group
+            Booking.objects.bulk_create(bookings)
+        
+        try:
+            payment_info = PayFastPaymentService.create_group_payment_form_data(group)
+        except Exception as payment_error:
+            logger.error(f"Group payment setup failed for {group.group_reference}: {str(payment_error)}")
+            group.bookings.update(status='cancelled', updated_at=timezone.now())
+            SeatReservationService.release_bookings(schedule.id, bookings)
+            return Response(
+                {'error': f'Payment setup failed: {str(payment_error)}'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        response_data = BookingGroupSerializer(
+            BookingGroup.objects.select_related('schedule__route', 'schedule__bus')
+            .prefetch_related('bookings').get(id=group.id)
+        ).data
+        response_data['payment'] = payment_info
+        return Response(response_data, status=status.HTTP_201_CREATED)
+    
     @action(detail=True, methods=['post'])
+    @idempotent
     def confirm_payment(self, request, pk=None):
         """Confirm payment for a booking (mainly for manual confirmation)"""
         booking = self.get_object()
@@ -253,11 +618,15 @@ class BookingViewSet(viewsets.ModelViewSet):
                 )
             
             # Manual confirmation (mainly for testing)
+            was_confirmed = booking.status == 'confirmed'
             booking.status = 'confirmed'
             booking.payment_date = timezone.now()
             booking.payfast_payment_status = 'COMPLETE'
             booking.save()
             
+            if not was_confirmed:
+                BookingEmailService.queue_booking_confirmations([booking.id])
+            
             # Return updated booking data
             response_data = self.get_serializer(booking).data
             response_data['payment_status'] = {
@@ -275,6 +644,7 @@ class BookingViewSet(viewsets.ModelViewSet):
             )
     
     @action(detail=True, methods=['post'])
+    @idempotent
     def cancel_booking(self, request, pk=None):
         """Cancel a booking and its payment"""
         booking = self.get_object()
@@ -346,35 +716,14 @@ class BookingViewSet(viewsets.ModelViewSet):
         """Get booking status and payment information"""
         booking = self.get_object()
         
-        status_info = {
-            'booking_id': booking.id,
-            'booking_reference': booking.booking_reference,
-            'status': booking.status,
-            'payfast_payment_status': booking.payfast_payment_status,
-            'payment_date': booking.payment_date,
-            'can_download_ticket': booking.status == 'confirmed',
-            'status_message': self._get_status_message(booking.status)
-        }
-        
-        return Response(status_info, status=status.HTTP_200_OK)
-    
-    def _get_status_message(self, booking_status):
-        """Get user-friendly status message"""
-        status_messages = {
-            'pending': 'Booking created, awaiting payment',
-            'payment_processing': 'Payment received, awaiting confirmation from PayFast',
-            'confirmed': 'Payment confirmed! Your ticket is ready for download',
-            'cancelled': 'Booking has been cancelled',
-            'completed': 'Journey completed',
-            'refunded': 'Booking refunded'
-        }
-        return status_messages.get(booking_status, f'Status: {booking_status}')
+        # Same document the /events/ stream pushes on every change
+        return Response(status_snapshot(booking), status=status.HTTP_200_OK)
 
-class ContactInfoViewSet(viewsets.ModelViewSet):
+class ContactInfoViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = ContactInfo.objects.all()
     serializer_class = ContactInfoSerializer
 
-class FAQViewSet(viewsets.ModelViewSet):
+class FAQViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = FAQ.objects.all()
     serializer_class = FAQSerializer
     
@@ -489,3 +838,101 @@ def payfast_webhook(request):
             'success': False,
             'error': str(e)
         }, status=500)
+
+_accepts_gzip = re.compile(r'\bgzip\b')
+
+@require_http_methods(["GET", "HEAD"])
+def bootstrap(request):
+    """
+    Everything the booking app needs for its first paint in one document
+    (routes, contact info, FAQs and available dates per route), served
+    precompressed from the cache with an ETag
+    """
+    SeatReservationService.release_expired_holds_if_due()
+    
+    document = BootstrapDocument.get()
+    response = get_conditional_response(request, etag=document['etag'])
+    if response is None:
+        if _accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            response = HttpResponse(document['gzip'], content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(document['body'], content_type='application/json')
+    
+    response['ETag'] = document['etag']
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+@require_http_methods(["GET"])
+def booking_events(request, booking_id):
+    """
+    Server-Sent Events stream of a booking's status: the current status,
+    then each change until payment completes, fails or is cancelled
+    """
+    refused = _refuse_wsgi_stream(request)
+    if refused:
+        return refused
+    
+    booking = Booking.objects.filter(pk=booking_id).only(*SNAPSHOT_FIELDS).first()
+    if booking is None:
+        return JsonResponse({'error': 'Booking not found'}, status=404)
+    
+    snapshot = status_snapshot(booking)
+    # Under ASGI waiters live on the event loop and hold no thread
+    if isinstance(request, ASGIRequest):
+        return _event_stream_response(booking_astream(booking.id, snapshot))
+    return _event_stream_response(booking_stream(booking.id, snapshot))
+
+@require_http_methods(["GET"])
+def schedule_events(request):
+    """
+    Server-Sent Events stream of available seats for the schedules in
+    ?ids= (comma-separated): the current counts, then the counts that
+    changed, coalesced into one event per update
+    """
+    refused = _refuse_wsgi_stream(request)
+    if refused:
+        return refused
+    
+    try:
+        schedule_ids = sorted({int(part) for part in request.GET.get('ids', '').split(',') if part.strip()})
+    except ValueError:
+        return JsonResponse({'error': 'ids must be a comma-separated list of schedule IDs'}, status=400)
+    if not schedule_ids:
+        return JsonResponse({'error': 'ids parameter is required'}, status=400)
+    if len(schedule_ids) > settings.SEAT_EVENTS_MAX_SCHEDULES:
+        return JsonResponse(
+            {'error': f'At most {settings.SEAT_EVENTS_MAX_SCHEDULES} schedules can be watched per stream'},
+            status=400
+        )
+    
+    seats = current_seats(schedule_ids)
+    if not seats:
+        return JsonResponse({'error': 'No matching schedules found'}, status=404)
+    
+    if isinstance(request, ASGIRequest):
+        return _event_stream_response(seat_astream(seats))
+    return _event_stream_response(seat_stream(seats))
+
+def _refuse_wsgi_stream(request):
+    """
+    503 for an event stream requested from a WSGI worker, unless
+    EVENT_STREAMS_UNDER_WSGI allows it (the threaded dev server)
+
+    Each stream would hold a whole sync worker for minutes, so a few open
+    pages would stall the site. EventSource does not retry a 503, and the
+    client falls back to polling.
+    """
+    if isinstance(request, ASGIRequest) or settings.EVENT_STREAMS_UNDER_WSGI:
+        return None
+    response = JsonResponse({'error': 'Event streams are not available on this server, poll instead'}, status=503)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+def _event_stream_response(content):
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering events
+    response['X-Accel-Buffering'] = 'no'
+    return response
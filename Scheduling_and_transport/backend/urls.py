@@ -6,17 +6,18 @@ from django.urls import path, include, re_path
 from django.views.generic import TemplateView
 from django.conf import settings
 from django.conf.urls.static import static
-from django.http import JsonResponse, HttpResponse, Http404
+from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.static import serve
-import os
-import mimetypes
+
+from assets import logo_manifest, serve_asset, spa_shell_response
 
 def api_info(request):
     return JsonResponse({
         'message': '🚌 Falcon Bus Transport API',
         'status': 'running',
         'endpoints': {
+            '/api/bootstrap/': 'Routes, contact info, FAQs and available dates in one document',
             '/api/routes/': 'List all bus routes',
             '/api/routes/{id}/schedules/': 'Get schedules for a route',
             '/api/bookings/': 'Create/list bookings',
@@ -63,15 +64,9 @@ def debug_db(request):
 
 def serve_react_app(request):
     """Serve the Vite-built React app"""
-    try:
-        # Try to read the actual Vite build index.html
-        dist_path = os.path.join(settings.BASE_DIR, 'frontend', 'dist', 'index.html')
-        if os.path.exists(dist_path):
-            with open(dist_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return HttpResponse(content, content_type='text/html')
-    except Exception as e:
-        pass
+    response = spa_shell_response(request)
+    if response is not None:
+        return response
     
     # Fallback to simple HTML
     return HttpResponse("""
@@ -93,68 +88,12 @@ def serve_react_app(request):
     """, content_type='text/html')
 
 def serve_assets(request, path):
-    """Serve Vite assets with proper MIME types"""
-    try:
-        # Try multiple locations for assets
-        possible_paths = [
-            os.path.join(settings.STATIC_ROOT, 'assets', path),
-            os.path.join(settings.BASE_DIR, 'frontend', 'dist', 'assets', path),
-            os.path.join(settings.BASE_DIR, 'staticfiles', 'assets', path),
-            # Also check for direct files in static folders
-            os.path.join(settings.STATIC_ROOT, path),
-            os.path.join(settings.BASE_DIR, 'backend', 'static', path),
-            os.path.join(settings.BASE_DIR, 'frontend', 'public', path),
-            os.path.join(settings.BASE_DIR, 'frontend', 'dist', path),
-        ]
-        
-        for file_path in possible_paths:
-            if os.path.exists(file_path):
-                # Determine MIME type
-                mime_type, _ = mimetypes.guess_type(file_path)
-                if not mime_type:
-                    if file_path.endswith('.js'):
-                        mime_type = 'application/javascript'
-                    elif file_path.endswith('.css'):
-                        mime_type = 'text/css'
-                    elif file_path.endswith('.jpg') or file_path.endswith('.jpeg'):
-                        mime_type = 'image/jpeg'
-                    elif file_path.endswith('.png'):
-                        mime_type = 'image/png'
-                    elif file_path.endswith('.gif'):
-                        mime_type = 'image/gif'
-                    elif file_path.endswith('.svg'):
-                        mime_type = 'image/svg+xml'
-                    else:
-                        mime_type = 'application/octet-stream'
-                
-                with open(file_path, 'rb') as f:
-                    content = f.read()
-                return HttpResponse(content, content_type=mime_type)
-        
-        raise Http404(f"Asset not found: {path}")
-    except Exception as e:
-        raise Http404(f"Error serving asset: {e}")
+    """Serve Vite assets and images from the asset manifest"""
+    return serve_asset(request, path)
 
 def serve_logo(request):
     """Serve the company logo"""
-    try:
-        # Try multiple locations for logo
-        possible_paths = [
-            os.path.join(settings.STATIC_ROOT, 'logo.png'),
-            os.path.join(settings.BASE_DIR, 'backend', 'static', 'logo.png'),
-            os.path.join(settings.BASE_DIR, 'frontend', 'public', 'logo.png'),
-            os.path.join(settings.BASE_DIR, 'frontend', 'dist', 'logo.png'),
-        ]
-        
-        for file_path in possible_paths:
-            if os.path.exists(file_path):
-                with open(file_path, 'rb') as f:
-                    content = f.read()
-                return HttpResponse(content, content_type='image/png')
-        
-        raise Http404("Logo not found")
-    except Exception as e:
-        raise Http404(f"Error serving logo: {e}")
+    return serve_asset(request, 'logo.png', manifest=logo_manifest)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
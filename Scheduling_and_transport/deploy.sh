@@ -26,5 +26,8 @@ else:
     print('ℹ️ Superuser already exists')
 "
 
+echo "📬 Starting task queue worker..."
+python manage.py run_task_workers &
+
 echo "🎯 Starting Gunicorn server..."
-exec gunicorn wsgi:application --bind 0.0.0.0:$PORT --workers 3 --timeout 120
+exec gunicorn asgi:application -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT --workers 3 --timeout 120